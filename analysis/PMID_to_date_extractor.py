@@ -12,6 +12,8 @@ import sys
 from metapub import PubMedFetcher
 from tqdm import tqdm
 
+from malco.io.ppkt_index import load_ppkt_index
+
 # Check if the script is being run directly
 
 
@@ -31,25 +33,10 @@ with open(os.path.expanduser('~/ncbi.key'), 'r') as f:
     os.environ['NCBI_API_KEY'] = f.read().strip()
 """
 
-# Iterate over all json files in the directory and populate a dictionary with as a key the filename and as a value the field .metaData.externalReferences
-ppkts = {}
-for filename in os.listdir(ppkts_dir):
-    if filename.endswith(".json"):
-        with open(os.path.join(ppkts_dir, filename), "r") as f:
-            data = json.load(f)
-            # Check if the key exists in the JSON data
-            if "metaData" in data and "externalReferences" in data["metaData"]:
-                ppkts[filename] = data["metaData"]["externalReferences"]
-            else:
-                print(f"Key not found in {filename}")
-
-pmid_list = []
-# Iterate over the dictionary and make a list on unique PubMed IDs
-for filename, references in ppkts.items():
-    for reference in references:
-        if "id" in reference:
-            pmid_list.append(reference["id"].replace("PMID:", "").strip())
-pmid_list = list(set(pmid_list))  # Remove duplicates
+# Unique PubMed IDs of the .metaData.externalReferences of all phenopackets, from the index of
+# the directory (see `malco ppkt index`), which only parses files new since the last run
+ppkts = load_ppkt_index(ppkts_dir, columns=["pmids"], cores=os.cpu_count())
+pmid_list = sorted({str(pmid) for pmids in ppkts["pmids"] for pmid in pmids})
 # Print the number of unique PubMed IDs found
 print(f"Found {len(pmid_list)} unique PubMed IDs.")
 
@@ -1,13 +1,13 @@
 """Look in the phenopacket2prompt output directory for the common phenopackets across languages and copy them to another directory."""
 
-import json
 import os
-import re
 import shutil
 import sys
 
 import tqdm
 
+from malco.io.ppkt_index import load_ppkt_index
+
 create_list_file = False
 copy_prompt_files = False
 copy_json_files = True
@@ -83,14 +83,16 @@ if copy_prompt_files:
 # Copy jsons
 if copy_json_files:
     json_path = os.path.join(fp, "original_phenopackets")
-    for jsonfile in tqdm.tqdm(os.listdir(json_path), "Copying json files..."):
-        with open(os.path.join(json_path, jsonfile), "r") as f:
-            data = json.load(f)
-            id = data["id"]
-            id = re.sub(r"[^\w]", "_", id)
-            if id in intersection:
-                shutil.copy(
-                    os.path.join(json_path, jsonfile), os.path.join(dst_dir, "jsons", jsonfile)
-                )
-            else:
-                print(f"Skipping {jsonfile}, not in intersection.")
+    # The IDs of the phenopackets, in the form of the prompt file names, from the index of the
+    # directory (see `malco ppkt index`) instead of loading every JSON file
+    ppkts = load_ppkt_index(json_path, columns=["filename", "case_id"], cores=os.cpu_count())
+    for jsonfile, id in tqdm.tqdm(
+        zip(ppkts["filename"], ppkts["case_id"]), "Copying json files...", total=len(ppkts)
+    ):
+        if id in intersection:
+            shutil.copy(
+                os.path.join(json_path, jsonfile),
+                os.path.join(dst_dir, "jsons", os.path.basename(jsonfile)),
+            )
+        else:
+            print(f"Skipping {jsonfile}, not in intersection.")
@@ -1,49 +1,45 @@
 # Provide a list of json filenames in a txt file and a directory with these files
-import os
-import json
-import pandas as pd
 import re
 from pathlib import Path
 
+import pandas as pd
+
+from malco.io.ppkt_index import load_ppkt_index
+
 # --- Configuration ---
 jsonfilenames_list_path = "leakage_experiment/SUPERCORRECT_ppkts_after_2023-10-31.txt"
 jsondir = Path("/Users/leonardo/data/4917_poly_ppkts/cohortdir/jsons")
 hpoa_path = Path.home() / "data" / "phenotype.hpoa"
 output_csv_file = "disease_data_with_biocuration_date.tsv"
 
-# --- Step 1: Extract data from JSON files into a list of dictionaries ---
+# --- Step 1: Look up the diseases of the listed phenopackets in the index of jsondir ---
+# (see `malco ppkt index`, only files new since the last run are parsed)
 extracted_data = []
-print("Starting data extraction from JSON files...")
+print("Reading the diseases from the phenopacket index...")
+ppkts = load_ppkt_index(jsondir, columns=["filename", "disease_ids", "disease_labels"])
+ppkts = ppkts.set_index("filename")
 with open(jsonfilenames_list_path, "r") as f:
     for line in f:
         filename = line.strip()
 
-        jsonfile = jsondir / filename
-
-        if not jsonfile.exists():
-            print(f"Warning: File not found, skipping: {jsonfile}")
+        if filename not in ppkts.index:
+            print(f"Warning: File not found or not a phenopacket, skipping: {jsondir / filename}")
             continue
 
-        with open(jsonfile, "r") as jf:
-            try:
-                data = json.load(jf)
-                diseases = data.get("diseases", [])
-                if not diseases:
-                    extracted_data.append(
-                        {"json_filename": filename, "disease_id": "N/A", "disease_label": "N/A"}
-                    )
-                else:
-                    for disease in diseases:
-                        term = disease.get("term", {})
-                        extracted_data.append(
-                            {
-                                "json_filename": filename,
-                                "disease_id": term.get("id"),
-                                "disease_label": term.get("label"),
-                            }
-                        )
-            except json.JSONDecodeError:
-                print(f"Warning: Could not decode JSON from file, skipping: {jsonfile}")
+        disease_ids = ppkts.at[filename, "disease_ids"]
+        if len(disease_ids) == 0:
+            extracted_data.append(
+                {"json_filename": filename, "disease_id": "N/A", "disease_label": "N/A"}
+            )
+        else:
+            for disease_id, disease_label in zip(disease_ids, ppkts.at[filename, "disease_labels"]):
+                extracted_data.append(
+                    {
+                        "json_filename": filename,
+                        "disease_id": disease_id,
+                        "disease_label": disease_label,
+                    }
+                )
 
 # Create the main DataFrame
 main_df = pd.DataFrame(extracted_data)
@@ -4,13 +4,12 @@
 import pandas as pd
 import regex as re
 
-# import yaml file at /Users/leonardo/git/malco/out_multlingual_nov24/raw_results/multilingual/ja/results.yaml
-import yaml
+from malco.io.reading import iter_raw_result_yaml
 
-with open(
-    "/Users/leonardo/git/malco/out_multlingual_nov24/raw_results/multilingual/ja/results.yaml", "r"
-) as file:
-    data = list(yaml.safe_load_all(file.read()))
+# stream the documents of /Users/leonardo/git/malco/out_multlingual_nov24/raw_results/multilingual/ja/results.yaml
+data = iter_raw_result_yaml(
+    "/Users/leonardo/git/malco/out_multlingual_nov24/raw_results/multilingual/ja/results.yaml"
+)
 
 # iterate over all results and check if named_entities field exists, if not,
 # save the content of the "label" subfield of the "extracted_object" field in a dataframe, together with the "input_text" field
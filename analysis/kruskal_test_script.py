@@ -4,9 +4,10 @@ Works on individual data points..."""
 
 from pathlib import Path
 
-import pandas as pd
 from scipy.stats import kruskal
 
+from malco.io.full_results import read_scored_table
+
 # MALCO langs check output.
 languages = ["en", "es", "cs", "tr", "de", "it", "zh", "nl", "ja", "fr"]
 
@@ -22,8 +23,8 @@ for lang in languages:
     )
     # mrr = df_onelang.groupby("label")["reciprocal_rank"].max()
     # Repackaging format:
-    df_onelang = pd.read_csv(fulldf_path, delimiter="\t", usecols=["scored"])
-    df_scored_dict = df_onelang["scored"].apply(ast.literal_eval)
+    # Only the scored diagnoses are loaded, flattened to one row per diagnosis
+    cases, scored = read_scored_table(fulldf_path)
     # mrr = df_onelang.groupby("label")["reciprocal_rank"].max()
     # std = mrr.std()
     # mrr_results[lang] = [mrr.mean(), std, std/math.sqrt(len(df_onelang.groupby("label")))]
@@ -32,9 +33,9 @@ for lang in languages:
     # Repackaging format:
     # For each line in the scored column, if in that list of dicts any of the dicts' field "is_correct" is True,
     # then assign the content of the field 'rank', transformed to float, to ranks.
-    ranks = df_scored_dict.apply(lambda x: [float(d["rank"]) for d in x if d["is_correct"]])
+    ranks = scored[scored["is_correct"]].groupby("case")["rank"].first().astype(float)
     # If no dict in the list has 'is_correct' True, assign 11 to ranks.
-    ranks = ranks.apply(lambda x: x[0] if x else 11)
+    ranks = ranks.reindex(range(len(cases)), fill_value=11.0)
     # ranks = df_scored_dict.apply(lambda x: 1/x if x>0.099 else 11)
 
     samples[lang] = ranks.tolist()
@@ -35,20 +35,19 @@ cres = answers.set_index("label").to_dict(orient="index")
 answers_dict = {k[:-remove_std_suffix]: v for k, v in cres.items()}
 
 langs = ["it", "es", "de"]
-# Define a dataframe with 100 lines and 9 columns
-df = pd.DataFrame(
-    columns=[
-        "PMID",
-        "correct_label",
-        "correct_OMIM_id",
-        "it_dx",
-        "es_dx",
-        "de_dx",
-        "it_rank",
-        "es_rank",
-        "de_rank",
-    ]
-)
+columns = [
+    "PMID",
+    "correct_label",
+    "correct_OMIM_id",
+    "it_dx",
+    "es_dx",
+    "de_dx",
+    "it_rank",
+    "es_rank",
+    "de_rank",
+]
+# One row per PMID, collected in a dict and turned into the dataframe once at the end
+rows = {}
 
 # Load ungrounded results
 ungrounded_dir = os.path.join(output_dir, "raw_results", "multilingual")
@@ -68,36 +67,33 @@ for lang in langs:
             with open(file_path, "r") as f:
                 file_content = f.read()
             file_key = file[:-remove_result]  # Remove the last n characters from the filename
-            if file_key not in df["PMID"].values:
-                # Add a new row with the file_key in the PMID column and file content in the lang+"_no_en" column
-                df = pd.concat(
-                    [df, pd.DataFrame({"PMID": [file_key], lang + "_dx": [file_content]})],
-                    ignore_index=True,
-                )
-            else:
-                # Update the existing row in the lang+"_no_en" column
-                df.loc[df["PMID"] == file_key, lang + "_dx"] = file_content
+            rows.setdefault(file_key, {"PMID": file_key})[lang + "_dx"] = file_content
 
     dir_path = os.path.join(grounded_dir, lang + "_w_en")
     if os.path.exists(dir_path):
         print("Found directory:", dir_path)
-        fulldf = pd.read_csv(os.path.join(dir_path, "full_df_results.tsv"), sep="\t")
+        # Only the columns needed for the rank of the first correct diagnosis
+        fulldf = pd.read_csv(
+            os.path.join(dir_path, "full_df_results.tsv"),
+            sep="\t",
+            usecols=["label", "is_correct", "rank"],
+        )
         # Group by label and iterate over the groups
         for label, group in fulldf.groupby("label"):
             label = label[:-remove_std_suffix]  # Remove the last n characters from the label
             # Check if the label exists in df
-            if label not in df["PMID"].values:
+            if label not in rows:
                 print(f"Label {label} not found in df.")
                 continue
             # If any item in column "is_correct" is True, set the corresponding "rank" value in df[lang+"_rank"]
             if group["is_correct"].any():
                 # Get the rank of the first correct item
-                rank = group.loc[group["is_correct"], "rank"].values[0]
-                # Update the corresponding row in df
-                df.loc[df["PMID"] == label, lang + "_rank"] = rank
+                rows[label][lang + "_rank"] = group.loc[group["is_correct"], "rank"].values[0]
             else:
                 # If no correct item, set rank to NaN
-                df.loc[df["PMID"] == label, lang + "_rank"] = float("NaN")
+                rows[label][lang + "_rank"] = float("NaN")
+
+df = pd.DataFrame(list(rows.values()), columns=columns)
 
 # Add the correct MONDO ID and description to the dataframe
 df["correct_OMIM_id"] = df["PMID"].map(
@@ -8,6 +8,9 @@ import json
 import os
 import sys
 
+from malco.io.ppkt_index import load_ppkt_index
+from malco.io.pubmed import parse_pmid
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Check if the correct number of arguments is provided
 if len(sys.argv) < 3:
@@ -36,22 +39,16 @@ if cutoff_date > datetime.datetime.now():
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Import the ppkts from the previous script
 try:
-    ppkts_dir = str(sys.argv[4])
+    ppkts_dir = str(sys.argv[3])
 except IndexError:
     ppkts_dir = "/Users/leonardo/data/ppkts_4967_polyglot/jsons"
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-# Iterate over all json files in the directory and populate a dictionary with as a key the filename and as a value the field .metaData.externalReferences
-ppkts = {}
-for filename in os.listdir(ppkts_dir):
-    if filename.endswith(".json"):
-        with open(os.path.join(ppkts_dir, filename), "r") as f:
-            data = json.load(f)
-            # Check if the key exists in the JSON data
-            if "metaData" in data and "externalReferences" in data["metaData"]:
-                ppkts[filename] = data["metaData"]["externalReferences"]
-            else:
-                print(f"Key not found in {filename}")
+# PMIDs of the .metaData.externalReferences of every phenopacket, from the index of the
+# directory (see `malco ppkt index`), which only parses files new since the last run
+ppkts = load_ppkt_index(ppkts_dir, columns=["filename", "pmids"], cores=os.cpu_count())
+for filename in ppkts.loc[ppkts["pmids"].map(len) == 0, "filename"]:
+    print(f"No PMID reference in {filename}")
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Go over pumbed_data which contains a datetime.datetime object and collect those received after cutoff_date in pubmeds_after_cutoff
@@ -64,12 +61,12 @@ for pmid, data in pmid2date_dict.items():
         pubmeds_after_cutoff[pmid] = data
         print(f"PMID: {pmid}, Date: {data['date']}")
 
-new_ppkts = []
-for fn, _ in ppkts.items():
-    for id in pubmeds_after_cutoff.keys():
-        str2search = id.replace(":", "_").strip()
-        if str2search in fn:
-            new_ppkts.append(fn)  # These are indeed json filenames
+pmids_after_cutoff = {parse_pmid(pmid) for pmid in pubmeds_after_cutoff}
+new_ppkts = [
+    fn  # These are indeed json filenames, relative to ppkts_dir
+    for fn, pmids in zip(ppkts["filename"], ppkts["pmids"])
+    if pmids_after_cutoff.intersection(pmids)
+]
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Save the filtered PubMed IDs to a new file
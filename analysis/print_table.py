@@ -3,6 +3,9 @@ from pathlib import Path
 
 import pandas as pd
 
+from malco.io.catalog import has_catalog, query_runs
+from malco.process.topk import topk_counts
+
 try:
     file = Path(sys.argv[1])
 except IndexError:
@@ -10,13 +13,14 @@ except IndexError:
     # Default file path
     file = Path("final_multilingual_output/rank_data/topn_result.tsv")
 
-if file.is_dir():
-    # if this is not a file, but a directory, file will be the set of tsv files in that directory
-    file = list(file.glob("topn_result_*.tsv"))
-
-if isinstance(file, list):
-    # If multiple files are provided, concatenate them
-    df = pd.concat([pd.read_csv(f, delimiter="\t") for f in file], ignore_index=True)
+if file.is_dir() and has_catalog(file):
+    # Runs registered by evaluate, one row each, named by their language like the top-n files
+    df = query_runs(file).rename(columns={"language": "run"})
+elif file.is_dir():
+    # if this is not a file, but a directory, read the set of tsv files in that directory
+    df = pd.concat(
+        [pd.read_csv(f, delimiter="\t") for f in file.glob("topn_result_*.tsv")], ignore_index=True
+    )
 else:
     df = pd.read_csv(file, delimiter="\t")
 
@@ -46,21 +50,7 @@ else:
 df[lang_str] = df[lang_str].replace(language_mapping)
 
 valid_cases = df["num_cases"]
-df["Top-1"] = df["n1"]
-df["Top-3"] = df["n1"] + df["n2"] + df["n3"]
-df["Top-5"] = df["n1"] + df["n2"] + df["n3"] + df["n4"] + df["n5"]
-df["Top-10"] = (
-    df["n1"]
-    + df["n2"]
-    + df["n3"]
-    + df["n4"]
-    + df["n5"]
-    + df["n6"]
-    + df["n7"]
-    + df["n8"]
-    + df["n9"]
-    + df["n10"]
-)
+df = df.join(topk_counts(df, ks=(1, 3, 5, 10)))
 
 # TODO legacy, remove in future
 if lang_str == "run":
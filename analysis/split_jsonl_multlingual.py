@@ -37,7 +37,6 @@ except IndexError:
 
 print(f"Using languages: {languages}")
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-breakpoint()
 with open(data_dir + file_name, "r") as f:
     # Create a dictionary to hold file handles for each language
     file_handles = {lang: open(data_dir + lang + "-meditron-70b.jsonl", "w") for lang in languages}
@@ -20,6 +20,8 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 
+from malco.io.hpoa import load_disease_summary
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Parse user input and set paths:
 model = str(sys.argv[1])
@@ -30,33 +32,11 @@ outdir = Path.cwd() / "src" / "malco" / "analysis" / "time_ic"
 
 
 # (1) HPOA for dates
-# HPOA import and setup
-hpoa_df = pd.read_csv(
-    hpoa_file_path,
-    sep="\t",
-    header=4,
-    low_memory=False,  # Necessary to suppress Warning we don't care about
-)
-
-labels_to_drop = [
-    "disease_name",
-    "qualifier",
-    "hpo_id",
-    "reference",
-    "evidence",
-    "onset",
-    "frequency",
-    "sex",
-    "modifier",
-    "aspect",
-]
-hpoa_df = hpoa_df.drop(columns=labels_to_drop)
-
-hpoa_df["date"] = hpoa_df["biocuration"].str.extract(r"\[(.*?)\]")
-hpoa_df = hpoa_df.drop(columns="biocuration")
-hpoa_df = hpoa_df[hpoa_df["database_id"].str.startswith("OMIM")]
-
-hpoa_unique = hpoa_df.groupby("database_id").date.min()
+# Earliest biocuration date of every disease, cached per HPOA release
+hpoa_summary = load_disease_summary(hpoa_file_path)
+hpoa_summary = hpoa_summary[hpoa_summary.index.str.startswith("OMIM")]
+hpoa_unique = hpoa_summary["earliest_curation"].dt.strftime("%Y-%m-%d").rename("date")
+hpoa_df = hpoa_unique.rename_axis("database_id").reset_index()
 # Now length 8251, and e.g. hpoa_unique.loc["OMIM:620662"] -> '2024-04-15'
 
 
@@ -133,9 +113,6 @@ never_found = notfound_set - found_set  # 213
 # Compute average date of always vs never found diseases
 results_dict = {}  # turns out being 281 long
 
-# TODO get rid of next line, bzw hpoa_unique does not work for loop below
-hpoa_df.drop_duplicates(subset="database_id", inplace=True)
-
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 for af in always_found:
     try:
@@ -6,7 +6,8 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 
-from malco.post_process.df_save_util import safe_save_tsv
+from malco.io.reading import safe_save_tsv
+from malco.process.topk import topk_accuracy
 
 # ==============================================================================
 # Change the following paths to match your system and subset of phenopacket IDs
@@ -116,5 +117,6 @@ for lang in languages:
 topn_file_name = "topn_result.tsv"
 
 safe_save_tsv(output_dir / "rank_data", topn_file_name, rank_df)
+print(rank_df[[comparing]].join(topk_accuracy(rank_df)).to_string(index=False))
 
 # Now run main_analysis_multilingual.py adapting paths in there
@@ -0,0 +1,6 @@
+from pathlib import Path
+
+BENCHMARKS = ("clean", "ground", "score", "summarize", "evaluate")
+DEFAULT_SCALES = (1000, 10000, 100000)
+BENCH_DIR = Path("benchmarks")
+HISTORY_NAME = "history.json"
@@ -0,0 +1,124 @@
+import json
+import random
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from malco.process.ontology_index import OntologyIndex
+
+STYLES = ("numbered", "bold", "header", "explained")
+HEADERS = {
+    "en": "Differential diagnosis:",
+    "es": "Diagnóstico diferencial:",
+    "de": "Differentialdiagnose:",
+    "it": "Diagnosi differenziale:",
+    "fr": "Diagnostic différentiel :",
+    "nl": "Differentiële diagnose:",
+    "tr": "Ayırıcı tanı:",
+    "zh": "鉴别诊断：",
+    "ja": "鑑別診断：",
+    "cs": "Diferenciální diagnóza:",
+}
+EXPLANATIONS = {
+    "en": "consistent with the presented features",
+    "es": "compatible con los hallazgos",
+    "de": "passend zu den beschriebenen Merkmalen",
+    "it": "compatibile con i reperti",
+    "fr": "compatible avec les signes présentés",
+}
+_SYLLABLES = ("zor", "vex", "kal", "trin", "mop", "quar", "dell", "ux", "bri", "feng")
+
+
+def corpus_terms(index: OntologyIndex) -> List[Tuple[str, str, str]]:
+    """
+    The MONDO classes usable as gold diagnoses: those with a label and an OMIM mapping.
+
+    Args:
+        index (OntologyIndex): The ontology index.
+
+    Returns:
+        List[Tuple[str, str, str]]: (MONDO ID, label, first OMIM ID) triples.
+    """
+    mapped = np.flatnonzero(np.diff(index.omim_indptr) > 0)
+    terms = []
+    for i in mapped:
+        term = str(index.term_ids[i])
+        label = index.label(term)
+        if term.startswith("MONDO:") and label:
+            terms.append((term, label, index.omims(term)[0]))
+    return terms
+
+
+def _unknown_disease(rng: random.Random) -> str:
+    """A made-up disease name, which does not ground to anything."""
+    name = "".join(rng.choice(_SYLLABLES) for _ in range(3)).capitalize()
+    return f"{name}-{rng.choice(_SYLLABLES).capitalize()} syndrome type {rng.randint(1, 9)}"
+
+
+def _format_response(names: List[str], style: str, lang: str) -> str:
+    if style == "bold":
+        lines = [f"{rank}. **{name}**" for rank, name in enumerate(names, start=1)]
+    elif style == "explained":
+        explanation = EXPLANATIONS.get(lang, EXPLANATIONS["en"])
+        lines = [f"{rank}. {name} - {explanation}" for rank, name in enumerate(names, start=1)]
+    else:
+        lines = [f"{rank}. {name}" for rank, name in enumerate(names, start=1)]
+    if style == "header":
+        lines.insert(0, f"**{HEADERS.get(lang, HEADERS['en'])}**")
+    return "\n".join(lines)
+
+
+def generate_corpus(
+    terms: Sequence[Tuple[str, str, str]],
+    n: int,
+    languages: Sequence[str] = ("en",),
+    styles: Sequence[str] = STYLES,
+    failure_rate: float = 0.1,
+    diagnoses: int = 5,
+    seed: int = 0,
+) -> Iterator[dict]:
+    """
+    Generate synthetic responses in the format of the response JSONL files.
+
+    Every response ranks `diagnoses` MONDO labels, the gold one at a random rank or missing,
+    in one of the formatting `styles`. Each diagnosis is replaced by a made-up name with
+    probability `failure_rate`, to exercise failed groundings.
+
+    Args:
+        terms (Sequence[Tuple[str, str, str]]): Output of `corpus_terms`.
+        n (int): Number of responses.
+        languages (Sequence[str]): Languages of the prompts, used in turn.
+        styles (Sequence[str]): Formatting styles, used in turn.
+        failure_rate (float): Probability of a diagnosis not to ground.
+        diagnoses (int): Number of diagnoses per response.
+        seed (int): Seed of the generator, the same seed gives the same corpus.
+
+    Yields:
+        dict: Records with the `id`, `prompt`, `gold` and `response` fields.
+    """
+    rng = random.Random(seed)
+    for i in range(n):
+        lang = languages[i % len(languages)]
+        style = styles[i % len(styles)]
+        _, gold_label, gold_omim = rng.choice(terms)
+        names = [rng.choice(terms)[1] for _ in range(diagnoses)]
+        gold_rank = rng.randint(0, diagnoses)  # diagnoses means the gold one is missing
+        if gold_rank < diagnoses:
+            names[gold_rank] = gold_label
+        names = [_unknown_disease(rng) if rng.random() < failure_rate else name for name in names]
+        yield {
+            "id": f"PMID_{i}_{lang}-prompt.txt",
+            "prompt": "",
+            "gold": {"disease_id": gold_omim, "disease_name": gold_label},
+            "response": _format_response(names, style, lang),
+        }
+
+
+def write_corpus(records: Iterator[dict], path: str) -> int:
+    """Write synthetic responses as a response JSONL file, return their number."""
+    count = 0
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+            count += 1
+    return count
@@ -0,0 +1,300 @@
+import json
+import multiprocessing as mp
+import os
+import shutil
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from oaklib import get_adapter
+
+from malco.benchmarks import BENCHMARKS, DEFAULT_SCALES
+from malco.benchmarks.corpus import corpus_terms, generate_corpus, write_corpus
+from malco.io.full_results import write_full_results
+from malco.io.reading import read_responses
+from malco.process.cleaning import (
+    clean_diagnosis_line,
+    clean_service_answer,
+    split_diagnosis_from_header,
+)
+from malco.process.grounding import ground_diagnosis_text_to_mondo
+from malco.process.ontology_index import ONTOLOGY_INDEX_NAME, IndexAnnotator, OntologyIndex
+from malco.process.process import create_single_standardised_results
+from malco.process.scoring import mondo_adapter, open_caches, score_batch
+from malco.process.summary import rank_counts
+
+
+class BenchmarkContext:
+    """
+    The ontology and the synthetic corpora shared by the benchmarks of one suite run.
+
+    Corpora, and their groundings once computed, are kept per scale so that every benchmark
+    of a scale runs on the same responses.
+    """
+
+    def __init__(
+        self,
+        workdir: Path,
+        mondo_db: Optional[str] = None,
+        languages: Sequence[str] = ("en",),
+        failure_rate: float = 0.1,
+        cores: Optional[int] = None,
+        seed: int = 0,
+    ):
+        self.workdir = workdir
+        workdir.mkdir(parents=True, exist_ok=True)
+        self.mondo = get_adapter(f"sqlite:{mondo_db}") if mondo_db else mondo_adapter()
+        self.index = OntologyIndex.load_or_build(self.mondo, workdir / "caches")
+        self.index_dir = workdir / "caches" / ONTOLOGY_INDEX_NAME
+        self.terms = corpus_terms(self.index)
+        self.languages = languages
+        self.failure_rate = failure_rate
+        self.cores = cores or mp.cpu_count()
+        self.seed = seed
+        self._corpora: Dict[int, Path] = {}
+        self._grounded: Dict[int, pd.DataFrame] = {}
+
+    def corpus(self, n: int) -> Path:
+        """The response file of `n` synthetic responses."""
+        if n not in self._corpora:
+            path = self.workdir / f"corpus_{n}.jsonl"
+            write_corpus(
+                generate_corpus(
+                    self.terms,
+                    n,
+                    languages=self.languages,
+                    failure_rate=self.failure_rate,
+                    seed=self.seed,
+                ),
+                path,
+            )
+            self._corpora[n] = path
+        return self._corpora[n]
+
+    def responses(self, n: int) -> pd.DataFrame:
+        return read_responses(self.corpus(n))
+
+    def grounded(self, n: int) -> pd.DataFrame:
+        """The grounded corpus, grounding it first if the ground benchmark did not."""
+        if n not in self._grounded:
+            self._grounded[n] = _ground(self.responses(n), IndexAnnotator(self.index))
+        return self._grounded[n].copy()
+
+
+def _ground(responses: pd.DataFrame, annotator) -> pd.DataFrame:
+    # The curategpt fallback needs an embedding store and is left out, to run offline
+    responses["grounding"] = [
+        ground_diagnosis_text_to_mondo(
+            annotator,
+            split_diagnosis_from_header(answer),
+            verbose=False,
+            use_ontogpt_grounding=False,
+        )
+        for answer in responses["service_answers"]
+    ]
+    return responses
+
+
+def _ground_chunk(args) -> pd.DataFrame:
+    process, chunk, index_dir = args
+    return create_single_standardised_results(
+        chunk, process, index_dir, use_ontogpt_grounding=False
+    )
+
+
+def bench_clean(context: BenchmarkContext, n: int) -> Tuple[int, float]:
+    """Cleaning of the responses and their diagnosis lines."""
+    responses = context.responses(n)["service_answers"]
+    start = time.perf_counter()
+    for answer in responses:
+        for line in split_diagnosis_from_header(clean_service_answer(answer)).splitlines():
+            clean_diagnosis_line(line)
+    return n, time.perf_counter() - start
+
+
+def bench_ground(context: BenchmarkContext, n: int) -> Tuple[int, float]:
+    """Exact grounding of every diagnosis line, on one core."""
+    responses = context.responses(n)
+    start = time.perf_counter()
+    context._grounded[n] = _ground(responses, IndexAnnotator(context.index))
+    return n, time.perf_counter() - start
+
+
+def bench_score(context: BenchmarkContext, n: int) -> Tuple[int, float]:
+    """Lenient and strict scoring of the grounded corpus, with empty caches."""
+    df = context.grounded(n)
+    pc1, pc2 = _empty_caches(context)
+    try:
+        start = time.perf_counter()
+        score_batch(df, "lenient", context.mondo, context.index, pc1, pc2)
+        return n, time.perf_counter() - start
+    finally:
+        pc1.close()
+        pc2.close()
+
+
+def bench_summarize(context: BenchmarkContext, n: int) -> Tuple[int, float]:
+    """Rank counting of a scored corpus."""
+    df = context.grounded(n)
+    rng = np.random.default_rng(context.seed)
+    df["scored"] = [
+        [
+            {
+                "rank": rank,
+                "grounded_id": grounded_id,
+                "grounded_score": float(correct),
+                "strict_score": float(correct),
+                "is_correct": bool(correct),
+            }
+            for rank, (_, grounded) in enumerate(grounding, start=1)
+            for (grounded_id, _), correct in zip(grounded, rng.random(len(grounded)) < 0.1)
+        ]
+        for grounding in df["grounding"]
+    ]
+    start = time.perf_counter()
+    rank_counts(df)
+    return n, time.perf_counter() - start
+
+
+def bench_evaluate(context: BenchmarkContext, n: int) -> Tuple[int, float]:
+    """Reading, parallel grounding, scoring with empty caches, writing and summarizing."""
+    pc1, pc2 = _empty_caches(context)
+    try:
+        start = time.perf_counter()
+        df = read_responses(context.corpus(n))
+        cores = min(context.cores, len(df))
+        with mp.Pool(cores) as pool:
+            df = pd.concat(
+                pool.imap_unordered(
+                    _ground_chunk,
+                    [
+                        (process, chunk, context.index_dir)
+                        for process, chunk in enumerate(np.array_split(df, cores))
+                    ],
+                ),
+                ignore_index=True,
+            )
+        df = score_batch(df, "lenient", context.mondo, context.index, pc1, pc2)
+        write_full_results(df.drop("service_answers", axis=1), context.workdir / "full_results.tsv")
+        rank_counts(df)
+        return n, time.perf_counter() - start
+    finally:
+        pc1.close()
+        pc2.close()
+
+
+def _empty_caches(context: BenchmarkContext):
+    cache_dir = context.workdir / "score_caches"
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    return open_caches(cache_dir)
+
+
+BENCHMARK_FUNCTIONS = {
+    "clean": bench_clean,
+    "ground": bench_ground,
+    "score": bench_score,
+    "summarize": bench_summarize,
+    "evaluate": bench_evaluate,
+}
+
+
+def run_benchmarks(
+    context: BenchmarkContext,
+    scales: Sequence[int] = DEFAULT_SCALES,
+    benchmarks: Sequence[str] = BENCHMARKS,
+) -> List[dict]:
+    """
+    Run the benchmarks at every scale.
+
+    Args:
+        context (BenchmarkContext): The ontology and corpora.
+        scales (Sequence[int]): Numbers of responses.
+        benchmarks (Sequence[str]): Names of the benchmarks to run, see `BENCHMARKS`.
+
+    Returns:
+        List[dict]: One result per benchmark and scale, with its time and throughput.
+    """
+    results = []
+    for n in scales:
+        context.corpus(n)  # Generating the corpus is not part of any benchmark
+        for name in benchmarks:
+            # Every benchmark times its measured part itself, leaving out its setup
+            items, seconds = BENCHMARK_FUNCTIONS[name](context, n)
+            results.append(
+                {
+                    "benchmark": name,
+                    "scale": n,
+                    "seconds": seconds,
+                    "items_per_second": items / seconds if seconds else None,
+                }
+            )
+            print(f"{name:>10} {n:>8}: {seconds:8.3f}s")
+    return results
+
+
+def load_history(path: Path) -> List[dict]:
+    """Load the previous suite runs, oldest first."""
+    if not path.is_file():
+        return []
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def append_history(path: Path, results: List[dict]) -> dict:
+    """Record a suite run in the history file and return the entry."""
+    history = load_history(path)
+    entry = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "results": results,
+    }
+    history.append(entry)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(history, f, indent=2)
+    return entry
+
+
+def find_regressions(
+    history: List[dict], results: List[dict], threshold: float = 0.2
+) -> List[dict]:
+    """
+    Compare results with the latest earlier run of the same benchmarks and scales.
+
+    Args:
+        history (List[dict]): Earlier suite runs, oldest first.
+        results (List[dict]): The results of the current run.
+        threshold (float): Relative slowdown above which a result is a regression.
+
+    Returns:
+        List[dict]: The regressed results, with the previous time and the slowdown.
+    """
+    previous = {}
+    for entry in history:
+        for result in entry["results"]:
+            previous[(result["benchmark"], result["scale"])] = result["seconds"]
+    regressions = []
+    for result in results:
+        before = previous.get((result["benchmark"], result["scale"]))
+        if before and result["seconds"] > before * (1 + threshold):
+            regressions.append(
+                {**result, "previous_seconds": before, "slowdown": result["seconds"] / before - 1}
+            )
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
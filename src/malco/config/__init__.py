@@ -1 +1 @@
-from .malco_config import MalcoConfig  # noqa: F401
+from .malco_config import MalcoConfig, expand_config_paths  # noqa: F401
@@ -1,3 +1,8 @@
+import glob
+import os
+from typing import Iterable, List
+
+import click
 import yaml
 
 
@@ -9,6 +14,7 @@ class MalcoConfig:
         Args:
             config_path (str): Path to the YAML configuration file.
         """
+        self.config_path = str(config_path)
         with open(config_path, "r") as file:
             content = yaml.safe_load(file)
             self.name = content.get("name", [])
@@ -23,3 +29,34 @@ class MalcoConfig:
 
     def __str__(self):
         return f"MalcoConfig(name={self.name}, response_file={self.response_file}, result_file={self.result_file}, output_dir={self.output_dir}, tmp_dir={self.tmp_dir}, gold_file={self.gold_file}, visualize={self.visualize}, languages={self.languages})"
+
+
+def expand_config_paths(patterns: Iterable[str]) -> List[str]:
+    """
+    Expand configuration paths and globs, e.g. "data/config/multilingual_main/*.yaml".
+
+    Args:
+        patterns (Iterable[str]): Paths or glob patterns.
+
+    Returns:
+        List[str]: The matching configuration files, sorted within every pattern, without repeats.
+
+    Raises:
+        click.BadParameter: If a path does not exist or a glob matches no file.
+    """
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                raise click.BadParameter(
+                    f"No configuration matches {pattern}.", param_hint="--config"
+                )
+        elif os.path.isfile(pattern):
+            matches = [pattern]
+        else:
+            raise click.BadParameter(f"{pattern} does not exist.", param_hint="--config")
+        for path in matches:
+            if path not in paths:
+                paths.append(path)
+    return paths
@@ -0,0 +1,7 @@
+# Values the command line needs when it is built, kept here so that defining the commands
+# does not import the heavy modules they come from
+from pathlib import Path
+
+CACHE_DIR = Path("caches")
+SCORING_MODES = ("lenient", "strict")
+HEREDITARY_DISEASE = "MONDO:0003847"
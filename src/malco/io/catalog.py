@@ -0,0 +1,146 @@
+import os
+import re
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from malco.config import MalcoConfig
+from malco.model.language import Language
+from malco.process.summary import SUMMARY_HEADER
+
+CATALOG_NAME = "results_catalog.sqlite"
+SUMMARY_COLUMNS = SUMMARY_HEADER[1:]
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    name TEXT NOT NULL,
+    model TEXT NOT NULL,
+    language TEXT NOT NULL,
+    config TEXT,
+    scoring TEXT,
+    evaluated_at TEXT NOT NULL,
+    result_file TEXT PRIMARY KEY,
+    full_result_file TEXT,
+    {", ".join(f"{column} INTEGER" for column in SUMMARY_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS runs_model_language ON runs (model, language);
+"""
+_LANGUAGE_PREFIX = re.compile(r"^([a-z]{2})[-_](.+)$")
+
+
+def parse_run_name(result_file: str) -> Tuple[str, str]:
+    """
+    Model and language of a run, from the name of its top-n file.
+
+    Follows the file naming of `glob_generator`: topn_result_<model>.tsv for English and
+    topn_result_<language>-<model>.tsv otherwise. Hyphens in the model are kept as is.
+
+    Returns:
+        Tuple[str, str]: The model and the language short name, e.g. ("Meditron3_70B", "cs").
+    """
+    stem = Path(result_file).stem.replace("topn_result_", "")
+    match = _LANGUAGE_PREFIX.match(stem)
+    if match and match.group(1).upper() in Language.__members__:
+        return match.group(2), match.group(1)
+    return stem, "en"
+
+
+def register_run(run_config: MalcoConfig, summary: dict, scoring: Optional[str] = None) -> Path:
+    """
+    Record an evaluated run, with its summary counts, in the catalog of its output directory.
+
+    Registering a run again, e.g. after re-evaluating it, replaces its entry.
+
+    Args:
+        run_config (MalcoConfig): The run configuration.
+        summary (dict): The summary counts, see `summary_row`.
+        scoring (str, optional): The scoring mode of the evaluation.
+
+    Returns:
+        Path: The catalog.
+    """
+    catalog_dir = Path(run_config.output_dir)
+    catalog_dir.mkdir(parents=True, exist_ok=True)
+    catalog = catalog_dir / CATALOG_NAME
+    model, language = parse_run_name(run_config.result_file)
+    row = {
+        "name": run_config.name,
+        "model": model,
+        "language": language,
+        "config": run_config.config_path,
+        "scoring": scoring,
+        "evaluated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        # Relative to the catalog, so that the results directory can be moved as a whole
+        "result_file": os.path.relpath(run_config.result_file, catalog_dir),
+        "full_result_file": (
+            os.path.relpath(run_config.full_result_file, catalog_dir)
+            if run_config.full_result_file
+            else None
+        ),
+        **{column: summary.get(column, 0) for column in SUMMARY_COLUMNS},
+    }
+    with sqlite3.connect(catalog, timeout=30) as db:
+        db.executescript(_SCHEMA)
+        db.execute(
+            f"INSERT OR REPLACE INTO runs ({', '.join(row)}) "
+            f"VALUES ({', '.join('?' * len(row))})",
+            list(row.values()),
+        )
+    return catalog
+
+
+def lookup_run(run_config: MalcoConfig) -> Optional[dict]:
+    """The catalog entry of a run, None if it was not registered."""
+    catalog_dir = Path(run_config.output_dir)
+    if not has_catalog(catalog_dir):
+        return None
+    with sqlite3.connect(f"file:{catalog_dir / CATALOG_NAME}?mode=ro", uri=True) as db:
+        db.row_factory = sqlite3.Row
+        row = db.execute(
+            "SELECT * FROM runs WHERE result_file = ?",
+            [os.path.relpath(run_config.result_file, catalog_dir)],
+        ).fetchone()
+    return dict(row) if row is not None else None
+
+
+def query_runs(
+    catalog_dir: Path, model: str = "*", languages: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Look up runs in the catalog of a results directory.
+
+    Args:
+        catalog_dir (Path): Directory holding the catalog.
+        model (str): Model, or a glob of them, "*" for all.
+        languages (List[str], optional): Language short names, None or ["ALL"] for all.
+
+    Returns:
+        pd.DataFrame: One row per run, with its name, model, language, config, scoring,
+            evaluation time, files and summary counts. The file paths are resolved against
+            `catalog_dir`.
+    """
+    query = "SELECT * FROM runs WHERE model GLOB ?"
+    params = [model]
+    if languages and not any(lang.upper() == "ALL" for lang in languages):
+        query += f" AND language IN ({', '.join('?' * len(languages))})"
+        params += [lang.lower() for lang in languages]
+    with sqlite3.connect(f"file:{Path(catalog_dir) / CATALOG_NAME}?mode=ro", uri=True) as db:
+        runs = pd.read_sql_query(query + " ORDER BY model, language", db, params=params)
+    for column in ("result_file", "full_result_file"):
+        runs[column] = [
+            None if path is None else str(Path(catalog_dir) / path) for path in runs[column]
+        ]
+    return runs
+
+
+def has_catalog(results_dir: Path) -> bool:
+    """Whether evaluations registered runs in `results_dir`."""
+    return (Path(results_dir) / CATALOG_NAME).is_file()
+
+
+def read_result_summary(result_file: str) -> dict:
+    """The summary counts of a top-n file written by `write_summary`, to register older runs."""
+    row = pd.read_csv(result_file, delimiter="\t").iloc[0]
+    return {column: int(row[column]) for column in SUMMARY_COLUMNS if column in row.index}
@@ -0,0 +1,140 @@
+import multiprocessing as mp
+import os
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from malco.io.full_results import GOLD_TYPE
+from malco.model.language import Language
+from malco.process.selection import PROMPT_FILE_RE
+
+# The schema of the published prompt datasets, one file per language
+PROMPT_SCHEMA = pa.schema([("id", pa.string()), ("prompt", pa.string()), ("gold", GOLD_TYPE)])
+# Disease IDs and names repeat across prompts, prompts and their file names do not
+DICTIONARY_COLUMNS = ["gold.disease_id", "gold.disease_name"]
+DEFAULT_ROW_GROUP_SIZE = 2048
+
+
+def dataset_file(out_dir: Path, lang: str) -> Path:
+    """Where the dataset of a language is written, out_dir/<lang>/<lang>_hf_prompts.parquet."""
+    return Path(out_dir) / lang / f"{lang}_hf_prompts.parquet"
+
+
+def prompt_languages(prompt_dir: Path) -> List[str]:
+    """The languages with a prompt directory, e.g. prompts/en and prompts/de."""
+    return sorted(
+        path.name
+        for path in Path(prompt_dir).iterdir()
+        if path.is_dir() and path.name.upper() in Language.__members__
+    )
+
+
+def read_gold_labels(path: str) -> Dict[str, dict]:
+    """
+    Read the correct diagnoses of a `correct_results.tsv`, to label the prompts of every language.
+
+    Args:
+        path (str): Path to the gold file, with the disease name, disease ID and prompt file
+            name of every case, and no header.
+
+    Returns:
+        Dict[str, dict]: The `disease_id` and `disease_name` of every phenopacket ID.
+    """
+    gold = pd.read_csv(path, sep="\t", header=None, names=["disease_name", "disease_id", "id"])
+    keys = gold["id"].str.extract(PROMPT_FILE_RE)["ppkt_id"].fillna(gold["id"])
+    return {
+        key: {"disease_id": disease_id, "disease_name": disease_name}
+        for key, disease_id, disease_name in zip(keys, gold["disease_id"], gold["disease_name"])
+    }
+
+
+def _prompt_rows(lang_dir: Path, gold: Dict[str, dict]) -> Iterator[Tuple[str, str, dict]]:
+    for prompt_file in sorted(lang_dir.glob("*.txt")):
+        match = PROMPT_FILE_RE.match(prompt_file.name)
+        key = match["ppkt_id"] if match else prompt_file.name
+        yield prompt_file.name, prompt_file.read_text(encoding="utf-8"), gold.get(key)
+
+
+def write_language_dataset(
+    lang_dir: Path, out_file: Path, gold: Dict[str, dict], row_group_size: int
+) -> Tuple[int, int]:
+    """
+    Stream the prompt files of one language into a Parquet file, one row group at a time.
+
+    Only one row group of prompts is in memory at any time. The file is written next to
+    `out_file` and moved into place once complete.
+
+    Args:
+        lang_dir (Path): Directory of the prompt files of the language.
+        out_file (Path): The Parquet file.
+        gold (Dict[str, dict]): Correct diagnoses by phenopacket ID, see `read_gold_labels`.
+        row_group_size (int): Prompts per row group.
+
+    Returns:
+        Tuple[int, int]: Number of prompts, and of prompts without a correct diagnosis.
+    """
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_file.with_name(f"{out_file.name}.tmp")
+    rows = unlabelled = 0
+    prompt_rows = _prompt_rows(lang_dir, gold)
+    with pq.ParquetWriter(
+        tmp, PROMPT_SCHEMA, use_dictionary=DICTIONARY_COLUMNS, compression="zstd"
+    ) as writer:
+        while batch := list(islice(prompt_rows, row_group_size)):
+            ids, prompts, labels = zip(*batch)
+            writer.write_table(
+                pa.Table.from_pydict(
+                    {"id": ids, "prompt": prompts, "gold": labels}, schema=PROMPT_SCHEMA
+                ),
+                row_group_size=row_group_size,
+            )
+            rows += len(batch)
+            unlabelled += sum(label is None for label in labels)
+    os.replace(tmp, out_file)
+    return rows, unlabelled
+
+
+def _write_language(args) -> Tuple[str, int, int]:
+    lang, lang_dir, out_file, gold, row_group_size = args
+    return (lang, *write_language_dataset(lang_dir, out_file, gold, row_group_size))
+
+
+def build_datasets(
+    prompt_dir: Path,
+    out_dir: Path,
+    languages: Optional[List[str]] = None,
+    gold_file: Optional[str] = None,
+    cores: int = 1,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> Iterator[Tuple[str, int, int]]:
+    """
+    Build the Parquet prompt dataset of every language, in parallel.
+
+    Args:
+        prompt_dir (Path): Directory with one prompt directory per language.
+        out_dir (Path): Output directory, see `dataset_file`.
+        languages (List[str], optional): Language short names, default is all of `prompt_dir`.
+        gold_file (str, optional): Gold file, default is prompt_dir/correct_results.tsv.
+        cores (int): Number of worker processes, at most one per language.
+        row_group_size (int): Prompts per row group.
+
+    Yields:
+        Tuple[str, int, int]: The language, its number of prompts and of prompts without a
+            correct diagnosis, as every language is done.
+    """
+    prompt_dir = Path(prompt_dir)
+    languages = languages or prompt_languages(prompt_dir)
+    gold = read_gold_labels(gold_file or prompt_dir / "correct_results.tsv")
+    tasks = [
+        (lang, prompt_dir / lang, dataset_file(out_dir, lang), gold, row_group_size)
+        for lang in languages
+    ]
+    if cores > 1 and len(tasks) > 1:
+        with mp.Pool(min(cores, len(tasks))) as pool:
+            yield from pool.imap_unordered(_write_language, tasks)
+    else:
+        yield from map(_write_language, tasks)
@@ -0,0 +1,240 @@
+import ast
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+FULL_RESULT_LIST_COLUMNS = ("gold", "grounding", "scored")
+PARQUET_SUFFIXES = (".parquet", ".pq")
+
+GOLD_TYPE = pa.struct([("disease_id", pa.string()), ("disease_name", pa.string())])
+GROUNDING_TYPE = pa.list_(
+    pa.struct(
+        [
+            ("text", pa.string()),
+            ("groundings", pa.list_(pa.struct([("id", pa.string()), ("label", pa.string())]))),
+        ]
+    )
+)
+SCORED_TYPE = pa.list_(
+    pa.struct(
+        [
+            ("rank", pa.int64()),
+            ("grounded_id", pa.string()),
+            ("grounded_score", pa.float64()),
+            ("strict_score", pa.float64()),
+            ("is_correct", pa.bool_()),
+        ]
+    )
+)
+
+
+def is_parquet(path) -> bool:
+    """Whether a full results file is stored as Parquet, judging from its suffix."""
+    return str(path).endswith(PARQUET_SUFFIXES)
+
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    arrays = {}
+    for col in df.columns:
+        values = df[col]
+        if col == "gold":
+            arrays[col] = pa.array(
+                [gold if isinstance(gold, dict) and gold else None for gold in values],
+                type=GOLD_TYPE,
+            )
+        elif col == "grounding":
+            arrays[col] = pa.array(
+                [
+                    (
+                        [
+                            {
+                                "text": text,
+                                "groundings": [{"id": i, "label": lbl} for i, lbl in grounded],
+                            }
+                            for text, grounded in grounding
+                        ]
+                        if isinstance(grounding, list)
+                        else None
+                    )
+                    for grounding in values
+                ],
+                type=GROUNDING_TYPE,
+            )
+        elif col == "scored":
+            arrays[col] = pa.array(
+                [scored if isinstance(scored, list) else None for scored in values],
+                type=SCORED_TYPE,
+            )
+        else:
+            arrays[col] = pa.array(values.tolist())
+    return pa.table(arrays)
+
+
+def _from_arrow(table: pa.Table) -> pd.DataFrame:
+    data = {}
+    for col in table.column_names:
+        if col == "grounding":
+            data[col] = [
+                (
+                    [
+                        (g["text"], [(x["id"], x["label"]) for x in g["groundings"]])
+                        for g in grounding
+                    ]
+                    if grounding is not None
+                    else None
+                )
+                for grounding in table.column(col).to_pylist()
+            ]
+        elif col in FULL_RESULT_LIST_COLUMNS:
+            data[col] = table.column(col).to_pylist()
+        else:
+            data[col] = table.column(col).to_pandas()
+    return pd.DataFrame(data)
+
+
+def write_full_results(df: pd.DataFrame, path: str) -> None:
+    """
+    Write the full results, as Parquet if `path` ends in .parquet, as TSV otherwise.
+
+    In Parquet, `gold`, `grounding` and `scored` are stored as nested columns instead of
+    Python representations of lists of dicts.
+
+    Args:
+        df (pd.DataFrame): The full results.
+        path (str): Path to the output file.
+    """
+    if is_parquet(path):
+        pq.write_table(_to_arrow(df), path)
+    else:
+        df.to_csv(path, sep="\t", index=False)
+
+
+class FullResultsWriter:
+    """
+    Write full results batch by batch, to the same file `write_full_results` would write at once.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Path to the output file, Parquet if it ends in .parquet, TSV otherwise.
+        """
+        self.path = path
+        self.rows = 0
+        self._parquet_writer = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        """Append a batch of full results."""
+        if is_parquet(self.path):
+            table = _to_arrow(df)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                # Columns that are all null in a batch do not get their type inferred
+                table = table.cast(self._parquet_writer.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            first = self.rows == 0
+            df.to_csv(self.path, sep="\t", index=False, header=first, mode="w" if first else "a")
+        self.rows += len(df)
+
+    def close(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def __enter__(self) -> "FullResultsWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def read_full_results(
+    path: str, columns: Optional[List[str]] = None, filters: Optional[list] = None
+) -> pd.DataFrame:
+    """
+    Read a full results file written by `malco evaluate`, either TSV or Parquet.
+
+    Args:
+        path (str): Path to the full results file.
+        columns (List[str], optional): Only read these columns.
+        filters (list, optional): Row filters in the `pyarrow.parquet.read_table` format,
+            e.g. `[("metadata", "in", ids)]`. With Parquet they are pushed down to the reader.
+
+    Returns:
+        pd.DataFrame: The full results, with the `gold`, `grounding` and `scored` cells parsed.
+    """
+    if is_parquet(path):
+        return _from_arrow(
+            pq.read_table(path, columns=columns, filters=_to_expression(filters or []))
+        )
+    df = pd.read_csv(path, sep="\t", usecols=columns)
+    if filters:
+        df = _filter_rows(df, filters)
+    for col in FULL_RESULT_LIST_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].apply(lambda x: ast.literal_eval(x) if isinstance(x, str) else None)
+    return df.reset_index(drop=True)
+
+
+def _to_expression(filters: list) -> pc.Expression:
+    """Convert (column, op, value) filters to an Arrow expression, allowing empty "in" sets."""
+    expression = pc.scalar(True)
+    for col, op, value in filters:
+        if op in ("in", "not in") and len(value) == 0:
+            expression = expression & pc.scalar(op == "not in")
+        else:
+            expression = expression & pq.filters_to_expression([(col, op, value)])
+    return expression
+
+
+def _filter_rows(df: pd.DataFrame, filters: list) -> pd.DataFrame:
+    """Apply (column, op, value) filters to an in-memory DataFrame, the way Arrow would."""
+    table = pa.table({col: pa.array(df[col].tolist()) for col in {c for c, _, _ in filters}})
+    table = table.append_column("__row", pa.array(np.arange(len(df))))
+    rows = table.filter(_to_expression(filters)).column("__row").to_numpy()
+    return df.iloc[rows]
+
+
+def read_scored_table(
+    path: str, filters: Optional[list] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Read the cases and their scored diagnoses as a flat long table.
+
+    With Parquet the nested `scored` column is flattened by Arrow, without building a Python
+    object per diagnosis.
+
+    Args:
+        path (str): Path to the full results file.
+        filters (list, optional): Row filters, see `read_full_results`.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The cases (their `metadata`) and the long table of
+            their scored diagnoses, whose `case` column is the positional index of the case.
+    """
+    from malco.process.summary import scored_table
+
+    if not is_parquet(path):
+        df = read_full_results(path, columns=["metadata", "scored"], filters=filters)
+        return df[["metadata"]], scored_table(df)
+    table = pq.read_table(
+        path, columns=["metadata", "scored"], filters=_to_expression(filters or [])
+    )
+    scored = table.column("scored").combine_chunks()
+    flat = pc.list_flatten(scored)
+    long = pd.DataFrame(
+        {
+            field.name: flat.field(i).to_numpy(zero_copy_only=False)
+            for i, field in enumerate(flat.type)
+        }
+    )
+    long["is_correct"] = long["is_correct"].astype(bool)
+    long["case"] = pc.list_parent_indices(scored).to_numpy()
+    long["position"] = long.groupby("case").cumcount() + 1
+    return table.select(["metadata"]).to_pandas(), long
@@ -0,0 +1,142 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from malco.constants import CACHE_DIR
+
+HPOA_COLUMNS = ["database_id", "disease_name", "hpo_id", "reference", "aspect", "biocuration"]
+# Bump whenever the summary changes, so that cached summaries are computed again
+SUMMARY_VERSION = "1"
+_DATE_RE = r"\[(\d{4}-\d{2}-\d{2})\]"
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_hpoa(path: str) -> pd.DataFrame:
+    """
+    Read the annotations of a phenotype.hpoa file, skipping its #-commented header.
+
+    Args:
+        path (str): Path to the HPOA file.
+
+    Returns:
+        pd.DataFrame: The `HPOA_COLUMNS` of every annotation.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        comments = 0
+        while f.readline().startswith("#"):
+            comments += 1
+    return pd.read_csv(
+        path, sep="\t", skiprows=comments, usecols=HPOA_COLUMNS, dtype=str, keep_default_na=False
+    )
+
+
+def read_information_content(path: str) -> Dict[str, float]:
+    """
+    Read the information content of HPO terms, as computed by `runoak information-content`.
+
+    Every line holds a term and, last, its information content. Lines that do not end in a
+    number, e.g. a header, are skipped.
+    """
+    ic = {}
+    with open(path, "r") as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 2:
+                continue
+            try:
+                ic[fields[0]] = float(fields[-1])
+            except ValueError:
+                continue
+    return ic
+
+
+def disease_summary(hpoa: pd.DataFrame, ic: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """
+    Summarise the annotations of every disease, all diseases at once.
+
+    Args:
+        hpoa (pd.DataFrame): The annotations, see `read_hpoa`.
+        ic (Dict[str, float], optional): Information content of HPO terms, see
+            `read_information_content`.
+
+    Returns:
+        pd.DataFrame: Indexed by disease ID, with its `disease_name`, `earliest_curation` and
+            `latest_curation` dates, the number of `annotations`, of distinct `phenotypes` (P
+            aspect) and of `references`. With `ic`, also the `mean_ic`, `max_ic` and
+            `sum_ic` of its distinct phenotypes, and the number without an IC in `missing_ic`.
+    """
+    grouped = hpoa.groupby("database_id", sort=True)
+    summary = pd.DataFrame(
+        {
+            "disease_name": grouped["disease_name"].first(),
+            "annotations": grouped.size(),
+            "references": grouped["reference"].nunique(),
+        }
+    )
+    dates = hpoa["biocuration"].str.extractall(_DATE_RE)[0]
+    dates = pd.to_datetime(dates, format="%Y-%m-%d", errors="coerce")
+    by_disease = dates.groupby(hpoa["database_id"].to_numpy()[dates.index.get_level_values(0)])
+    summary["earliest_curation"] = by_disease.min()
+    summary["latest_curation"] = by_disease.max()
+    phenotypes = hpoa.loc[hpoa["aspect"] == "P", ["database_id", "hpo_id"]].drop_duplicates()
+    summary["phenotypes"] = (
+        phenotypes.groupby("database_id").size().reindex(summary.index, fill_value=0)
+    )
+    if ic is not None:
+        values = phenotypes["hpo_id"].map(ic)
+        stats = values.groupby(phenotypes["database_id"]).agg(["mean", "max", "sum", "count"])
+        stats = stats.reindex(summary.index)
+        summary["mean_ic"] = stats["mean"]
+        summary["max_ic"] = stats["max"]
+        # Diseases without any known IC get no sum, rather than a sum of 0
+        summary["sum_ic"] = stats["sum"].where(stats["count"] > 0, np.nan)
+        summary["missing_ic"] = summary["phenotypes"] - stats["count"].fillna(0).astype(int)
+    return summary.rename_axis("disease_id")
+
+
+def load_disease_summary(
+    hpoa_path: str, ic_path: Optional[str] = None, cache_dir: Path = CACHE_DIR
+) -> pd.DataFrame:
+    """
+    The summary of every disease of an HPOA file, computed once per HPOA and IC file.
+
+    Summaries are cached as Parquet, keyed on the hash of the files, so that repeated
+    analyses of the same HPOA release read a table of a few thousand rows instead of parsing
+    every annotation.
+
+    Args:
+        hpoa_path (str): Path to the HPOA file.
+        ic_path (str, optional): Path to the information content of HPO terms.
+        cache_dir (Path): Directory holding the cached summaries.
+
+    Returns:
+        pd.DataFrame: See `disease_summary`.
+    """
+    key = hashlib.sha256(
+        "|".join(
+            [SUMMARY_VERSION, file_hash(hpoa_path), file_hash(ic_path) if ic_path else ""]
+        ).encode()
+    ).hexdigest()[:16]
+    cache_file = Path(cache_dir) / f"hpoa_summary_{key}.parquet"
+    if cache_file.is_file():
+        return pd.read_parquet(cache_file)
+    summary = disease_summary(
+        read_hpoa(hpoa_path), read_information_content(ic_path) if ic_path else None
+    )
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_file.with_name(f"{cache_file.name}.tmp")
+    summary.to_parquet(tmp)
+    os.replace(tmp, cache_file)
+    return summary
@@ -0,0 +1,237 @@
+import multiprocessing as mp
+import os
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from malco.io.pubmed import parse_pmid
+from malco.io.reading import json_loads
+from malco.process.selection import ppkt_file_id
+
+# Next to the phenopackets, like the manifest of rendered plots
+PPKT_INDEX_NAME = ".ppkt_index.parquet"
+PPKT_INDEX_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        # The ID in the form of prompt file names, to join with evaluation results
+        ("case_id", pa.string()),
+        # Relative to the indexed directory
+        ("filename", pa.string()),
+        ("pmids", pa.list_(pa.int64())),
+        ("disease_ids", pa.list_(pa.string())),
+        ("disease_labels", pa.list_(pa.string())),
+        ("hpo_terms", pa.list_(pa.string())),
+        ("excluded_hpo_terms", pa.list_(pa.string())),
+        ("mtime_ns", pa.int64()),
+        ("size", pa.int64()),
+    ]
+)
+# Phenopackets parsed per task of the process pool
+_CHUNK_SIZE = 256
+
+
+class IndexUpdate(NamedTuple):
+    """What an update of the phenopacket index did."""
+
+    parsed: int
+    unchanged: int
+    removed: int
+    failed: List[str]
+
+
+def default_index_path(ppkt_dir: Path) -> Path:
+    return Path(ppkt_dir) / PPKT_INDEX_NAME
+
+
+def ppkt_record(ppkt_dir: Path, filename: str) -> dict:
+    """
+    The indexed fields of a phenopacket.
+
+    Args:
+        ppkt_dir (Path): The indexed directory.
+        filename (str): Path of the phenopacket JSON file, relative to `ppkt_dir`.
+
+    Returns:
+        dict: A row of the index, see `PPKT_INDEX_SCHEMA`.
+    """
+    path = Path(ppkt_dir) / filename
+    stat = path.stat()
+    ppkt = json_loads(path.read_bytes())
+    references = ppkt.get("metaData", {}).get("externalReferences", [])
+    pmids = {parse_pmid(reference.get("id", "")) for reference in references}
+    diseases = [disease.get("term", {}) for disease in ppkt.get("diseases", [])]
+    features = ppkt.get("phenotypicFeatures", [])
+    return {
+        "id": ppkt.get("id"),
+        "case_id": ppkt_file_id(ppkt["id"]) if ppkt.get("id") else None,
+        "filename": filename,
+        "pmids": sorted(pmid for pmid in pmids if pmid is not None),
+        "disease_ids": [term.get("id") for term in diseases],
+        "disease_labels": [term.get("label") for term in diseases],
+        "hpo_terms": [f["type"]["id"] for f in features if not f.get("excluded", False)],
+        "excluded_hpo_terms": [f["type"]["id"] for f in features if f.get("excluded", False)],
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+    }
+
+
+def _parse_chunk(args) -> Tuple[List[dict], List[str]]:
+    ppkt_dir, filenames = args
+    records, failed = [], []
+    for filename in filenames:
+        try:
+            records.append(ppkt_record(ppkt_dir, filename))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            failed.append(filename)
+    return records, failed
+
+
+def _parse_files(ppkt_dir: Path, filenames: List[str], cores: int) -> Tuple[List[dict], List[str]]:
+    """Parse phenopackets on a process pool, returning their records and the failed files."""
+    tasks = [
+        (ppkt_dir, filenames[i : i + _CHUNK_SIZE]) for i in range(0, len(filenames), _CHUNK_SIZE)
+    ]
+    if cores > 1 and len(tasks) > 1:
+        with mp.Pool(min(cores, len(tasks))) as pool:
+            results = pool.map(_parse_chunk, tasks)
+    else:
+        results = [_parse_chunk(task) for task in tasks]
+    records = [record for chunk_records, _ in results for record in chunk_records]
+    failed = [filename for _, chunk_failed in results for filename in chunk_failed]
+    return records, failed
+
+
+def _scan(ppkt_dir: Path) -> Dict[str, Tuple[int, int]]:
+    """The (mtime, size) of every phenopacket JSON file under `ppkt_dir`, by relative path."""
+    files = {}
+    for root, _, names in os.walk(ppkt_dir):
+        for name in names:
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(root, name))
+                filename = os.path.relpath(os.path.join(root, name), ppkt_dir)
+                files[filename] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def update_ppkt_index(
+    ppkt_dir: Path, index_path: Optional[Path] = None, cores: int = 1, force: bool = False
+) -> IndexUpdate:
+    """
+    Index the phenopackets of a directory, parsing only those new or changed since the last
+    update.
+
+    Files are matched to the index by path, modification time and size. Phenopackets whose
+    file is gone are dropped from the index, and new or changed ones are parsed on a process
+    pool.
+
+    Args:
+        ppkt_dir (Path): Directory of phenopacket JSON files, searched recursively.
+        index_path (Path, optional): The index, default is `PPKT_INDEX_NAME` in `ppkt_dir`.
+        cores (int): Number of worker processes.
+        force (bool): Parse every phenopacket again.
+
+    Returns:
+        IndexUpdate: Number of phenopackets parsed, unchanged and removed, and the files that
+            are not valid phenopackets.
+    """
+    index_path = Path(index_path or default_index_path(ppkt_dir))
+    files = _scan(ppkt_dir)
+    previous = (
+        read_ppkt_index(index_path)
+        if index_path.is_file() and not force
+        else pd.DataFrame(columns=PPKT_INDEX_SCHEMA.names)
+    )
+    current = np.array(
+        [
+            files.get(filename) == (mtime_ns, size)
+            for filename, mtime_ns, size in zip(
+                previous["filename"], previous["mtime_ns"], previous["size"]
+            )
+        ],
+        dtype=bool,
+    )
+    unchanged = previous[current]
+    records, failed = _parse_files(ppkt_dir, sorted(set(files) - set(unchanged["filename"])), cores)
+    table = pa.concat_tables(
+        [
+            pa.Table.from_pandas(unchanged, schema=PPKT_INDEX_SCHEMA, preserve_index=False),
+            pa.Table.from_pylist(records, schema=PPKT_INDEX_SCHEMA),
+        ]
+    ).sort_by("filename")
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = index_path.with_name(f"{index_path.name}.tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, index_path)
+    removed = len(set(previous["filename"]) - set(files))
+    return IndexUpdate(len(records), len(unchanged), removed, failed)
+
+
+def read_ppkt_index(index_path: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read the phenopacket index, to look up phenopackets without reading their JSON files.
+
+    Args:
+        index_path (Path): The index, see `update_ppkt_index`.
+        columns (List[str], optional): Only read these columns.
+
+    Returns:
+        pd.DataFrame: One row per phenopacket, with list columns as arrays.
+    """
+    return pq.read_table(index_path, columns=columns).to_pandas()
+
+
+def load_ppkt_index(
+    ppkt_dir: Path, columns: Optional[List[str]] = None, cores: int = 1
+) -> pd.DataFrame:
+    """
+    Bring the index of a phenopacket directory up to date and read it, for analyses that
+    would otherwise load every JSON file.
+
+    Args:
+        ppkt_dir (Path): Directory of phenopacket JSON files, searched recursively.
+        columns (List[str], optional): Only read these columns.
+        cores (int): Number of worker processes.
+
+    Returns:
+        pd.DataFrame: See `read_ppkt_index`.
+    """
+    index_path = default_index_path(ppkt_dir)
+    update_ppkt_index(Path(ppkt_dir), index_path, cores)
+    return read_ppkt_index(index_path, columns)
+
+
+def ppkt_pmids(
+    ppkt_dir: Path, index_path: Optional[Path] = None, cores: int = 1
+) -> Dict[str, List[int]]:
+    """
+    The PMIDs of the publications of every phenopacket under `ppkt_dir`, searched recursively.
+
+    PMIDs come from the metaData.externalReferences of the phenopackets, taken from the index
+    when the directory has one, which is updated first, and else read from the JSON files.
+    Phenopackets without a PMID reference fall back to the PMID in their file name.
+
+    Args:
+        ppkt_dir (Path): Directory of phenopacket JSON files.
+        index_path (Optional[Path]): Index file, default is the one of `default_index_path`.
+        cores (int): Number of worker processes.
+
+    Returns:
+        Dict[str, List[int]]: PMIDs by phenopacket file, relative to `ppkt_dir`. Files that are
+            not valid phenopackets are left out.
+    """
+    index_path = index_path or default_index_path(ppkt_dir)
+    if index_path.is_file():
+        update_ppkt_index(ppkt_dir, index_path, cores)
+        index = read_ppkt_index(index_path, columns=["filename", "pmids"])
+        pmids = {filename: list(ids) for filename, ids in zip(index["filename"], index["pmids"])}
+    else:
+        records, _ = _parse_files(ppkt_dir, sorted(_scan(ppkt_dir)), cores)
+        pmids = {record["filename"]: record["pmids"] for record in records}
+    for filename, ids in pmids.items():
+        if not ids and parse_pmid(Path(filename).name) is not None:
+            pmids[filename] = [parse_pmid(Path(filename).name)]
+    return pmids
@@ -0,0 +1,232 @@
+import gzip
+import json
+import re
+import sqlite3
+import xml.etree.ElementTree as ET  # noqa: S405, only parses PubMed dumps from NCBI
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from malco.constants import CACHE_DIR
+
+PUBMED_CACHE_NAME = "pubmed_dates.sqlite"
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    pmid INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS articles_date ON articles (date);
+"""
+# PMIDs looked up per query, below SQLite's limit on query parameters
+_LOOKUP_SIZE = 900
+_PMID_RE = re.compile(r"PMID[:_]?\s*(\d+)", re.IGNORECASE)
+_MEDLINE_FIELD_RE = re.compile(r"^([A-Z]{2,4})\s*-\s(.*)$")
+MEDLINE_SUFFIXES = (".txt", ".nbib", ".medline")
+_MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+
+# (PMID, ISO date of the article)
+PubMedDate = Tuple[int, str]
+
+
+def parse_pmid(value) -> Optional[int]:
+    """
+    The PMID of "PMID:123", "PMID_123", "123" or 123, None if there is none.
+
+    Phenopacket file names hold the PMID of their publication, e.g. "PMID_36586412_8.json".
+    """
+    if isinstance(value, int):
+        return value
+    value = str(value).strip()
+    if value.isdigit():
+        return int(value)
+    match = _PMID_RE.search(value)
+    return int(match.group(1)) if match else None
+
+
+class PubMedCache:
+    """
+    Local store of the dates PubMed articles entered PubMed, for offline leakage filtering.
+
+    Imports only add the PMIDs missing from the store, unless told to replace them, so that
+    dumps and older date files can be imported in any order and any number of times.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR):
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self.path = Path(cache_dir) / PUBMED_CACHE_NAME
+        self.db = sqlite3.connect(self.path, timeout=30)
+        self.db.executescript(_SCHEMA)
+
+    def add(self, dates: Iterable[PubMedDate], source: str, replace: bool = False) -> int:
+        """
+        Store article dates.
+
+        Args:
+            dates (Iterable[PubMedDate]): (PMID, ISO date) pairs, e.g. from `iter_pubmed_xml`.
+            source (str): Where the dates come from, e.g. the name of the dump.
+            replace (bool): Also replace the dates of PMIDs already in the store.
+
+        Returns:
+            int: Number of PMIDs added or replaced.
+        """
+        conflict = "REPLACE" if replace else "IGNORE"
+        before = self.db.total_changes
+        with self.db:
+            self.db.executemany(
+                f"INSERT OR {conflict} INTO articles VALUES (?, ?, ?)",
+                ((pmid, article_date, source) for pmid, article_date in dates),
+            )
+        return self.db.total_changes - before
+
+    def dates(self, pmids: Iterable) -> Dict[int, str]:
+        """The ISO dates of the PMIDs in the store, missing PMIDs are left out."""
+        pmids = sorted({pmid for pmid in map(parse_pmid, pmids) if pmid is not None})
+        found = {}
+        for start in range(0, len(pmids), _LOOKUP_SIZE):
+            batch = pmids[start : start + _LOOKUP_SIZE]
+            found.update(
+                self.db.execute(
+                    f"SELECT pmid, date FROM articles WHERE pmid IN ({', '.join('?' * len(batch))})",
+                    batch,
+                )
+            )
+        return found
+
+    def missing(self, pmids: Iterable) -> List[int]:
+        """The PMIDs not in the store yet, e.g. to fetch them from PubMed."""
+        pmids = {pmid for pmid in map(parse_pmid, pmids) if pmid is not None}
+        return sorted(pmids - set(self.dates(pmids)))
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "PubMedCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _open_text(path: str):
+    return gzip.open(path, "rb") if str(path).endswith(".gz") else open(path, "rb")
+
+
+def _iso_date(year: str, month: str = "1", day: str = "1") -> str:
+    # Months are numbers in the history of an article, but names in some other PubMed dates
+    month = str(month)
+    if not month.isdigit():
+        month = _MONTHS.index(month[:3].lower()) + 1
+    return date(int(year), int(month), int(day or 1)).isoformat()
+
+
+def iter_pubmed_xml(path: str) -> Iterator[PubMedDate]:
+    """
+    Stream the article dates of a PubMed baseline or update file, e.g. pubmed25n0001.xml.gz.
+
+    The date is when the article entered PubMed, its "entrez" history date, the one the
+    leakage experiment used, and else its "pubmed" date. Articles are dropped from the tree
+    once read, so memory does not grow with the size of the file.
+
+    Yields:
+        PubMedDate: The PMID and ISO date of every dated article.
+    """
+    with _open_text(path) as f:
+        root = None
+        for event, element in ET.iterparse(f, events=("start", "end")):  # noqa: S314
+            if root is None:
+                root = element
+            if event != "end" or element.tag != "PubmedArticle":
+                continue
+            pmid = element.findtext("MedlineCitation/PMID")
+            dates = {
+                history.get("PubStatus"): history
+                for history in element.iterfind("PubmedData/History/PubMedPubDate")
+            }
+            history = dates.get("entrez", dates.get("pubmed"))
+            if pmid and history is not None:
+                yield int(pmid), _iso_date(
+                    history.findtext("Year"), history.findtext("Month"), history.findtext("Day")
+                )
+            # Also drop the cleared articles from the root, which keeps a reference to them
+            root.clear()
+
+
+def iter_medline(path: str) -> Iterator[PubMedDate]:
+    """
+    Stream the article dates of a MEDLINE text file, from its PMID and EDAT (entrez) fields.
+
+    Yields:
+        PubMedDate: The PMID and ISO date of every dated article.
+    """
+    pmid = None
+    with _open_text(path) as f:
+        for raw_line in f:
+            match = _MEDLINE_FIELD_RE.match(raw_line.decode("utf-8", errors="replace").rstrip())
+            if not match:
+                continue
+            field, value = match.groups()
+            if field == "PMID":
+                pmid = int(value)
+            elif field == "EDAT" and pmid is not None:
+                yield pmid, _iso_date(*value.split()[0].split("/"))
+                pmid = None
+
+
+def iter_date_json(path: str) -> Iterator[PubMedDate]:
+    """
+    Read the dates of a pmid2date_dict.json, as written by analysis/PMID_to_date_extractor.py.
+
+    Yields:
+        PubMedDate: The PMID and ISO date of every entry, e.g. {"PMID:123": {"date":
+            "2019-05-01 00:00:00"}} gives (123, "2019-05-01").
+    """
+    with open(path, "r") as f:
+        content = json.load(f)
+    for key, value in content.items():
+        raw_date = value.get("date") if isinstance(value, dict) else value
+        pmid = parse_pmid(key)
+        if pmid is not None and raw_date:
+            yield pmid, str(raw_date).split(" ")[0].split("T")[0]
+
+
+def iter_dates(path: str) -> Iterator[PubMedDate]:
+    """Stream the article dates of any supported file, judging from its name."""
+    name = str(path).removesuffix(".gz")
+    if name.endswith(".json"):
+        return iter_date_json(path)
+    if name.endswith(MEDLINE_SUFFIXES):
+        return iter_medline(path)
+    return iter_pubmed_xml(path)
+
+
+def published_after(
+    cache: PubMedCache, pmids: Mapping[str, Iterable], cutoff: str
+) -> Tuple[List[str], List[str]]:
+    """
+    Split phenopackets by the date of their publication, to leave out those a model may have
+    seen in training.
+
+    A phenopacket citing several publications counts from the earliest of them.
+
+    Args:
+        cache (PubMedCache): The article dates.
+        pmids (Mapping[str, Iterable]): The PMIDs of every phenopacket, by name, see
+            `malco.io.ppkt_index.ppkt_pmids`.
+        cutoff (str): ISO date, e.g. the training cutoff of a model.
+
+    Returns:
+        Tuple[List[str], List[str]]: The names published after `cutoff`, and the names whose
+            date is unknown.
+    """
+    dates = cache.dates(pmid for ids in pmids.values() for pmid in ids)
+    earliest = {}
+    for name, ids in pmids.items():
+        known = [dates[pmid] for pmid in map(parse_pmid, ids) if pmid in dates]
+        earliest[name] = min(known) if known else None
+    after = [name for name, first in earliest.items() if first is not None and first > cutoff]
+    unknown = [name for name, first in earliest.items() if first is None]
+    return after, unknown
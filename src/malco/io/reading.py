@@ -1,11 +1,58 @@
+import gzip
 import json
 import os
 import shutil
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Set
 
+import pandas as pd
 import yaml
 
+from malco.io.full_results import is_parquet, read_full_results
+
+# Parses JSON from str or bytes, with orjson when it is installed, as the readers of JSONL and
+# phenopacket files do
+try:
+    import orjson
+
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# The fields of a response record needed for evaluation, leaving out the prompt
+RESPONSE_FIELDS = ("id", "response", "gold")
+OFFSET_INDEX_SUFFIX = ".offsets.json"
+
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+# C0 control characters other than tab, line feed and carriage return, e.g. the \x04 OntoGPT leaves
+_YAML_CONTROL_CHARS = dict.fromkeys(c for c in range(32) if chr(c) not in "\t\n\r")
+
+
+class _ControlCharFilter:
+    """Text stream wrapper dropping, while reading, the control characters YAML does not allow."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def read(self, size: int = -1) -> str:
+        return self.stream.read(size).translate(_YAML_CONTROL_CHARS)
+
+
+def iter_raw_result_yaml(raw_result_path: Path) -> Iterator[dict]:
+    """
+    Stream the documents of a raw OntoGPT result file, one at a time.
+
+    Uses the libyaml loader when PyYAML was built with it.
+
+    Args:
+        raw_result_path (Path): Path to the raw result file.
+
+    Yields:
+        dict: One document of the raw result file.
+    """
+    with open(raw_result_path, "r") as raw_result:
+        yield from yaml.load_all(_ControlCharFilter(raw_result), Loader=_YAML_LOADER)
+
 
 def read_raw_result_yaml(raw_result_path: Path) -> List[dict]:
     """
@@ -17,10 +64,53 @@ def read_raw_result_yaml(raw_result_path: Path) -> List[dict]:
     Returns:
         dict: Contents of the raw result file.
     """
-    with open(raw_result_path, "r") as raw_result:
-        return list(
-            yaml.safe_load_all(raw_result.read().replace("\x04", ""))
-        )  # Load and convert to list
+    return list(iter_raw_result_yaml(raw_result_path))
+
+
+def convert_raw_result_yaml(raw_result_path: Path, output_path: Path) -> int:
+    """
+    Convert a raw OntoGPT result file to JSONL, which `iter_result_json` reads much faster.
+
+    Args:
+        raw_result_path (Path): Path to the raw result file.
+        output_path (Path): Path to the JSONL file to write.
+
+    Returns:
+        int: The number of documents converted.
+    """
+    count = 0
+    with open(output_path, "w") as output:
+        for document in iter_raw_result_yaml(raw_result_path):
+            # YAML can hold dates, which JSON cannot
+            output.write(json.dumps(document, default=str) + "\n")
+            count += 1
+    return count
+
+
+def open_jsonl(path: str, mode: str = "rb"):
+    """Open a JSONL file, gzip-compressed if its name ends in .gz."""
+    return gzip.open(path, mode) if str(path).endswith(".gz") else open(path, mode)
+
+
+def iter_result_json(path: str, fields: Optional[Iterable[str]] = None) -> Iterator[dict]:
+    """
+    Stream the records of a response JSONL file, one line at a time.
+
+    Args:
+        path (str): Path to the response file, optionally gzip-compressed.
+        fields (Iterable[str], optional): Only keep these fields of every record, e.g.
+            `RESPONSE_FIELDS` to drop the prompts. Missing fields are set to None.
+
+    Yields:
+        dict: One record per non-empty line.
+    """
+    fields = tuple(fields) if fields is not None else None
+    with open_jsonl(path) as raw_result:
+        for line in raw_result:
+            if not line.strip():
+                continue
+            record = json_loads(line)
+            yield record if fields is None else {field: record.get(field) for field in fields}
 
 
 def read_result_json(path: str) -> List[dict]:
@@ -33,11 +123,168 @@ def read_result_json(path: str) -> List[dict]:
     Returns:
         List[dict]: Contents of the raw result file.
     """
-    responses = []
-    with open(path, "r") as raw_result:
+    return list(iter_result_json(path))
+
+
+def read_responses(path: str) -> pd.DataFrame:
+    """
+    Read the responses to evaluate, without keeping the prompts in memory.
+
+    Args:
+        path (str): Path to the response file.
+
+    Returns:
+        pd.DataFrame: The `service_answers`, `metadata` (prompt file name) and `gold` columns.
+    """
+    return _responses_frame(list(iter_result_json(path, RESPONSE_FIELDS)))
+
+
+def iter_response_batches(path: str, batch_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Stream the responses to evaluate in batches of at most `batch_size` records.
+
+    Args:
+        path (str): Path to the response file.
+        batch_size (int): Number of records per batch.
+
+    Yields:
+        pd.DataFrame: Batches in the format of `read_responses`.
+    """
+    batch = []
+    for record in iter_result_json(path, RESPONSE_FIELDS):
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield _responses_frame(batch)
+            batch = []
+    if batch:
+        yield _responses_frame(batch)
+
+
+def _responses_frame(records: List[dict]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "service_answers": [record["response"] for record in records],
+            "metadata": [record["id"] for record in records],
+            "gold": [record["gold"] for record in records],
+        }
+    )
+
+
+def _check_seekable(path: str) -> None:
+    if str(path).endswith(".gz"):
+        raise ValueError(
+            f"{path} is gzip-compressed, records can only be looked up by offset in an "
+            "uncompressed response file"
+        )
+
+
+def load_offset_index(path: str) -> Dict[str, int]:
+    """
+    Map the ID of every record of a response file to the byte offset of its line.
+
+    The index is saved next to the response file and rebuilt when the file changes. Byte
+    offsets need an uncompressed file, gzip-compressed shards can only be streamed.
+
+    Args:
+        path (str): Path to the response file.
+
+    Returns:
+        Dict[str, int]: Record ID to byte offset.
+
+    Raises:
+        ValueError: If the file is gzip-compressed.
+    """
+    _check_seekable(path)
+    stat = os.stat(path)
+    index_path = Path(f"{path}{OFFSET_INDEX_SUFFIX}")
+    if index_path.is_file():
+        with open(index_path, "rb") as f:
+            content = json_loads(f.read())
+        if content["size"] == stat.st_size and content["mtime_ns"] == stat.st_mtime_ns:
+            return content["offsets"]
+    offsets = {}
+    offset = 0
+    with open(path, "rb") as raw_result:
         for line in raw_result:
-            responses.append(json.loads(line))
-    return responses
+            if line.strip():
+                offsets[json_loads(line)["id"]] = offset
+            offset += len(line)
+    try:
+        with open(index_path, "w") as f:
+            json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "offsets": offsets}, f)
+    except OSError:
+        pass  # The index is only a shortcut, a read-only results directory is fine
+    return offsets
+
+
+def read_result_by_id(
+    path: str, record_id: str, offsets: Optional[Dict[str, int]] = None
+) -> Optional[dict]:
+    """
+    Read a single record of a response file, seeking straight to its line.
+
+    Args:
+        path (str): Path to the response file.
+        record_id (str): The record ID, i.e. the prompt file name.
+        offsets (Dict[str, int], optional): Output of `load_offset_index`, if already loaded.
+
+    Returns:
+        dict: The record, None if there is no record with this ID.
+
+    Raises:
+        ValueError: If the file is gzip-compressed.
+    """
+    _check_seekable(path)
+    if offsets is None:
+        offsets = load_offset_index(path)
+    if record_id not in offsets:
+        return None
+    with open(path, "rb") as raw_result:
+        raw_result.seek(offsets[record_id])
+        return json_loads(raw_result.readline())
+
+
+def read_gold_ids(path: str) -> Set[str]:
+    """
+    Read the correct disease IDs from a gold file.
+
+    Either a `correct_results.tsv` (disease name, disease ID and prompt file name, no header)
+    or a JSONL file whose records hold a `gold` dict or a `disease_id` field.
+
+    Args:
+        path (str): Path to the gold file.
+
+    Returns:
+        Set[str]: The correct disease IDs.
+    """
+    if str(path).endswith(".tsv"):
+        gold = pd.read_csv(path, sep="\t", header=None, names=["disease_name", "disease_id", "id"])
+        return set(gold["disease_id"].dropna())
+    gold_ids = set()
+    for record in iter_result_json(path):
+        gold = record.get("gold", record)
+        if isinstance(gold, dict) and gold.get("disease_id"):
+            gold_ids.add(gold["disease_id"])
+    return gold_ids
+
+
+def read_grounded_ids(path: str) -> Set[str]:
+    """
+    Read all grounded IDs from a full results file.
+
+    Supports the current format, with the grounded IDs inside the `scored` column, and the
+    legacy `full_df_results.tsv` format with one grounded ID per row in the `term` column.
+
+    Args:
+        path (str): Path to the full results file.
+
+    Returns:
+        Set[str]: The grounded IDs.
+    """
+    if not is_parquet(path) and "term" in pd.read_csv(path, sep="\t", nrows=0).columns:
+        return set(pd.read_csv(path, sep="\t", usecols=["term"])["term"].dropna())
+    scored = read_full_results(path, columns=["scored"])["scored"]
+    return {result["grounded_id"] for results in scored if results for result in results}
 
 
 def safe_save_tsv(path, filename, df):
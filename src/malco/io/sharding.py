@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import io
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import yaml
+
+from malco.config import MalcoConfig
+from malco.io.reading import json_loads, open_jsonl
+from malco.process.selection import PROMPT_FILE_RE
+
+SHARD_KEYS = ("lang", "model", "bucket")
+# Bytes buffered per shard before writing, so that shards are written in large blocks
+SHARD_BUFFER_SIZE = 1 << 20
+UNKNOWN = "unknown"
+
+
+def _strip_suffix(name: str) -> str:
+    return name.removesuffix(".gz").removesuffix(".jsonl")
+
+
+def bucket_of(key: str, buckets: int) -> int:
+    """
+    Hash bucket of a case, the same on every machine and Python session.
+
+    Args:
+        key (str): The phenopacket ID of the case, so that all its languages share a bucket.
+        buckets (int): Number of buckets.
+    """
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % buckets
+
+
+def shard_stem(
+    input_stem: str, lang: Optional[str], model: Optional[str], bucket: Optional[int]
+) -> str:
+    """
+    Name of a shard, following the <lang>-<model> naming of response and result files.
+
+    The model replaces the stem of the input file when sharding by model, and the bucket
+    comes last, e.g. "cs-meditron3-70b-part003".
+    """
+    parts = [lang] if lang is not None else []
+    parts.append(model if model is not None else input_stem)
+    if bucket is not None:
+        parts.append(f"part{bucket:03d}")
+    return "-".join(parts)
+
+
+def _open_shard(path: Path, compress: bool):
+    if compress:
+        return io.BufferedWriter(gzip.open(path, "wb", compresslevel=6), SHARD_BUFFER_SIZE)
+    return open(path, "wb", buffering=SHARD_BUFFER_SIZE)
+
+
+def shard_jsonl(
+    path: str,
+    out_dir: Path,
+    by: Sequence[str] = ("lang",),
+    buckets: int = 1,
+    languages: Optional[Sequence[str]] = None,
+    compress: bool = False,
+) -> Dict[Path, int]:
+    """
+    Split a response JSONL file by language, model and hash bucket, in a single pass.
+
+    The ID of every record is parsed once, and its line is copied to its shard as is. The
+    language and phenopacket ID come from the prompt file name in `id`, the model from the
+    `model` field of the record. Records missing either go to an "unknown" shard.
+
+    Args:
+        path (str): The response file, optionally gzip-compressed.
+        out_dir (Path): Directory of the shards.
+        by (Sequence[str]): Any of "lang", "model" and "bucket".
+        buckets (int): Number of hash buckets, when sharding by bucket.
+        languages (Sequence[str], optional): Only keep the records of these languages.
+        compress (bool): Write gzip-compressed shards, .jsonl.gz.
+
+    Returns:
+        Dict[Path, int]: Number of records of every shard.
+    """
+    unknown_keys = set(by) - set(SHARD_KEYS)
+    if unknown_keys:
+        raise ValueError(f"Cannot shard by {', '.join(sorted(unknown_keys))}")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    input_stem = _strip_suffix(Path(path).name)
+    suffix = ".jsonl.gz" if compress else ".jsonl"
+    shards, writers, counts = {}, {}, {}
+    try:
+        with open_jsonl(path) as raw_result:
+            for line in raw_result:
+                if not line.strip():
+                    continue
+                record = json_loads(line)
+                match = PROMPT_FILE_RE.match(record.get("id") or "")
+                lang = match["lang"] if match else UNKNOWN
+                if languages is not None and lang not in languages:
+                    continue
+                key = (
+                    lang if "lang" in by else None,
+                    (record.get("model") or UNKNOWN) if "model" in by else None,
+                    (
+                        bucket_of(match["ppkt_id"] if match else record.get("id") or "", buckets)
+                        if "bucket" in by
+                        else None
+                    ),
+                )
+                if key not in writers:
+                    shards[key] = out_dir / f"{shard_stem(input_stem, *key)}{suffix}"
+                    writers[key] = _open_shard(_partial(shards[key]), compress)
+                    counts[key] = 0
+                writers[key].write(line if line.endswith(b"\n") else line + b"\n")
+                counts[key] += 1
+    finally:
+        for writer in writers.values():
+            writer.close()
+    # Shards only appear once complete, so that a failed run leaves no partial shard behind
+    for shard in shards.values():
+        os.replace(_partial(shard), shard)
+    return dict(sorted((shards[key], count) for key, count in counts.items()))
+
+
+def _partial(shard: Path) -> Path:
+    return shard.with_name(f"{shard.name}.tmp")
+
+
+def write_shard_configs(template: MalcoConfig, shards: List[Path], config_dir: Path) -> List[Path]:
+    """
+    Write a run configuration per shard, for `malco evaluate` to score the shards separately.
+
+    Every configuration takes the settings of `template`, with the shard as its response file
+    and result files named after the shard next to those of the template.
+
+    Returns:
+        List[Path]: The configuration files.
+    """
+    Path(config_dir).mkdir(parents=True, exist_ok=True)
+    if template.result_file:
+        results_dir = Path(template.result_file).parent
+    else:
+        results_dir = Path(template.output_dir or ".")
+    if template.full_result_file:
+        full_results_dir = Path(template.full_result_file).parent
+        # Parquet full results stay Parquet
+        full_suffix = Path(template.full_result_file).suffix
+    else:
+        full_results_dir, full_suffix = results_dir / "full_results", ".tsv"
+    configs = []
+    for shard in shards:
+        name = _strip_suffix(shard.name)
+        config = {
+            "name": name,
+            "response_file": str(shard),
+            "result_file": str(results_dir / f"topn_result_{name}.tsv"),
+            "full_result_file": str(full_results_dir / f"full_df_{name}{full_suffix}"),
+            "output_dir": template.output_dir,
+            "tmp_dir": template.tmp_dir,
+            "gold_file": template.gold_file,
+            "visualize": template.visualize,
+            "languages": template.languages,
+        }
+        config_path = Path(config_dir) / f"{name}.yaml"
+        with open(config_path, "w") as f:
+            yaml.safe_dump(config, f, sort_keys=False)
+        configs.append(config_path)
+    return configs
@@ -1,29 +1,20 @@
-import ast
 import json
 import multiprocessing as mp
 import os
-import re
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 import click
-import litellm
-import numpy as np
-import pandas as pd
 
-from .config import MalcoConfig
-from .io.reading import read_result_json
-from .process.generate_plots import (
-    make_combined_plot_comparing,
-    make_single_plot,
-    make_single_plot_from_file,
-)
-from .process.process import create_single_standardised_results
-from .process.scoring import mondo_adapter, score
-from .process.summary import summarize
+from .benchmarks import BENCH_DIR, BENCHMARKS, DEFAULT_SCALES
+from .config import MalcoConfig, expand_config_paths
+from .constants import CACHE_DIR, HEREDITARY_DISEASE, SCORING_MODES
+from .process import instrumentation
 
-# Suppress debug info from litellm
-litellm.suppress_debug_info = True
+# Commands import the heavy dependencies they need (pandas, oaklib, litellm, matplotlib, ...)
+# when they run, so that `malco --help` and the light commands start fast
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 @click.group()
@@ -38,8 +29,36 @@ def core():
 )
 @click.option("--inputdir", type=click.Path(exists=True), default="test_inputdir/prompts/en")
 @click.option("--outputdir", type=click.Path(exists=True), default="test_outputdir/")
-def inference(model: str, key_file: str, inputdir: str, outputdir: str):
-    """Runs one or multiple inferences on a set of prompts"""
+@click.option("--tpm", type=int, default=None, help="Tokens per minute allowed by the API.")
+@click.option("--rpm", type=int, default=None, help="Requests per minute allowed by the API.")
+@click.option(
+    "--output_tokens",
+    type=int,
+    default=1000,
+    show_default=True,
+    help="Expected tokens per response, added to the prompt tokens to rate limit requests.",
+)
+def inference(
+    model: str,
+    key_file: str,
+    inputdir: str,
+    outputdir: str,
+    tpm: Optional[int] = None,
+    rpm: Optional[int] = None,
+    output_tokens: int = 1000,
+):
+    """
+    Runs one or multiple inferences on a set of prompts
+
+    With --tpm or --rpm, requests are held back to stay within the rate limits of the API. The
+    tokens of every request are estimated from its prompt, counted offline with the token
+    cache of `malco tokens`, and corrected with the usage the API reports.
+    """
+    import litellm
+    import pandas as pd
+
+    # Suppress debug info from litellm
+    litellm.suppress_debug_info = True
 
     with open(key_file, "r") as key_file:
         api_key = key_file.read().strip()
@@ -77,6 +96,12 @@ def inference(model: str, key_file: str, inputdir: str, outputdir: str):
         os.makedirs(outputdir)
     output_file_path = os.path.join(outputdir, f"{model}.jsonl")
 
+    from .process.tokens import RateLimiter, request_token_estimates
+
+    limiter = RateLimiter(tpm, rpm)
+    # Only token limits need the prompts tokenized
+    estimates = request_token_estimates(inputdir, model, output_tokens) if tpm else {}
+
     # Iteratively prompt the model with all files in the input directory
     for filename in os.listdir(inputdir):
         if filename.endswith(".txt"):  # Process only text files
@@ -88,10 +113,12 @@ def inference(model: str, key_file: str, inputdir: str, outputdir: str):
 
             # Prompt the model
             try:
+                limiter.acquire(estimates.get(filename, output_tokens))
                 response = litellm.completion(
                     model=os.path.join(path, model),
                     messages=[{"content": prompt_content, "role": "user"}],
                 )
+                limiter.settle(getattr(getattr(response, "usage", None), "total_tokens", None))
                 # Save the response to the output file as jsonl
                 gold_value = correct_results_dict.get(filename, "")
 
@@ -111,89 +138,346 @@ def inference(model: str, key_file: str, inputdir: str, outputdir: str):
 
 
 @core.command()
-@click.option("--config", type=click.Path(exists=True))
-def evaluate(config: str):
-    """Grounds, Evaluates, and Visualizes the results of a llm results file"""
-    run_config = MalcoConfig(config)
-    print(run_config)
+@click.option(
+    "--config",
+    "configs",
+    type=str,
+    multiple=True,
+    required=True,
+    help="Configuration of the run to evaluate, or a glob of them. Can be repeated.",
+)
+@click.option(
+    "--scoring",
+    type=click.Choice(SCORING_MODES),
+    default="lenient",
+    help="lenient counts any descendant match, strict only exact or OMIM phenotypic series ones.",
+)
+@click.option(
+    "--streaming",
+    is_flag=True,
+    help="Ground, score and write the responses batch by batch, in constant memory.",
+)
+@click.option(
+    "--batch_size", type=int, default=1000, help="Number of responses per batch with --streaming."
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only evaluate new or changed responses, keeping the stored results of the others.",
+)
+@click.option(
+    "--trace",
+    is_flag=True,
+    help="Also write a Chrome trace-event file of the pipeline stages next to the result file.",
+)
+def evaluate(
+    configs: tuple, scoring: str, streaming: bool, batch_size: int, incremental: bool, trace: bool
+):
+    """
+    Grounds, Evaluates, and Visualizes the results of a llm results file
+
+    With several configurations the ontology and the caches are loaded once and the cases
+    of all runs are grounded by the same worker pool. Every run gets its own outputs.
+
+    The time spent in every stage is reported in a .timings.json file next to the result file.
+
+    Examples:
+        malco evaluate --config data/config/meditron3-70b.yaml
+
+        ### Evaluate all runs of the multilingual study in one go
+        malco evaluate --config "data/config/multilingual_main/*.yaml"
+    """
+    import pandas as pd
+
+    from .io.full_results import read_full_results
+    from .io.reading import read_responses
+    from .process.incremental import FINGERPRINT_COLUMN, fingerprints, split_evaluated
+    from .process.scoring import mondo_adapter, score
+
+    if streaming and incremental:
+        raise click.UsageError("--streaming and --incremental cannot be combined.")
+    run_configs = [MalcoConfig(config) for config in expand_config_paths(configs)]
+    for run_config in run_configs:
+        print(run_config)
+    instrumentation.reset()
     mondo_adapter()
-    result = read_result_json(run_config.response_file)
-    df = pd.DataFrame(
-        {
-            "service_answers": [x["response"] for x in result],
-            "metadata": [x["id"] for x in result],
-            "gold": [x["gold"] for x in result],
-        }
-    )
-    cores = mp.cpu_count()
-    if df.shape[0] < cores:
-        cores = df.shape[0]
-    chunks = np.array_split(df, cores)
-    print(f"Running with {cores} cores\n")
-    with mp.Pool(cores) as pool:
-        results = pool.imap_unordered(
-            evaluate_chunk, [(index, chunk, run_config) for index, chunk in enumerate(chunks)]
+    if streaming:
+        evaluate_streaming(run_configs, scoring, batch_size)
+        write_timings(run_configs, trace, scoring=scoring, streaming=True)
+        print("Done.")
+        return
+    todo, stored = [], []
+    for run, run_config in enumerate(run_configs):
+        with instrumentation.stage("read") as read:
+            df = read_responses(run_config.response_file)
+            read["items"] = len(df)
+        df[FINGERPRINT_COLUMN] = fingerprints(df, scoring)
+        kept = None
+        if incremental and os.path.isfile(run_config.full_result_file):
+            df, kept = split_evaluated(df, read_full_results(run_config.full_result_file))
+            print(f"{run_config.name}: {len(kept)} stored results kept, {len(df)} to evaluate\n")
+        todo.append(df.assign(run=run))
+        stored.append(kept)
+    df = pd.concat(todo, ignore_index=True)
+    if len(df):
+        df = score(ground_responses(df), scoring)
+    df = df.drop("service_answers", axis=1)
+    for run, run_config in enumerate(run_configs):
+        run_df = df.loc[df["run"] == run].drop("run", axis=1)
+        if stored[run] is not None:
+            run_df = pd.concat([stored[run], run_df], ignore_index=True)
+        write_run_outputs(run_df.reset_index(drop=True), run_config, scoring)
+    write_timings(run_configs, trace, scoring=scoring, streaming=False)
+    print("Done.")
+
+
+def write_timings(run_configs: List[MalcoConfig], trace: bool, **metadata) -> None:
+    """
+    Write the timing report, and the trace if asked for, next to the result file of every run.
+
+    With several runs every report covers all of them, as they share the grounding and scoring.
+    """
+    for run_config in run_configs:
+        report, trace_path = instrumentation.report_paths(run_config.result_file)
+        instrumentation.write_report(
+            report,
+            trace_path if trace else None,
+            runs=[run_config.name for run_config in run_configs],
+            **metadata,
         )
-        results = list(results)
-    df = pd.concat(results, ignore_index=True)
-    df = score(df)
-    df.drop("service_answers", axis=1).to_csv(run_config.full_result_file, sep="\t", index=False)
+    print(f"Timings saved to {report}")
+
+
+def write_run_outputs(df: "pd.DataFrame", run_config: MalcoConfig, scoring: str) -> None:
+    """
+    Write the full results and the summary of a run, register it in the results catalog and
+    plot it if configured.
+
+    Args:
+        df (pd.DataFrame): The scored results of the run.
+        run_config (MalcoConfig): The run configuration.
+        scoring (str): The scoring mode.
+    """
+    from .io.catalog import register_run
+    from .io.full_results import write_full_results
+    from .process.generate_plots import make_single_plot_from_file
+    from .process.summary import summarize, summary_row
+
+    with instrumentation.stage("write", items=len(df)):
+        write_full_results(df, run_config.full_result_file)
     print(f"Full results saved to {run_config.full_result_file}")
     print("\nComputing Statistics...\n")
-    summarize(df, run_config)
+    with instrumentation.stage("summarize", items=len(df)):
+        rank_counter = summarize(df, run_config)
+    register_run(run_config, summary_row(rank_counter), scoring)
     if run_config.visualize:
         print("Visualizing...\n")
-        df["filename"] = run_config.name
-        make_single_plot(run_config.name, df, run_config.output_dir)
-    print("Done.")
+        with instrumentation.stage("plot"):
+            make_single_plot_from_file(
+                run_config.name, run_config.result_file, run_config.output_dir
+            )
+
+
+def ground_responses(df: "pd.DataFrame") -> "pd.DataFrame":
+    """
+    Ground the responses on all cores.
+
+    The workers share the memory mapped ontology index, built first if needed.
+
+    Args:
+        df (pd.DataFrame): Responses, with the `service_answers` column.
+
+    Returns:
+        pd.DataFrame: The responses with a `grounding` column, not necessarily in the same order.
+    """
+    import numpy as np
+
+    from .process.ontology_index import ONTOLOGY_INDEX_NAME, OntologyIndex
+    from .process.scoring import mondo_adapter
+
+    OntologyIndex.load_or_build(mondo_adapter(), CACHE_DIR)
+    index_dir = CACHE_DIR / ONTOLOGY_INDEX_NAME
+    preload_grounding()
+    cores = min(mp.cpu_count(), df.shape[0])
+    print(f"Running with {cores} cores\n")
+    with mp.Pool(cores) as pool:
+        return ground_chunks(pool, np.array_split(df, cores), index_dir)
+
+
+def ground_chunks(pool, chunks: List["pd.DataFrame"], index_dir: Path) -> "pd.DataFrame":
+    """
+    Ground chunks of responses on a worker pool and gather the workers' timings.
+    """
+    import pandas as pd
+
+    results = []
+    for chunk, recorded in pool.imap_unordered(
+        evaluate_chunk, [(index, chunk, index_dir) for index, chunk in enumerate(chunks)]
+    ):
+        results.append(chunk)
+        instrumentation.merge(recorded)
+    return pd.concat(results, ignore_index=True)
+
+
+def evaluate_streaming(run_configs: List[MalcoConfig], scoring: str, batch_size: int) -> None:
+    """
+    Ground, score and append the responses to the full results batch by batch.
+
+    Only one batch is held in memory at a time, the summary counts are accumulated per batch.
+    The ontology, the mapping index, the caches and the worker pool are opened once for all runs.
+
+    Args:
+        run_configs (List[MalcoConfig]): The configurations of the runs to evaluate.
+        scoring (str): Either "lenient" or "strict".
+        batch_size (int): Number of responses per batch.
+    """
+    from collections import Counter
+
+    import numpy as np
+
+    from .io.catalog import register_run
+    from .io.full_results import FullResultsWriter
+    from .io.reading import iter_response_batches
+    from .process.generate_plots import make_single_plot_from_file
+    from .process.incremental import FINGERPRINT_COLUMN, fingerprints
+    from .process.ontology_index import ONTOLOGY_INDEX_NAME, OntologyIndex
+    from .process.scoring import mondo_adapter, open_caches, score_batch
+    from .process.summary import rank_counts, summary_row, write_summary
+
+    mondo = mondo_adapter()
+    mappings = OntologyIndex.load_or_build(mondo, CACHE_DIR)
+    index_dir = CACHE_DIR / ONTOLOGY_INDEX_NAME
+    preload_grounding()
+    pc1, pc2 = open_caches()
+    cores = mp.cpu_count()
+    print(f"Running with {cores} cores, {batch_size} responses per batch\n")
+    try:
+        with mp.Pool(cores) as pool:
+            for run_config in run_configs:
+                rank_counter = Counter()
+                with FullResultsWriter(run_config.full_result_file) as writer:
+                    batches = iter_response_batches(run_config.response_file, batch_size)
+                    while True:
+                        with instrumentation.stage("read") as read:
+                            batch = next(batches, None)
+                            read["items"] = 0 if batch is None else len(batch)
+                        if batch is None:
+                            break
+                        batch[FINGERPRINT_COLUMN] = fingerprints(batch, scoring)
+                        chunks = np.array_split(batch, min(cores, len(batch)))
+                        df = ground_chunks(pool, chunks, index_dir)
+                        df = score_batch(df, scoring, mondo, mappings, pc1, pc2)
+                        with instrumentation.stage("write", items=len(df)):
+                            writer.write(df.drop("service_answers", axis=1))
+                        with instrumentation.stage("summarize", items=len(df)):
+                            rank_counter += rank_counts(df)
+                        print(f"{run_config.name}: {writer.rows} responses evaluated")
+                print(f"Full results saved to {run_config.full_result_file}")
+                write_summary(rank_counter, run_config)
+                register_run(run_config, summary_row(rank_counter), scoring)
+                if run_config.visualize:
+                    print("Visualizing...\n")
+                    with instrumentation.stage("plot"):
+                        make_single_plot_from_file(
+                            run_config.name, run_config.result_file, run_config.output_dir
+                        )
+    finally:
+        pc1.close()
+        pc2.close()
 
 
 @core.command()
-@click.option("--config", type=click.Path(exists=True))
+@click.option(
+    "--config",
+    "configs",
+    type=click.Path(exists=True),
+    multiple=True,
+    required=True,
+    help="Configuration of the run to select from. Can be repeated.",
+)
 @click.option(
     "--cases",
     type=click.Path(exists=True),
     default="data/results/multilingual_main/gpt-4o/ppkts_4917set.txt",
 )
-def select(config: str, cases: str) -> None:
+@click.option(
+    "--ppkt_dir",
+    type=click.Path(exists=True),
+    default=None,
+    help="Directory with the phenopacket JSON files, to read the IDs of the JSON files listed in `cases`.",
+)
+def select(configs: tuple, cases: str, ppkt_dir: Optional[str] = None) -> None:
     """
     Selects the subset of phenopackets listed in the file `cases` and runs summarize on those only.
-    Currently only supports the file IDs used for prompts.
+
+    The summary of the subset is written and registered as a run of its own, in a directory
+    named after `cases` within the output directory of the run, e.g.
+    data/results/ppkts_4917set/topn_result_de-meditron3-70b.tsv. The evaluated run and its
+    catalog entry are left as they are.
     Args:
-        config (str): Path to the configuration file.
-        cases (str): Path to the file containing the phenopacket IDs or JSON files to select.
+        configs (tuple): Paths to the configuration files.
+        cases (str): Path to the file containing the prompt file names or phenopacket JSON files to select.
+        ppkt_dir (str, optional): Directory with the phenopacket JSON files. Without it the
+            JSON file names are taken as phenopacket IDs.
     Examples:
         malco select --config data/config/defaults.yaml --cases data/results/my_favorite_phenopacket_set.txt
+
+        ### Select the same cases in several runs
+        malco select --config data/config/multilingual_main/en-meditron3-70b.yaml --config data/config/multilingual_main/de-meditron3-70b.yaml
     """
-    run_config = MalcoConfig(config)
-    df = pd.read_csv(run_config.full_result_file, sep="\t")
-    for col in ["gold", "grounding", "scored"]:
-        df[col] = df[col].apply(ast.literal_eval)
-    # Open the cases text file
-    with open(cases, "r") as f:
-        # Read the lines, strip whitespace and remove last n characters
-        lines = [line.strip() for line in f.readlines()]
-        if lines[0].endswith(".json"):
-            pass
-            # TODO add support for list of json files (which should/wuill be the primary use case)
-        elif re.search(r"_[a-z][a-z]-prompt\.txt$", lines[0]):
-            n = len("_en-prompt.txt")
-            regex_lines = [re.escape(line[:-n]) + r"_[a-z][a-z]-prompt\.txt" for line in lines]
-        else:
-            raise ValueError(
-                "The cases file must contain either a list of json files or a list of prompt file name IDs."
-            )
+    import copy
+
+    from .io.catalog import lookup_run, register_run
+    from .io.full_results import read_full_results, read_scored_table
+    from .process.selection import read_case_ids, select_cases
+    from .process.summary import summarize, summary_row
+
+    case_ids = read_case_ids(cases, ppkt_dir)
+    for config in configs:
+        run_config = MalcoConfig(config)
+        metadata = read_full_results(run_config.full_result_file, columns=["metadata"])["metadata"]
+        # All languages of a selected phenopacket are kept
+        selected = select_cases(metadata, case_ids)
+        # Only the selected cases are loaded, the filter is pushed down to the Parquet reader
+        df, long = read_scored_table(
+            run_config.full_result_file, filters=[("metadata", "in", selected.tolist())]
+        )
+        subset_config = copy.copy(run_config)
+        subset_config.name = f"{run_config.name}-{Path(cases).stem}"
+        subset_config.output_dir = str(Path(run_config.output_dir) / Path(cases).stem)
+        subset_config.result_file = str(
+            Path(subset_config.output_dir) / Path(run_config.result_file).name
+        )
+        Path(subset_config.output_dir).mkdir(parents=True, exist_ok=True)
+        evaluated = lookup_run(run_config)
+        register_run(
+            subset_config,
+            summary_row(summarize(df, subset_config, long)),
+            evaluated["scoring"] if evaluated else None,
+        )
+        print(
+            f"{run_config.name}: {len(df)} of {len(metadata)} cases selected, "
+            f"summary saved to {subset_config.result_file}"
+        )
 
-    # Filter the DataFrame based on the lines in the cases file
-    # It is sufficient for the lines to be a substring of the metadata (to match all languages)
-    df = df[df["metadata"].str.contains("|".join(regex_lines), regex=True)]
-    # Save the counts of the filtered DataFrame to file
-    summarize(df, run_config)
 
+def preload_grounding() -> None:
+    """
+    Import the grounding modules, curategpt included, before forking the worker pool, so that
+    the workers inherit them instead of each importing them again.
+    """
+    import curategpt.store  # noqa: F401
 
-def evaluate_chunk(args) -> pd.DataFrame:
-    process, df, run_config = args
-    return create_single_standardised_results(df, process)
+    from .process.process import create_single_standardised_results  # noqa: F401
+
+
+def evaluate_chunk(args) -> Tuple["pd.DataFrame", instrumentation.Instrumentation]:
+    from .process.process import create_single_standardised_results
+
+    process, df, index_dir = args
+    df = create_single_standardised_results(df, process, index_dir)
+    # Pool workers are reused, only hand back what was recorded for this chunk
+    return df, instrumentation.collect()
 
 
 @core.command()
@@ -221,9 +505,12 @@ def evaluate_chunk(args) -> pd.DataFrame:
 def combine(dir: str, model: str, lang: str, outdir: str, comparing: Optional[str] = None) -> None:
     """
     Combines the results of several evaluate results into a single plot.
-    We assume that non english languages have a hypen separating the model, and we want to filter these
 
-    The files have to be named topn_result_{model}.tsv and the `model` cannot contain special characters like a "-"
+    Runs are looked up by model and language in the results catalog of `dir`, so model names
+    may contain any character. Results files that are not registered, e.g. evaluated before
+    the catalog existed, are also matched by their names, with a warning: topn_result_{model}.tsv
+    for English and topn_result_{lang}-{model}.tsv otherwise, in which case the English model
+    name cannot contain a "-".
 
     Args:
         dir (str): Directory containing the results files.
@@ -249,6 +536,7 @@ def combine(dir: str, model: str, lang: str, outdir: str, comparing: Optional[st
         ### Compare with custom comparison label
         malco combine --dir data/results --model "*" --lang en --comparing "RAG type"
     """
+    from .process.generate_plots import make_combined_plot_comparing
 
     if model == "*" and lang == "ALL":
         raise ValueError("You must specify a single model to compare languages.")
@@ -261,10 +549,719 @@ def combine(dir: str, model: str, lang: str, outdir: str, comparing: Optional[st
 @click.option("--config", type=click.Path(exists=True))
 def plot(config: str):
     """Generates a plot from a results file"""
+    from .process.generate_plots import make_single_plot_from_file
+
     run_config = MalcoConfig(config)
     make_single_plot_from_file(run_config.name, run_config.result_file, run_config.output_dir)
 
 
+@core.command()
+@click.option(
+    "--spec", type=click.Path(exists=True), required=True, help="YAML file listing the plots."
+)
+@click.option("--cores", type=int, default=None, help="Number of worker processes.")
+@click.option(
+    "--force", is_flag=True, help="Render every plot, even those whose inputs are unchanged."
+)
+def plots(spec: str, cores: Optional[int], force: bool) -> None:
+    """
+    Renders a batch of plots in parallel, skipping those whose inputs are unchanged.
+
+    The spec lists combined plots, as made by combine, single run plots, as made by plot, and
+    comparisons of explicit top-n files, see `malco.process.plot_batch.read_plot_spec`.
+
+    Examples:
+        malco plots --spec data/config/plots.yaml
+    """
+    from .process.plot_batch import PLOT_MANIFEST_NAME, read_plot_spec, render_plots
+
+    jobs, out_dir = read_plot_spec(spec)
+    rendered, skipped = render_plots(jobs, out_dir / PLOT_MANIFEST_NAME, cores, force)
+    print(f"Rendered {rendered} plots, {skipped} unchanged")
+
+
+@core.command()
+@click.option(
+    "--results",
+    type=click.Path(exists=True),
+    required=True,
+    help="Full results file, either from evaluate or a legacy full_df_results.tsv.",
+)
+@click.option(
+    "--root",
+    type=str,
+    default=HEREDITARY_DISEASE,
+    help="MONDO class whose children are the disease categories.",
+)
+@click.option(
+    "--category",
+    "categories",
+    type=str,
+    multiple=True,
+    help="Explicit disease category, overrides --root. Can be repeated.",
+)
+@click.option("--output", type=click.Path(), default=None, help="TSV file to save the table to.")
+def categorize(results: str, root: str, categories: tuple, output: Optional[str] = None) -> None:
+    """
+    Counts correct and incorrect diagnoses per disease category.
+
+    Examples:
+        malco categorize --results data/results/multilingual_main/gpt-4o/en/full_df_results.tsv
+    """
+    from .io.full_results import read_full_results
+    from .process.categories import CategoryIndex, case_outcomes, category_accuracy
+    from .process.mapping_index import MappingIndex
+    from .process.scoring import mondo_adapter
+
+    mondo = mondo_adapter()
+    index = CategoryIndex.load_or_build(mondo, CACHE_DIR, list(categories), root)
+    mappings = MappingIndex.from_adapter(mondo)
+    outcomes = case_outcomes(read_full_results(results))
+    table = category_accuracy(outcomes, index, mappings)
+    print(table.to_string(index=False))
+    if output:
+        table.to_csv(output, sep="\t", index=False)
+        print(f"Saved to {output}")
+
+
+@core.command()
+@click.option(
+    "--input",
+    "raw_result",
+    type=click.Path(exists=True),
+    required=True,
+    help="Raw OntoGPT results.yaml file.",
+)
+@click.option("--output", type=click.Path(), required=True, help="JSONL file to write.")
+def convert(raw_result: str, output: str) -> None:
+    """
+    Converts a raw OntoGPT results.yaml to JSONL, which is much faster to read again.
+
+    Examples:
+        malco convert --input out_multlingual_nov24/raw_results/multilingual/ja/results.yaml --output ja_results.jsonl
+    """
+    from .io.reading import convert_raw_result_yaml
+
+    count = convert_raw_result_yaml(raw_result, output)
+    print(f"Converted {count} documents to {output}")
+
+
+@core.command()
+@click.option(
+    "--scale",
+    "scales",
+    type=int,
+    multiple=True,
+    default=DEFAULT_SCALES,
+    show_default=True,
+    help="Number of synthetic responses. Can be repeated.",
+)
+@click.option(
+    "--benchmark",
+    "benchmarks",
+    type=click.Choice(BENCHMARKS),
+    multiple=True,
+    default=BENCHMARKS,
+    help="Benchmark to run, default is all. Can be repeated.",
+)
+@click.option(
+    "--mondo_db",
+    type=click.Path(exists=True),
+    default=None,
+    help="Local MONDO Semantic SQL database, default is the one of sqlite:obo:mondo.",
+)
+@click.option("--lang", "languages", type=str, multiple=True, default=("en",))
+@click.option("--failure_rate", type=float, default=0.1, help="Rate of ungroundable diagnoses.")
+@click.option("--cores", type=int, default=None, help="Number of worker processes.")
+@click.option("--workdir", type=click.Path(), default=str(BENCH_DIR))
+@click.option(
+    "--threshold", type=float, default=0.2, help="Relative slowdown flagged as a regression."
+)
+@click.option("--fail_on_regression", is_flag=True, help="Exit with an error on regressions.")
+def bench(
+    scales: tuple,
+    benchmarks: tuple,
+    mondo_db: Optional[str],
+    languages: tuple,
+    failure_rate: float,
+    cores: Optional[int],
+    workdir: str,
+    threshold: float,
+    fail_on_regression: bool,
+) -> None:
+    """
+    Benchmarks cleaning, grounding, scoring, summarizing and evaluation on synthetic responses.
+
+    The results are added to the history in the working directory and compared with the
+    previous run.
+
+    Examples:
+        malco bench --scale 1000 --mondo_db ~/.data/oaklib/mondo.db
+
+        ### Only grounding, in several languages
+        malco bench --benchmark ground --lang en --lang de --lang ja
+    """
+    from .benchmarks import HISTORY_NAME
+    from .benchmarks.suite import (
+        BenchmarkContext,
+        append_history,
+        find_regressions,
+        load_history,
+        run_benchmarks,
+    )
+
+    workdir = Path(workdir)
+    context = BenchmarkContext(workdir, mondo_db, languages, failure_rate, cores)
+    results = run_benchmarks(context, scales, benchmarks)
+    history_path = workdir / HISTORY_NAME
+    regressions = find_regressions(load_history(history_path), results, threshold)
+    append_history(history_path, results)
+    print(f"Results added to {history_path}")
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression['benchmark']} at {regression['scale']}: "
+            f"{regression['seconds']:.3f}s, {regression['slowdown']:.0%} slower than "
+            f"{regression['previous_seconds']:.3f}s"
+        )
+    if regressions and fail_on_regression:
+        raise SystemExit(1)
+
+
+@core.command(name="stats")
+@click.option(
+    "--config",
+    "configs",
+    type=str,
+    multiple=True,
+    required=True,
+    help="Configuration of an evaluated run, or a glob of them. Can be repeated.",
+)
+@click.option(
+    "--k", "ks", type=click.IntRange(1), multiple=True, default=(1, 3, 10), show_default=True
+)
+@click.option("--resamples", type=int, default=10000, show_default=True)
+@click.option("--confidence", type=float, default=0.95, show_default=True)
+@click.option("--baseline", type=str, default=None, help="Run name to compare all others with.")
+@click.option("--cores", type=int, default=None, help="Number of worker processes.")
+@click.option("--seed", type=int, default=0)
+@click.option("--output", type=click.Path(), default=None, help="Prefix of TSV files to save.")
+def compare_stats(
+    configs: tuple,
+    ks: tuple,
+    resamples: int,
+    confidence: float,
+    baseline: Optional[str],
+    cores: Optional[int],
+    seed: int,
+    output: Optional[str],
+) -> None:
+    """
+    Computes bootstrap confidence intervals of top-k accuracy and MRR, and paired permutation
+    tests between runs.
+
+    Runs in different languages are paired by phenopacket.
+
+    Examples:
+        malco stats --config "data/config/multilingual_main/*.yaml" --baseline en-Meditron3-70B
+    """
+    import pandas as pd
+
+    from .process.stats import bootstrap_ci, compare_runs, read_case_ranks
+
+    run_configs = [MalcoConfig(config) for config in expand_config_paths(configs)]
+    ranks = {
+        run_config.name: read_case_ranks(run_config.full_result_file) for run_config in run_configs
+    }
+    if baseline is not None and baseline not in ranks:
+        raise click.BadParameter(f"{baseline} is not one of {', '.join(ranks)}.")
+    intervals = pd.concat(
+        [
+            bootstrap_ci(run_ranks.to_numpy(), ks, resamples, confidence, seed)
+            .rename_axis("metric")
+            .reset_index()
+            .assign(run=name, cases=len(run_ranks))
+            for name, run_ranks in ranks.items()
+        ],
+        ignore_index=True,
+    )[["run", "metric", "estimate", "low", "high", "cases"]]
+    print(f"Bootstrap {confidence:.0%} confidence intervals, {resamples} resamples\n")
+    print(intervals.round(4).to_string(index=False))
+    tests = compare_runs(ranks, ks, resamples, baseline, cores or mp.cpu_count(), seed)
+    print(f"\nPaired permutation tests, {resamples} permutations\n")
+    print(tests.round(4).to_string(index=False))
+    for run_a, run_b in tests.loc[tests["cases"] == 0, ["run_a", "run_b"]].drop_duplicates().values:
+        print(f"{run_a} and {run_b} have no cases in common and were not compared")
+    if output:
+        intervals.to_csv(f"{output}_intervals.tsv", sep="\t", index=False)
+        tests.to_csv(f"{output}_tests.tsv", sep="\t", index=False)
+        print(f"\nSaved to {output}_intervals.tsv and {output}_tests.tsv")
+
+
+@core.command()
+@click.option(
+    "--config",
+    "configs",
+    type=str,
+    multiple=True,
+    help="Configuration of a run whose prompts and responses to count, or a glob of them.",
+)
+@click.option(
+    "--prompts",
+    type=click.Path(exists=True),
+    multiple=True,
+    help="Directory of prompt files, or prompt JSONL file, to project the cost of. Can be repeated.",
+)
+@click.option("--model", type=str, default="gpt-4o", help="Model the prompts are projected for.")
+@click.option("--input_price", type=float, default=None, help="US dollars per 1M input tokens.")
+@click.option("--output_price", type=float, default=None, help="US dollars per 1M output tokens.")
+@click.option("--cores", type=int, default=None, help="Number of worker processes.")
+@click.option("--output", type=click.Path(), default=None, help="TSV file to save the report to.")
+def tokens(
+    configs: tuple,
+    prompts: tuple,
+    model: str,
+    input_price: Optional[float],
+    output_price: Optional[float],
+    cores: Optional[int],
+    output: Optional[str],
+) -> None:
+    """
+    Counts input and output tokens per model and language, and their cost.
+
+    Counts are cached by the hash of every text, so counting again only tokenizes new prompts
+    and responses. The models of runs are taken from their top-n file names.
+
+    Examples:
+        malco tokens --config "data/config/multilingual_main/*.yaml"
+        malco tokens --prompts data/prompts --model gpt-4o
+    """
+    from itertools import chain
+
+    from .io.catalog import parse_run_name
+    from .process.tokens import (
+        PRICES,
+        count_tokens,
+        iter_prompt_records,
+        iter_response_records,
+        token_report,
+    )
+
+    if not configs and not prompts:
+        raise click.UsageError("Give at least one --config or --prompts.")
+    sources = [iter_prompt_records(path, model) for path in prompts]
+    for config in expand_config_paths(configs):
+        run_config = MalcoConfig(config)
+        run_model, _ = parse_run_name(run_config.result_file)
+        sources.append(iter_response_records(run_config.response_file, run_model))
+    prices = dict(PRICES)
+    if input_price is not None or output_price is not None:
+        default_input, default_output = prices.get(model, (float("nan"),) * 2)
+        prices[model] = (
+            default_input if input_price is None else input_price,
+            default_output if output_price is None else output_price,
+        )
+    counts, tokenized = count_tokens(chain(*sources), cores=cores or mp.cpu_count())
+    report = token_report(counts, prices)
+    print(report.round(4).to_string(index=False))
+    print(f"\nTokenized {tokenized} of {len(counts)} texts, the others came from the cache.")
+    if output:
+        report.to_csv(output, sep="\t", index=False)
+        print(f"Saved the report to {output}")
+
+
+@core.group()
+def cache():
+    """Manages the persistent caches used for scoring"""
+    pass
+
+
+@cache.command()
+@click.option(
+    "--gold",
+    "gold_files",
+    type=click.Path(exists=True),
+    multiple=True,
+    required=True,
+    help="correct_results.tsv or JSONL file with the gold disease IDs. Can be repeated.",
+)
+@click.option(
+    "--results",
+    "result_files",
+    type=click.Path(exists=True),
+    multiple=True,
+    required=True,
+    help="Full results file of a previous evaluation, providing grounded IDs. Can be repeated.",
+)
+@click.option("--cores", type=int, default=None, help="Number of worker processes.")
+@click.option(
+    "--max_scores",
+    type=int,
+    default=None,
+    help="Most scores to add, default is the room left in the score cache.",
+)
+def warm(
+    gold_files: tuple, result_files: tuple, cores: Optional[int], max_scores: Optional[int]
+) -> None:
+    """
+    Precomputes the OMIM mappings of the grounded IDs seen in previous results and their
+    scores against the gold IDs, so that evaluations start hot.
+
+    Every grounded ID and its descendants get their OMIM mappings, whatever the gold IDs. The
+    (grounded ID, gold ID) pairs that match are scored first, then the others until
+    --max_scores, since the full product of a few thousand IDs on each side is millions of
+    entries, more than the cache holds.
+
+    Examples:
+        malco cache warm --gold data/prompts/correct_results.tsv --results data/results/full_results/full_df_en-Meditron3_70B.tsv
+    """
+    from .io.reading import read_gold_ids, read_grounded_ids
+    from .process.scoring import warm_caches
+
+    gold_ids = set().union(*(read_gold_ids(f) for f in gold_files))
+    grounded_ids = set().union(*(read_grounded_ids(f) for f in result_files))
+    print(f"Found {len(gold_ids)} gold IDs and {len(grounded_ids)} grounded IDs")
+    new_mappings, new_scores = warm_caches(grounded_ids, gold_ids, cores, max_scores=max_scores)
+    print(f"Added {new_mappings} OMIM mappings and {new_scores} scores to the caches.")
+
+
+@cache.command()
+def stats() -> None:
+    """Prints the size of the persistent caches"""
+    from .process.scoring import cache_stats
+
+    print(cache_stats().to_string(index=False))
+
+
+@cache.command()
+@click.option(
+    "--drop_ungrounded",
+    is_flag=True,
+    default=False,
+    help="Also remove cached scores of failed groundings (N/A).",
+)
+def prune(drop_ungrounded: bool) -> None:
+    """Compacts the persistent caches, removing stale and duplicated entries"""
+    from .process.scoring import prune_caches
+
+    for name, removed in prune_caches(drop_ungrounded=drop_ungrounded).items():
+        print(f"{name}: removed {removed} entries")
+
+
+@core.group()
+def catalog():
+    """Manages the results catalogs, which combine and plots query to find runs"""
+    pass
+
+
+@catalog.command()
+@click.option(
+    "--config",
+    "configs",
+    type=str,
+    multiple=True,
+    required=True,
+    help="Configuration of an evaluated run, or a glob of them. Can be repeated.",
+)
+def add(configs: tuple) -> None:
+    """
+    Registers runs evaluated before the catalog existed, from their top-n files.
+
+    Examples:
+        malco catalog add --config "data/config/multilingual_main/*.yaml"
+    """
+    from .io.catalog import read_result_summary, register_run
+
+    for config in expand_config_paths(configs):
+        run_config = MalcoConfig(config)
+        if not os.path.isfile(run_config.result_file):
+            print(f"{run_config.name}: {run_config.result_file} not found, skipped")
+            continue
+        catalog_path = register_run(run_config, read_result_summary(run_config.result_file))
+        print(f"{run_config.name}: registered in {catalog_path}")
+
+
+@catalog.command(name="list")
+@click.option("--dir", type=click.Path(exists=True), required=True, help="Results directory.")
+@click.option("--model", type=str, default="*", help="Model, or a glob of them.")
+@click.option("--lang", type=str, default="ALL", help="Comma-separated language short names.")
+def list_runs(dir: str, model: str, lang: str) -> None:
+    """Prints the runs registered in a results directory, with their top-k accuracy"""
+    from .io.catalog import query_runs
+    from .process.topk import topk_accuracy
+
+    runs = query_runs(Path(dir), model, lang.split(","))
+    table = runs[["model", "language", "scoring", "evaluated_at", "num_cases"]]
+    print(table.join(topk_accuracy(runs).round(2)).to_string(index=False))
+
+
+@core.command()
+@click.option(
+    "--input",
+    "response_file",
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help="Response JSONL file, optionally gzip-compressed.",
+)
+@click.option("--output", type=click.Path(file_okay=False), required=True)
+@click.option(
+    "--by",
+    type=click.Choice(["lang", "model", "bucket"]),
+    multiple=True,
+    default=("lang",),
+    show_default=True,
+    help="Split by language, model field or hash bucket of the case. Can be repeated.",
+)
+@click.option("--buckets", type=click.IntRange(1), default=8, show_default=True)
+@click.option("--lang", type=str, default=None, help="Comma-separated languages to keep.")
+@click.option("--compress", is_flag=True, help="Write gzip-compressed shards.")
+@click.option(
+    "--config",
+    type=click.Path(exists=True),
+    default=None,
+    help="Run configuration to write a configuration per shard from, for malco evaluate.",
+)
+def shard(
+    response_file: str,
+    output: str,
+    by: tuple,
+    buckets: int,
+    lang: Optional[str],
+    compress: bool,
+    config: Optional[str],
+) -> None:
+    """
+    Splits a response file by language, model or hash bucket, in a single pass.
+
+    All languages of a case go to the same bucket. With --config, every shard gets its own run
+    configuration, so that shards can be evaluated in parallel on separate machines.
+
+    Examples:
+        malco shard --input multilingual-meditron-70b.jsonl --output data/responses
+        malco shard --input responses.jsonl --output shards --by bucket --config run.yaml
+    """
+    from .io.sharding import shard_jsonl, write_shard_configs
+
+    languages = lang.split(",") if lang else None
+    counts = shard_jsonl(response_file, Path(output), by, buckets, languages, compress)
+    for path, count in counts.items():
+        print(f"{path}: {count} records")
+    if config:
+        for config_path in write_shard_configs(MalcoConfig(config), list(counts), Path(output)):
+            print(f"Wrote {config_path}")
+
+
+@core.group()
+def pubmed():
+    """Manages the local store of PubMed dates, for offline leakage filtering"""
+    pass
+
+
+@pubmed.command(name="import")
+@click.argument("files", type=click.Path(exists=True, dir_okay=False), nargs=-1, required=True)
+@click.option("--replace", is_flag=True, help="Also replace the dates of known PMIDs.")
+def import_dates(files: tuple, replace: bool) -> None:
+    """
+    Imports article dates from PubMed XML dumps, MEDLINE files or a pmid2date_dict.json.
+
+    Only PMIDs missing from the store are added, unless --replace is given.
+
+    Examples:
+        malco pubmed import pubmed25n*.xml.gz
+        malco pubmed import leakage_experiment/pmid2date_dict.json
+    """
+    from .io.pubmed import PubMedCache, iter_dates
+
+    with PubMedCache() as cache:
+        for path in files:
+            added = cache.add(iter_dates(path), Path(path).name, replace)
+            print(f"{path}: added {added} PMIDs")
+        print(f"{len(cache)} PMIDs in {cache.path}")
+
+
+@pubmed.command()
+@click.option("--date", "cutoff", type=click.DateTime(["%Y-%m-%d"]), required=True)
+@click.option(
+    "--ppkt_dir",
+    type=click.Path(exists=True, file_okay=False),
+    required=True,
+    help="Directory of the phenopacket JSON files, searched recursively.",
+)
+@click.option(
+    "--index",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Phenopacket index to read the PMIDs from, default is the one of malco ppkt index.",
+)
+@click.option("--cores", type=int, default=None, help="Number of worker processes.")
+@click.option("--output", type=click.Path(), default=None, help="File to list the phenopackets in.")
+def after(
+    cutoff, ppkt_dir: str, index: Optional[str], cores: Optional[int], output: Optional[str]
+) -> None:
+    """
+    Lists the phenopackets published after a date.
+
+    The PMIDs of a phenopacket come from its metaData.externalReferences, taken from the index
+    of `malco ppkt index` when there is one, and else from the PMID in its file name. A
+    phenopacket citing several publications counts from the earliest. The list holds paths relative to
+    --ppkt_dir and can be passed to `malco select --cases` to evaluate only these phenopackets.
+
+    Examples:
+        malco pubmed after --date 2023-10-01 --ppkt_dir phenopacket-store/notebooks --output ppkts_after_2023-10-01.txt
+    """
+    from .io.ppkt_index import ppkt_pmids
+    from .io.pubmed import PubMedCache, published_after
+
+    pmids = ppkt_pmids(Path(ppkt_dir), Path(index) if index else None, cores or mp.cpu_count())
+    with PubMedCache() as cache:
+        selected, unknown = published_after(cache, pmids, cutoff.date().isoformat())
+    print(f"{len(selected)} of {len(pmids)} phenopackets published after {cutoff.date()}")
+    if unknown:
+        print(
+            f"{len(unknown)} phenopackets have no known date, import them with malco pubmed import"
+        )
+    if output:
+        with open(output, "w") as f:
+            f.writelines(f"{name}\n" for name in sorted(selected))
+        print(f"Saved the list to {output}")
+
+
+@core.group()
+def ppkt():
+    """Manages the index of the phenopacket store"""
+    pass
+
+
+@ppkt.command()
+@click.option(
+    "--dir",
+    "ppkt_dir",
+    type=click.Path(exists=True, file_okay=False),
+    required=True,
+    help="Directory of phenopacket JSON files, searched recursively.",
+)
+@click.option(
+    "--index",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Index file, default is .ppkt_index.parquet in the phenopacket directory.",
+)
+@click.option("--cores", type=int, default=None, help="Number of worker processes.")
+@click.option("--force", is_flag=True, help="Parse every phenopacket again.")
+def index(ppkt_dir: str, index: Optional[str], cores: Optional[int], force: bool) -> None:
+    """
+    Indexes the IDs, PMIDs, diseases and HPO terms of the phenopackets in a directory.
+
+    Only phenopackets new or changed since the last run are parsed. Analyses can then read
+    the index with `malco.io.ppkt_index.read_ppkt_index` instead of every JSON file.
+
+    Examples:
+        malco ppkt index --dir phenopacket-store/notebooks
+    """
+    from .io.ppkt_index import default_index_path, update_ppkt_index
+
+    index_path = Path(index) if index else default_index_path(ppkt_dir)
+    update = update_ppkt_index(Path(ppkt_dir), index_path, cores or mp.cpu_count(), force)
+    print(
+        f"Parsed {update.parsed} phenopackets, {update.unchanged} unchanged, "
+        f"{update.removed} removed, index saved to {index_path}"
+    )
+    for filename in update.failed:
+        print(f"Skipped {filename}, not a valid phenopacket")
+
+
+@core.group()
+def dataset():
+    """Builds datasets of the prompts, e.g. for Hugging Face"""
+    pass
+
+
+@dataset.command()
+@click.option(
+    "--prompts",
+    type=click.Path(exists=True, file_okay=False),
+    required=True,
+    help="Directory with one prompt directory per language.",
+)
+@click.option("--output", type=click.Path(file_okay=False), required=True)
+@click.option(
+    "--lang", type=str, default=None, help="Comma-separated language short names, default is all."
+)
+@click.option(
+    "--gold",
+    type=click.Path(exists=True),
+    default=None,
+    help="correct_results.tsv, default is the one in the prompt directory.",
+)
+@click.option("--cores", type=int, default=None, help="Number of worker processes.")
+@click.option("--row_group_size", type=click.IntRange(1), default=2048, show_default=True)
+def build(
+    prompts: str,
+    output: str,
+    lang: Optional[str],
+    gold: Optional[str],
+    cores: Optional[int],
+    row_group_size: int,
+) -> None:
+    """
+    Writes the prompts and correct diagnoses of every language to Parquet, one file per language.
+
+    The prompt files are streamed into the files one row group at a time, so that any number
+    of prompts fits in memory.
+
+    Examples:
+        malco dataset build --prompts in_multlingual_nov24/prompts --output hf_prompts/validation
+    """
+    from .io.dataset import build_datasets, dataset_file
+
+    languages = lang.split(",") if lang else None
+    for done, prompt_count, unlabelled in build_datasets(
+        Path(prompts), Path(output), languages, gold, cores or mp.cpu_count(), row_group_size
+    ):
+        print(f"{done}: saved {prompt_count} prompts to {dataset_file(output, done)}")
+        if unlabelled:
+            print(f"{done}: {unlabelled} prompts have no correct diagnosis")
+
+
+@core.group()
+def hpoa():
+    """Summarises the disease annotations of the HPO"""
+    pass
+
+
+@hpoa.command()
+@click.option(
+    "--hpoa",
+    "hpoa_path",
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help="phenotype.hpoa of the HPO release.",
+)
+@click.option(
+    "--ic",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Information content of the HPO terms, as written by `runoak information-content`.",
+)
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="TSV file.")
+def summary(hpoa_path: str, ic: Optional[str], output: Optional[str]) -> None:
+    """
+    Summarises the curation dates, annotations and information content of every disease.
+
+    The summary is cached in the caches directory, keyed on the HPOA and IC files, so that
+    analyses of the same release read it with `malco.io.hpoa.load_disease_summary` at once.
+
+    Examples:
+        malco hpoa summary --hpoa phenotype.hpoa --ic ic_hpoa.txt --output disease_summary.tsv
+    """
+    from .io.hpoa import load_disease_summary
+
+    disease_summary = load_disease_summary(hpoa_path, ic)
+    print(f"Summarised {len(disease_summary)} diseases of {hpoa_path}")
+    if output:
+        disease_summary.to_csv(output, sep="\t")
+        print(f"Saved the summary to {output}")
+
+
 cli = click.CommandCollection(sources=[core])
 
 if __name__ == "__main__":
@@ -0,0 +1,179 @@
+import hashlib
+import json
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from oaklib.datamodels.vocabulary import IS_A, PART_OF
+from oaklib.interfaces import OboGraphInterface
+
+from malco.constants import HEREDITARY_DISEASE
+from malco.process.mapping_index import MappingIndex
+from malco.process.ontology_index import source_stamp
+
+MAX_CATEGORIES = 64
+
+
+class CategoryIndex:
+    """
+    Membership of every MONDO class in a set of disease categories, as a bitmask.
+
+    Bit `i` of a class' mask is set when the class is the `i`-th category or one of its
+    descendants over IS_A and PART_OF. Building the index takes one traversal per category,
+    instead of one ancestor traversal per term to categorize.
+    """
+
+    def __init__(self, categories: List[str], labels: List[str], masks: Dict[str, int]):
+        """
+        Args:
+            categories (List[str]): Category IDs, in bit order.
+            labels (List[str]): Category labels, in bit order.
+            masks (Dict[str, int]): MONDO ID to its category bitmask.
+        """
+        if len(categories) > MAX_CATEGORIES:
+            raise ValueError(f"At most {MAX_CATEGORIES} categories are supported.")
+        self.categories = categories
+        self.labels = labels
+        self.masks = masks
+
+    @classmethod
+    def build(
+        cls, mondo: OboGraphInterface, categories: List[str] = None, root: str = HEREDITARY_DISEASE
+    ) -> "CategoryIndex":
+        """
+        Build the index.
+
+        Args:
+            mondo (OboGraphInterface): The mondo adapter.
+            categories (List[str], optional): Category IDs. Defaults to the direct IS_A and
+                PART_OF children of `root`.
+            root (str): Class whose children are the categories, when none are given.
+
+        Returns:
+            CategoryIndex: The index.
+        """
+        if not categories:
+            categories = sorted(
+                {s for s, _, _ in mondo.relationships(objects=[root], predicates=[IS_A, PART_OF])}
+            )
+        masks = defaultdict(int)
+        for bit, category in enumerate(categories):
+            for term in mondo.descendants([category], predicates=[IS_A, PART_OF], reflexive=True):
+                masks[term] |= 1 << bit
+        labels = [mondo.label(category) or category for category in categories]
+        return cls(list(categories), labels, dict(masks))
+
+    @classmethod
+    def load_or_build(
+        cls,
+        mondo: OboGraphInterface,
+        cache_dir: Path,
+        categories: List[str] = None,
+        root: str = HEREDITARY_DISEASE,
+    ) -> "CategoryIndex":
+        """
+        Load the index from `cache_dir`, building and saving it there on the first use or when
+        the database behind the `mondo` adapter has changed.
+        """
+        key = hashlib.sha256(json.dumps([root, sorted(categories or [])]).encode()).hexdigest()[:12]
+        path = cache_dir / f"category_index_{key}.json"
+        source = source_stamp(mondo.engine.url.database)
+        if path.is_file():
+            with open(path, "r") as f:
+                content = json.load(f)
+            if content.get("source") == source:
+                return cls(content["categories"], content["labels"], content["masks"])
+        index = cls.build(mondo, categories, root)
+        cache_dir.mkdir(exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "source": source,
+                    "categories": index.categories,
+                    "labels": index.labels,
+                    "masks": index.masks,
+                },
+                f,
+            )
+        return index
+
+    def mask(self, terms) -> int:
+        """Return the union of the category bitmasks of `terms`."""
+        mask = 0
+        for term in terms:
+            mask |= self.masks.get(term, 0)
+        return mask
+
+
+def case_outcomes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reduce a full results file to one row per case with its gold ID and whether it was solved.
+
+    Supports the `malco evaluate` format (`metadata`, `gold`, `scored`) and the legacy
+    `full_df_results.tsv` format (`label`, `correct_term`, `is_correct`, one row per diagnosis).
+    """
+    if "correct_term" in df.columns:
+        grouped = df.groupby("label", sort=False)
+        return (
+            pd.DataFrame(
+                {
+                    "gold_id": grouped["correct_term"].first(),
+                    "correct": grouped["is_correct"].any(),
+                }
+            )
+            .rename_axis("case")
+            .reset_index()
+        )
+    return pd.DataFrame(
+        {
+            "case": df["metadata"],
+            "gold_id": [gold.get("disease_id") if gold else None for gold in df["gold"]],
+            "correct": [
+                any(result["is_correct"] for result in scored) if scored else False
+                for scored in df["scored"]
+            ],
+        }
+    )
+
+
+def category_accuracy(
+    outcomes: pd.DataFrame, index: CategoryIndex, mappings: MappingIndex
+) -> pd.DataFrame:
+    """
+    Count the correct and incorrect cases in every category.
+
+    A case belongs to all categories of the MONDO classes its gold OMIM maps to.
+
+    Args:
+        outcomes (pd.DataFrame): Output of `case_outcomes`.
+        index (CategoryIndex): The category index.
+        mappings (MappingIndex): The MONDO mapping index.
+
+    Returns:
+        pd.DataFrame: Contingency table, plus an "uncategorized" row for cases without any category.
+    """
+    gold_masks = {
+        gold_id: index.mask(mappings.mondos(gold_id)) for gold_id in outcomes["gold_id"].unique()
+    }
+    masks = outcomes["gold_id"].map(gold_masks).fillna(0).to_numpy(dtype=np.uint64)
+    bits = np.arange(len(index.categories), dtype=np.uint64)
+    membership = ((masks[:, None] >> bits) & np.uint64(1)).astype(bool)
+    correct = outcomes["correct"].to_numpy(dtype=bool)
+    table = pd.DataFrame(
+        {
+            "category": index.categories,
+            "label": index.labels,
+            "correct": (membership & correct[:, None]).sum(axis=0),
+            "incorrect": (membership & ~correct[:, None]).sum(axis=0),
+        }
+    )
+    uncategorized = masks == 0
+    table.loc[len(table)] = [
+        "uncategorized",
+        "No category found",
+        int((uncategorized & correct).sum()),
+        int((uncategorized & ~correct).sum()),
+    ]
+    return table
@@ -1,9 +1,14 @@
+import logging
 from pathlib import Path
+from typing import List, Tuple
 
-import matplotlib.pyplot as plt
 import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
+from malco.io.catalog import has_catalog, query_runs
 from malco.model.language import Language
+from malco.process.topk import topk_accuracy
 
 
 def make_single_plot(
@@ -38,25 +43,31 @@ def make_single_plot(
     ]
     plot_dir = out_dir
     plot_dir.mkdir(exist_ok=True)
-    plt.clf()
-    df = pd.DataFrame(
-        df.apply(_percentages, axis=1).tolist(), columns=["Top-1", "Top-3", "Top-10", comparing]
-    ).sort_values(by="Top-1", ascending=False)
+    df = (
+        topk_accuracy(df, ks=(1, 3, 10), mrr=False)
+        .assign(**{comparing: df["filename"].to_numpy()})
+        .sort_values(by="Top-1", ascending=False)
+    )
 
     df.set_index(comparing, inplace=True)
     df = df.T
+    # A figure of its own rather than the global pyplot one, so that plots can be rendered
+    # concurrently, e.g. by `malco plots`
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    ax = figure.subplots()
     df.plot(
         kind="bar",
+        ax=ax,
         color=palette_hex_codes,
         ylabel="Percent of cases",
         legend=True,
         edgecolor="white",
         title=title,
     )
-    plt.xticks(rotation=0)
-    plt.ylim(0, 100)
-    plt.savefig(plot_dir / f"{model_name}", bbox_inches="tight")
-    plt.close()
+    ax.tick_params(axis="x", labelrotation=0)
+    ax.set_ylim(0, 100)
+    figure.savefig(plot_dir / f"{model_name}", bbox_inches="tight")
 
 
 def make_single_plot_from_file(
@@ -91,19 +102,55 @@ def make_combined_plot_comparing(
             it will be automatically determined as "Language" if comparing multiple
             languages, or "Model" otherwise.
     """
-    languages = [Language.from_short_name(lang) for lang in langs]
-    files = glob_generator(model, languages, results_dir)
-    if not files:
-        raise ValueError(f"No matching files found for model={model} and languages={langs}")
-    if comparing is None:
-        comparing = "Language" if len(languages) > 1 else "Model"
+    files, labels, output, comparing = combined_plot_inputs(
+        results_dir, out_dir, model, langs, comparing
+    )
     results = pd.concat(
         [
-            pd.read_csv(file, delimiter="\t").assign(filename=stem_replacer(file.stem, languages))
-            for file in files
+            pd.read_csv(file, delimiter="\t").assign(filename=label)
+            for file, label in zip(files, labels)
         ],
         ignore_index=True,
     )
+    make_single_plot(output.name, results, output.parent, comparing)
+
+
+def combined_plot_inputs(
+    results_dir: Path, out_dir: Path, model: str, langs: list[str], comparing: str = None
+) -> Tuple[List[Path], List[str], Path, str]:
+    """
+    Find the results files and the output of a combined plot, see `make_combined_plot_comparing`.
+
+    The runs registered in the results catalog of `results_dir` are looked up there, and
+    results files that are not registered, e.g. evaluated before the catalog existed, are
+    found by their names and added with a warning.
+
+    Returns:
+        Tuple[List[Path], List[str], Path, str]: The results files, their labels in the plot,
+            the path of the plot and what is being compared.
+    """
+    languages = [Language.from_short_name(lang) for lang in langs]
+    files = []
+    if has_catalog(results_dir):
+        files = [Path(file) for file in query_runs(results_dir, model, langs)["result_file"]]
+    registered = {file.resolve() for file in files}
+    unregistered = [
+        file
+        for file in sorted(glob_generator(model, languages, results_dir))
+        if file.resolve() not in registered
+    ]
+    if unregistered and has_catalog(results_dir):
+        logging.warning(
+            f"{len(unregistered)} results files in {results_dir} are not in its catalog and are "
+            f"matched by name, register them with malco catalog add: "
+            f"{', '.join(file.name for file in unregistered)}"
+        )
+    files += unregistered
+    if not files:
+        raise ValueError(f"No matching files found for model={model} and languages={langs}")
+    if comparing is None:
+        comparing = "Language" if len(languages) > 1 else "Model"
+    labels = [stem_replacer(file.stem, languages) for file in files]
 
     # Check if out_dir is file or directory path.
     if out_dir.suffix:
@@ -114,22 +161,7 @@ def make_combined_plot_comparing(
         output_name = f"topn_{'grouped' if model == '*' else model}_{'' if languages[0] == Language.EN else languages[0].name.lower() if len(languages) == 1 else 'v'.join([lang.name.lower() for lang in languages])}.png"
         plot_dir = out_dir / "plots"
 
-    make_single_plot(output_name, results, plot_dir, comparing)
-
-
-def _percentages(row):
-    model_name = row["filename"]
-    if 'num_cases' in row.index and pd.notna(row['num_cases']):
-        total_files = row["num_cases"]
-    else:
-        # Calculate total sum from n1-n10 + n10p + nf columns
-        total_files = sum(row[f"n{j}"] for j in range(1, 11)) + row.get('n10p', 0) + row.get('nf', 0)
-    return [
-        row["n1"] / total_files * 100 if total_files else 0,
-        sum(row[f"n{j}"] for j in range(1, 4)) / total_files * 100 if total_files else 0,
-        sum(row[f"n{j}"] for j in range(1, 11)) / total_files * 100 if total_files else 0,
-        model_name,
-    ]
+    return files, labels, plot_dir / output_name, comparing
 
 
 def glob_generator(model: str, languages: list[Language], results_dir: Path) -> list[Path]:
@@ -150,7 +182,7 @@ def glob_generator(model: str, languages: list[Language], results_dir: Path) ->
             return [
                 file
                 for file in list(results_dir.glob(f"topn_result_{model}.tsv"))
-                if "-" not in str(file)
+                if "-" not in file.name
             ]
         elif languages[0] == Language.ALL:
             return list(results_dir.glob(f"topn_result_*-{model}.tsv"))
@@ -1,12 +1,12 @@
 from typing import List, Tuple
 
-from curategpt.store import get_store
 from oaklib.interfaces.text_annotator_interface import (
     TextAnnotationConfiguration,
     TextAnnotatorInterface,
 )
 
 from malco.process.cleaning import clean_diagnosis_line
+from malco.process.instrumentation import stage
 
 
 def perform_curategpt_grounding(
@@ -35,6 +35,9 @@ def perform_curategpt_grounding(
     Returns:
     - List of tuples: [(Mondo ID, Label), ...]
     """
+    # curategpt takes seconds to import, only pay for it when the fallback is used
+    from curategpt.store import get_store
+
     # Initialize the database store
     db = get_store(database_type, path)
 
@@ -168,19 +171,21 @@ def ground_diagnosis_text_to_mondo(
             continue
 
         # Try grounding the full line first (exact match)
-        grounded = perform_oak_grounding(
-            annotator, clean_line, exact_match=True, verbose=verbose, include_list=include_list
-        )
+        with stage("exact_grounding", items=1, span=False):
+            grounded = perform_oak_grounding(
+                annotator, clean_line, exact_match=True, verbose=verbose, include_list=include_list
+            )
 
         # Try grounding with curategpt if no grounding is found
         if use_ontogpt_grounding and grounded == [("N/A", "No grounding found")]:
-            grounded = perform_curategpt_grounding(
-                diagnosis=clean_line,
-                path=curategpt_path,
-                collection=curategpt_collection,
-                database_type=curategpt_database_type,
-                verbose=verbose,
-            )
+            with stage("fallback_grounding", items=1, span=False):
+                grounded = perform_curategpt_grounding(
+                    diagnosis=clean_line,
+                    path=curategpt_path,
+                    collection=curategpt_collection,
+                    database_type=curategpt_database_type,
+                    verbose=verbose,
+                )
 
         # If still no grounding is found, log the final failure
         if grounded == [("N/A", "No grounding found")]:
@@ -0,0 +1,73 @@
+import hashlib
+import json
+from typing import Tuple
+
+import pandas as pd
+
+# Bump whenever a change to grounding or scoring changes the results of already evaluated cases
+PIPELINE_VERSION = "1"
+FINGERPRINT_COLUMN = "fingerprint"
+
+
+def response_fingerprint(response: str, gold: dict, scoring: str) -> str:
+    """
+    Fingerprint everything the evaluation of a single case depends on.
+
+    Args:
+        response (str): The reply of the model.
+        gold (dict): The correct diagnosis.
+        scoring (str): The scoring mode.
+
+    Returns:
+        str: Hex digest of the response, gold, scoring mode and `PIPELINE_VERSION`.
+    """
+    content = json.dumps([PIPELINE_VERSION, scoring, response, gold], sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def fingerprints(responses: pd.DataFrame, scoring: str) -> pd.Series:
+    """
+    Fingerprint every case of the responses, see `response_fingerprint`.
+
+    Args:
+        responses (pd.DataFrame): Responses with the `service_answers` and `gold` columns.
+        scoring (str): The scoring mode.
+
+    Returns:
+        pd.Series: One fingerprint per case, with the index of `responses`.
+    """
+    return pd.Series(
+        [
+            response_fingerprint(response, gold, scoring)
+            for response, gold in zip(responses["service_answers"], responses["gold"])
+        ],
+        index=responses.index,
+        dtype=object,
+    )
+
+
+def split_evaluated(
+    responses: pd.DataFrame, stored: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Split the responses into those still to evaluate and the stored results to keep.
+
+    A stored result is kept when a response with the same prompt file name and fingerprint
+    still exists. Stored results of removed or changed responses are dropped.
+
+    Args:
+        responses (pd.DataFrame): Responses with the `metadata` and `fingerprint` columns.
+        stored (pd.DataFrame): Full results of a previous evaluation. Results written before
+            fingerprints were stored have none and are all evaluated again.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The responses to evaluate and the results to keep.
+    """
+    if FINGERPRINT_COLUMN not in stored.columns:
+        return responses, stored.iloc[0:0]
+    response_keys = pd.MultiIndex.from_frame(responses[["metadata", FINGERPRINT_COLUMN]])
+    stored_keys = pd.MultiIndex.from_frame(stored[["metadata", FINGERPRINT_COLUMN]])
+    keep = stored_keys.isin(response_keys) & ~stored_keys.duplicated()
+    kept = stored[keep]
+    todo = responses[~response_keys.isin(stored_keys[keep])]
+    return todo, kept
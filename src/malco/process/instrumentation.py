@@ -0,0 +1,156 @@
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+
+class Instrumentation:
+    """
+    Wall time, item counts and counters of the pipeline stages.
+
+    Every process records into its own instance, see `collect` and `merge` to aggregate the
+    records of pool workers. Besides the totals per stage, coarse stages are kept as spans for
+    a Chrome trace-event file.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.items: Dict[str, int] = defaultdict(int)
+        self.counters: Dict[str, Counter] = defaultdict(Counter)
+        self.spans = []
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0, span: bool = True):
+        """
+        Time a stage.
+
+        Yields a dict whose "items" can be set inside the block, when the number of items is
+        only known at the end of the stage.
+
+        Args:
+            name (str): The stage.
+            items (int): Number of items the stage processes.
+            span (bool): Whether to also keep the stage as a trace span. Turn off for stages
+                that run once per item.
+        """
+        handle = {"items": items}
+        start = time.perf_counter()
+        started_at = time.time()
+        try:
+            yield handle
+        finally:
+            elapsed = time.perf_counter() - start
+            items = handle["items"]
+            self.seconds[name] += elapsed
+            self.calls[name] += 1
+            self.items[name] += items
+            if span:
+                self.spans.append(
+                    {
+                        "name": name,
+                        "ph": "X",
+                        "ts": started_at * 1e6,
+                        "dur": elapsed * 1e6,
+                        "pid": os.getpid(),
+                        "tid": 0,
+                        "args": {"items": items},
+                    }
+                )
+
+    def count(self, name: str, **counters: int) -> None:
+        """Add to the counters of a stage, e.g. cache hits and misses."""
+        self.counters[name].update(counters)
+
+    def merge(self, other: "Instrumentation") -> None:
+        """Add the records of another process."""
+        for name, seconds in other.seconds.items():
+            self.seconds[name] += seconds
+        for name, calls in other.calls.items():
+            self.calls[name] += calls
+        for name, items in other.items.items():
+            self.items[name] += items
+        for name, counters in other.counters.items():
+            self.counters[name].update(counters)
+        self.spans.extend(other.spans)
+
+    def report(self) -> dict:
+        """
+        Summarize the stages.
+
+        Time spent in pool workers is summed over the workers, so it can exceed the wall time
+        of the run. A counter pair `x_hits`, `x_misses` also gets its `x_hit_rate`.
+        """
+        stages = {}
+        for name in sorted(set(self.seconds) | set(self.counters)):
+            seconds = self.seconds.get(name, 0.0)
+            items = self.items.get(name, 0)
+            counters = dict(self.counters.get(name, {}))
+            for key in list(counters):
+                if key.endswith("_hits"):
+                    prefix = key[: -len("_hits")]
+                    total = counters[key] + counters.get(f"{prefix}_misses", 0)
+                    counters[f"{prefix}_hit_rate"] = counters[key] / total if total else None
+            stages[name] = {
+                "seconds": seconds,
+                "calls": self.calls.get(name, 0),
+                "items": items,
+                "items_per_second": items / seconds if items and seconds else None,
+                **counters,
+            }
+        return stages
+
+
+_INSTRUMENTATION = Instrumentation()
+
+
+def stage(name: str, items: int = 0, span: bool = True):
+    """Time a stage in this process, see `Instrumentation.stage`."""
+    return _INSTRUMENTATION.stage(name, items, span)
+
+
+def count(name: str, **counters: int) -> None:
+    """Add to the counters of a stage in this process."""
+    _INSTRUMENTATION.count(name, **counters)
+
+
+def collect() -> Instrumentation:
+    """Return what this process recorded so far and start over, e.g. at the end of a task."""
+    global _INSTRUMENTATION
+    recorded, _INSTRUMENTATION = _INSTRUMENTATION, Instrumentation()
+    return recorded
+
+
+def merge(other: Instrumentation) -> None:
+    """Add the records of a pool worker, as returned by its `collect`, to this process."""
+    _INSTRUMENTATION.merge(other)
+
+
+def reset() -> None:
+    """Drop everything recorded in this process."""
+    collect()
+
+
+def report_paths(result_file: str) -> Tuple[str, str]:
+    """The timing report and the trace-event file written next to a run's `result_file`."""
+    base = os.path.splitext(result_file)[0]
+    return f"{base}.timings.json", f"{base}.trace.json"
+
+
+def write_report(path: str, trace_path: Optional[str] = None, **metadata) -> None:
+    """
+    Write the stages recorded in this process as JSON, and optionally as a Chrome trace.
+
+    Args:
+        path (str): Path to the JSON report.
+        trace_path (str, optional): Path to the trace-event file, which chrome://tracing and
+            Perfetto open.
+        **metadata: Added to the report as is, e.g. the run names.
+    """
+    with open(path, "w") as f:
+        json.dump({**metadata, "stages": _INSTRUMENTATION.report()}, f, indent=2)
+    if trace_path:
+        with open(trace_path, "w") as f:
+            json.dump({"traceEvents": _INSTRUMENTATION.spans}, f)
@@ -0,0 +1,78 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple
+
+import pandas as pd
+from oaklib.interfaces import MappingProviderInterface
+
+EXACT_MATCH = "skos:exactMatch"
+OMIM_PREFIX = "OMIM:"
+OMIMPS_PREFIX = "OMIMPS:"
+
+
+class MappingIndex:
+    """
+    Hashed index of the MONDO skos:exactMatch mappings to OMIM entries and OMIM phenotypic series.
+
+    Built with a single pass over all mappings, after which every lookup is a dictionary access.
+    """
+
+    def __init__(self, omim: Dict[str, Tuple[str, ...]], omimps: Dict[str, Tuple[str, ...]]):
+        """
+        Args:
+            omim (Dict[str, Tuple[str, ...]]): MONDO ID to its exactly matching OMIM IDs.
+            omimps (Dict[str, Tuple[str, ...]]): MONDO ID to its exactly matching OMIMPS IDs.
+        """
+        self.omim = omim
+        self.omimps = omimps
+        mondo = defaultdict(list)
+        for term, omims in omim.items():
+            for omim_id in omims:
+                mondo[omim_id].append(term)
+        self.mondo = {k: tuple(v) for k, v in mondo.items()}
+
+    @classmethod
+    def from_mappings(cls, mappings: Iterable[Tuple[str, str, str]]) -> "MappingIndex":
+        """
+        Build the index from (subject_id, predicate_id, object_id) triples.
+        """
+        omim = defaultdict(list)
+        omimps = defaultdict(list)
+        for subject_id, predicate_id, object_id in mappings:
+            if predicate_id != EXACT_MATCH or not isinstance(object_id, str):
+                continue
+            if object_id.startswith(OMIM_PREFIX):
+                omim[subject_id].append(object_id)
+            elif object_id.startswith(OMIMPS_PREFIX):
+                omimps[subject_id].append(object_id)
+        return cls({k: tuple(v) for k, v in omim.items()}, {k: tuple(v) for k, v in omimps.items()})
+
+    @classmethod
+    def from_adapter(cls, adapter: MappingProviderInterface) -> "MappingIndex":
+        """
+        Build the index from all mappings known to an OAK adapter, e.g. sqlite:obo:mondo.
+        """
+        return cls.from_mappings(
+            (m.subject_id, m.predicate_id, m.object_id) for m in adapter.sssom_mappings()
+        )
+
+    @classmethod
+    def from_sssom(cls, path: str) -> "MappingIndex":
+        """
+        Build the index from a mondo.sssom.tsv file.
+        """
+        df = pd.read_csv(
+            path, sep="\t", comment="#", usecols=["subject_id", "predicate_id", "object_id"]
+        )
+        return cls.from_mappings(df.itertuples(index=False, name=None))
+
+    def omims(self, term: str) -> Tuple[str, ...]:
+        """Return the OMIM IDs exactly matching `term`."""
+        return self.omim.get(term, ())
+
+    def mondos(self, omim_id: str) -> Tuple[str, ...]:
+        """Return the MONDO IDs exactly matching the OMIM ID `omim_id`."""
+        return self.mondo.get(omim_id, ())
+
+    def phenotypic_series(self, term: str) -> Tuple[str, ...]:
+        """Return the OMIM phenotypic series exactly matching `term`."""
+        return self.omimps.get(term, ())
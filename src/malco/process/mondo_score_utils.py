@@ -2,9 +2,7 @@ from typing import List
 
 from cachetools.keys import hashkey
 from oaklib.datamodels.vocabulary import IS_A
-from oaklib.interfaces import MappingProviderInterface
-from oaklib.interfaces import OboGraphInterface
-
+from oaklib.interfaces import MappingProviderInterface, OboGraphInterface
 
 FULL_SCORE = 1.0
 PARTIAL_SCORE = 0.5
@@ -86,6 +84,37 @@ def score_grounded_result(
     return 0.0
 
 
+def strict_score(prediction: str, lenient_score: float, index) -> float:
+    """
+    Score the grounded result strictly, from its lenient score.
+
+    Only exact matches count fully: the prediction is the correct OMIM or a MONDO mapping
+    directly to it. A partial match through a descendant only counts if the prediction is
+    an OMIM phenotypic series, i.e. it has an OMIMPS mapping. Since the lenient score already
+    holds the ontology lookups, no further queries are needed.
+
+    >>> from malco.process.mapping_index import MappingIndex
+    >>> index = MappingIndex({}, {"MONDO:0008029": ("OMIMPS:158810",)})
+    >>> strict_score("MONDO:0008029", PARTIAL_SCORE, index)
+    0.5
+    >>> strict_score("MONDO:0000001", PARTIAL_SCORE, index)
+    0.0
+
+    Args:
+        prediction (str): The prediction.
+        lenient_score (float): The score returned by `score_grounded_result`.
+        index (MappingIndex): The MONDO mapping index.
+
+    Returns:
+        float: The strict score.
+    """
+    if lenient_score == FULL_SCORE:
+        return FULL_SCORE
+    if lenient_score > 0 and index.phenotypic_series(prediction):
+        return lenient_score
+    return 0.0
+
+
 def get_ground_truth_from_cache_or_compute(
     term,
     adapter: OboGraphInterface,
@@ -0,0 +1,316 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from oaklib import get_adapter
+from oaklib.datamodels.vocabulary import IS_A, LABEL_PREDICATE, SYNONYM_PREDICATES
+from oaklib.interfaces.text_annotator_interface import (
+    TextAnnotationConfiguration,
+    nen_annotation,
+)
+
+from malco.process.mapping_index import MappingIndex
+
+ONTOLOGY_INDEX_NAME = "ontology_index"
+# Bump whenever the layout of the index files changes
+INDEX_VERSION = 1
+# SQLite's LIKE, which OAK uses for whole text matches, only folds the case of ASCII letters
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+_LIKE_WILDCARDS = ("%", "_")
+
+
+def _text_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+def _pack_strings(strings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack strings into one UTF-8 buffer and the offsets delimiting them."""
+    encoded = [s.encode() for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _load(path: Path) -> np.ndarray:
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        # Empty arrays cannot be memory mapped
+        return np.load(path)
+
+
+class OntologyIndex:
+    """
+    Read-only MONDO lookups backed by flat arrays, memory mapped from `.npy` files.
+
+    Holds the labels and synonyms for whole text grounding, the IS_A descendant closure and
+    the OMIM and OMIMPS mappings. Loading only maps the files, so every pool worker can open
+    the index in constant time while the operating system shares a single copy of the pages
+    between all of them.
+    """
+
+    ARRAYS = (
+        "term_ids",
+        "label_buffer",
+        "label_offsets",
+        "lexical_hashes",
+        "lexical_terms",
+        "lexical_buffer",
+        "lexical_offsets",
+        "closure_indptr",
+        "closure_indices",
+        "omim_indptr",
+        "omim_buffer",
+        "omim_offsets",
+        "omimps_indptr",
+        "omimps_buffer",
+        "omimps_offsets",
+    )
+
+    def __init__(self, arrays: Dict[str, np.ndarray], source: Optional[str] = None):
+        """
+        Args:
+            arrays (Dict[str, np.ndarray]): The arrays listed in `ARRAYS`.
+            source (str, optional): Path to the SQLite database, used for the lookups the
+                index does not cover.
+        """
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.source = source
+        self._adapter = None
+
+    @classmethod
+    def from_db(cls, path: str, mappings: MappingIndex) -> "OntologyIndex":
+        """
+        Build the index from a Semantic SQL database, such as the one behind sqlite:obo:mondo.
+
+        Args:
+            path (str): Path to the SQLite database.
+            mappings (MappingIndex): The MONDO mapping index.
+
+        Returns:
+            OntologyIndex: The index.
+        """
+        lexical_predicates = [LABEL_PREDICATE, *SYNONYM_PREDICATES]
+        with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as db:
+            labels = {}
+            for subject, value in db.execute(
+                "SELECT subject, value FROM statements WHERE predicate = ? AND value IS NOT NULL",
+                (LABEL_PREDICATE,),
+            ):
+                labels.setdefault(subject, value)
+            lexical = db.execute(
+                "SELECT DISTINCT subject, value FROM statements "
+                f"WHERE predicate IN ({','.join('?' * len(lexical_predicates))}) "
+                "AND value IS NOT NULL AND subject NOT LIKE '\\_:%' ESCAPE '\\'",
+                lexical_predicates,
+            ).fetchall()
+            closure = db.execute(
+                "SELECT object, subject FROM entailed_edge WHERE predicate = ?", (IS_A,)
+            ).fetchall()
+
+        terms = sorted(
+            set(labels)
+            | {subject for subject, _ in lexical}
+            | {term for edge in closure for term in edge}
+            | set(mappings.omim)
+            | set(mappings.omimps)
+        )
+        position = {term: i for i, term in enumerate(terms)}
+        arrays = {"term_ids": np.array(terms, dtype=str)}
+        arrays["label_buffer"], arrays["label_offsets"] = _pack_strings(
+            [labels.get(term, "") for term in terms]
+        )
+
+        entries = sorted(
+            (_text_hash(key), key, position[subject])
+            for subject, key in ((s, v.translate(_ASCII_LOWER)) for s, v in lexical)
+        )
+        arrays["lexical_hashes"] = np.array([h for h, _, _ in entries], dtype=np.uint64)
+        arrays["lexical_terms"] = np.array([t for _, _, t in entries], dtype=np.int32)
+        arrays["lexical_buffer"], arrays["lexical_offsets"] = _pack_strings(
+            [key for _, key, _ in entries]
+        )
+
+        descendants = defaultdict(list)
+        for ancestor, descendant in closure:
+            descendants[position[ancestor]].append(position[descendant])
+        arrays["closure_indptr"], arrays["closure_indices"] = _csr(descendants, len(terms))
+
+        for name, table in (("omim", mappings.omim), ("omimps", mappings.omimps)):
+            indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+            np.cumsum([len(table.get(term, ())) for term in terms], out=indptr[1:])
+            arrays[f"{name}_indptr"] = indptr
+            arrays[f"{name}_buffer"], arrays[f"{name}_offsets"] = _pack_strings(
+                [value for term in terms for value in table.get(term, ())]
+            )
+        return cls(arrays, source=path)
+
+    @classmethod
+    def load(cls, directory: Path) -> "OntologyIndex":
+        """Memory map a saved index."""
+        with open(directory / "meta.json", "r") as f:
+            meta = json.load(f)
+        return cls(
+            {name: _load(directory / f"{name}.npy") for name in cls.ARRAYS}, source=meta["source"]
+        )
+
+    def save(self, directory: Path) -> None:
+        """Save the index, replacing any index already saved in `directory`."""
+        tmp = directory.with_name(f"{directory.name}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for name in self.ARRAYS:
+            np.save(tmp / f"{name}.npy", getattr(self, name))
+        with open(tmp / "meta.json", "w") as f:
+            json.dump({"version": INDEX_VERSION, **source_stamp(self.source)}, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp, directory)
+
+    @classmethod
+    def load_or_build(cls, mondo, cache_dir: Path) -> "OntologyIndex":
+        """
+        Load the index from `cache_dir`, building it on the first use or when the database
+        behind the `mondo` adapter has changed.
+
+        Args:
+            mondo: The mondo adapter, backed by a SQLite database.
+            cache_dir (Path): Directory holding the caches.
+
+        Returns:
+            OntologyIndex: The index.
+        """
+        directory = cache_dir / ONTOLOGY_INDEX_NAME
+        source = mondo.engine.url.database
+        if (directory / "meta.json").is_file():
+            with open(directory / "meta.json", "r") as f:
+                meta = json.load(f)
+            if meta == {"version": INDEX_VERSION, **source_stamp(source)}:
+                return cls.load(directory)
+        index = cls.from_db(source, MappingIndex.from_adapter(mondo))
+        index.save(directory)
+        return index
+
+    def _position(self, term: str) -> int:
+        i = int(np.searchsorted(self.term_ids, term))
+        if i < len(self.term_ids) and self.term_ids[i] == term:
+            return i
+        return -1
+
+    def label(self, term: str) -> Optional[str]:
+        """Return the label of `term`, None if it has none."""
+        i = self._position(term)
+        if i < 0:
+            return None
+        return _string_at(self.label_buffer, self.label_offsets, i) or None
+
+    def search(self, text: str) -> List[str]:
+        """
+        Return the terms with a label or synonym equal to `text`, ignoring the case of ASCII
+        letters, as OAK's whole text match on a SQLite database does.
+        """
+        key = text.translate(_ASCII_LOWER)
+        h = np.uint64(_text_hash(key))
+        lo = int(np.searchsorted(self.lexical_hashes, h, side="left"))
+        hi = int(np.searchsorted(self.lexical_hashes, h, side="right"))
+        return list(
+            dict.fromkeys(
+                str(self.term_ids[self.lexical_terms[i]])
+                for i in range(lo, hi)
+                if _string_at(self.lexical_buffer, self.lexical_offsets, i) == key
+            )
+        )
+
+    def descendants(self, term: str) -> List[str]:
+        """Return the IS_A descendants of `term`, as listed in the entailed edges."""
+        i = self._position(term)
+        if i < 0:
+            return []
+        indices = self.closure_indices[self.closure_indptr[i] : self.closure_indptr[i + 1]]
+        return [str(t) for t in self.term_ids[indices]]
+
+    def _mapped(self, name: str, term: str) -> Tuple[str, ...]:
+        i = self._position(term)
+        if i < 0:
+            return ()
+        indptr = getattr(self, f"{name}_indptr")
+        buffer = getattr(self, f"{name}_buffer")
+        offsets = getattr(self, f"{name}_offsets")
+        return tuple(_string_at(buffer, offsets, j) for j in range(indptr[i], indptr[i + 1]))
+
+    def omims(self, term: str) -> Tuple[str, ...]:
+        """Return the OMIM IDs exactly matching `term`."""
+        return self._mapped("omim", term)
+
+    def phenotypic_series(self, term: str) -> Tuple[str, ...]:
+        """Return the OMIM phenotypic series exactly matching `term`."""
+        return self._mapped("omimps", term)
+
+    def adapter(self):
+        """The OAK adapter on the source database, opened on first use."""
+        if self._adapter is None:
+            self._adapter = get_adapter(f"sqlite:{self.source}")
+        return self._adapter
+
+
+class IndexAnnotator:
+    """
+    Drop-in for the OAK annotator in `perform_oak_grounding`, answering whole text matches
+    from an `OntologyIndex`.
+
+    Other annotations, and texts containing LIKE wildcards, are passed on to the adapter.
+    """
+
+    def __init__(self, index: OntologyIndex):
+        self.index = index
+
+    def annotate_text(self, text: str, configuration: TextAnnotationConfiguration = None):
+        if (
+            configuration is None
+            or not configuration.matches_whole_text
+            or configuration.token_exclusion_list
+            or any(wildcard in text for wildcard in _LIKE_WILDCARDS)
+        ):
+            yield from self.index.adapter().annotate_text(text, configuration=configuration)
+            return
+        for term in self.index.search(text):
+            yield nen_annotation(text=text, object_id=term, object_label=self.index.label(term))
+
+
+def _string_at(buffer: np.ndarray, offsets: np.ndarray, i: int) -> str:
+    return bytes(buffer[offsets[i] : offsets[i + 1]]).decode()
+
+
+def _csr(rows: Dict[int, Iterable[int]], n: int) -> Tuple[np.ndarray, np.ndarray]:
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    for row, values in rows.items():
+        indptr[row + 1] = len(values)
+    np.cumsum(indptr, out=indptr)
+    indices = np.zeros(indptr[-1], dtype=np.int32)
+    for row, values in rows.items():
+        indices[indptr[row] : indptr[row + 1]] = values
+    return indptr, indices
+
+
+def source_stamp(source: Optional[str]) -> dict:
+    """
+    Identify a version of a database file by its path, size and modification time.
+
+    Caches derived from the database store the stamp and are rebuilt when it changes.
+
+    Args:
+        source (Optional[str]): Path to the database file.
+
+    Returns:
+        dict: The stamp, only the path if the file does not exist.
+    """
+    if source is None or not os.path.isfile(source):
+        return {"source": source}
+    stat = os.stat(source)
+    return {"source": source, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
@@ -0,0 +1,179 @@
+import hashlib
+import io
+import json
+import multiprocessing as mp
+import os
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+import yaml
+
+from malco.config import MalcoConfig
+from malco.process.generate_plots import combined_plot_inputs, make_single_plot
+
+PLOT_MANIFEST_NAME = ".plots_manifest.json"
+# Bump whenever the rendering changes, so that every plot is rendered again
+PLOT_VERSION = "1"
+DEFAULT_TITLE = "Top-k accuracy of correct diagnoses"
+
+
+class PlotJob(NamedTuple):
+    """One figure of a plot spec: the top-n files it compares and where it is saved."""
+
+    output: Path
+    files: Tuple[Path, ...]
+    labels: Tuple[str, ...]
+    comparing: str = "Model"
+    title: str = DEFAULT_TITLE
+
+
+def read_plot_spec(spec_path: str) -> Tuple[List[PlotJob], Path]:
+    """
+    Read a plot spec, a YAML file listing the plots to render.
+
+    Every entry of `plots` is one of:
+        - `model` and `langs`: compares top-n files of `results_dir`, like `malco combine`.
+        - `config`: plots the top-n file of a run, like `malco plot`.
+        - `files`: compares the listed top-n files, relative to `results_dir`.
+
+    Entries can also set `comparing`, `title` and `output`, the file name of the plot in
+    `out_dir`. Example:
+
+        results_dir: data/results
+        out_dir: data/results/plots
+        plots:
+          - model: gpt-4o
+            langs: [en, de, es]
+          - config: data/config/meditron3-70b.yaml
+          - files: [topn_result_gpt-4o.tsv, topn_result_o1.tsv]
+            output: gpt-4o_vs_o1.png
+
+    Args:
+        spec_path (str): Path to the plot spec.
+
+    Returns:
+        Tuple[List[PlotJob], Path]: The plots, and the output directory of the spec, which
+            holds the manifest of rendered plots.
+    """
+    with open(spec_path, "r") as f:
+        spec = yaml.safe_load(f)
+    results_dir = Path(spec.get("results_dir", "."))
+    out_dir = Path(spec.get("out_dir", results_dir / "plots"))
+    jobs = []
+    for entry in spec.get("plots", []):
+        title = entry.get("title", DEFAULT_TITLE)
+        if "config" in entry:
+            run_config = MalcoConfig(entry["config"])
+            output = Path(run_config.output_dir) / entry.get("output", f"{run_config.name}.png")
+            files, labels = [Path(run_config.result_file)], [run_config.name]
+            comparing = entry.get("comparing", "Model")
+        elif "files" in entry:
+            files = [results_dir / file for file in entry["files"]]
+            labels = entry.get("labels", [file.stem.replace("topn_result_", "") for file in files])
+            output = out_dir / entry["output"]
+            comparing = entry.get("comparing", "Model")
+        else:
+            model = entry.get("model", "*")
+            langs = entry.get("langs", ["en"])
+            if model == "*" and "ALL" in langs:
+                raise ValueError("You must specify a single model to compare languages.")
+            files, labels, output, comparing = combined_plot_inputs(
+                results_dir, out_dir, model, langs, entry.get("comparing")
+            )
+            # The generated names go straight into out_dir rather than into its plots/
+            output = out_dir / entry.get("output", output.name)
+        jobs.append(PlotJob(output, tuple(files), tuple(labels), comparing, title))
+    return jobs, out_dir
+
+
+def render_plots(
+    jobs: List[PlotJob], manifest_path: Path, cores: Optional[int] = None, force: bool = False
+) -> Tuple[int, int]:
+    """
+    Render the plots whose inputs changed since they were last rendered, on a process pool.
+
+    Every top-n file is read once, however many plots use it. A plot is skipped when its file
+    exists and the hash of its top-n files and settings is the one in the manifest.
+
+    Args:
+        jobs (List[PlotJob]): The plots.
+        manifest_path (Path): JSON file with the hash of every rendered plot.
+        cores (int, optional): Number of worker processes, default is one per core.
+        force (bool): Render every plot, even unchanged ones.
+
+    Returns:
+        Tuple[int, int]: Number of rendered and of skipped plots.
+    """
+    contents = {file: file.read_bytes() for job in jobs for file in job.files}
+    hashes = {file: hashlib.sha256(content).hexdigest() for file, content in contents.items()}
+    manifest = _read_manifest(manifest_path)
+    todo = []
+    for job in jobs:
+        key = plot_key(job, hashes)
+        if not force and manifest.get(str(job.output)) == key and job.output.is_file():
+            continue
+        todo.append((job, key))
+    frames = {
+        file: pd.read_csv(io.BytesIO(content), delimiter="\t")
+        for file, content in contents.items()
+        if any(file in job.files for job, _ in todo)
+    }
+    tasks = [
+        (
+            job,
+            pd.concat(
+                [frames[file].assign(filename=label) for file, label in zip(job.files, job.labels)],
+                ignore_index=True,
+            ),
+        )
+        for job, _ in todo
+    ]
+    cores = min(cores or mp.cpu_count(), len(tasks))
+    if cores > 1:
+        with mp.Pool(cores) as pool:
+            for _ in pool.imap_unordered(_render, tasks):
+                pass
+    else:
+        for task in tasks:
+            _render(task)
+    for job, key in todo:
+        manifest[str(job.output)] = key
+    _write_manifest(manifest_path, manifest)
+    return len(todo), len(jobs) - len(todo)
+
+
+def plot_key(job: PlotJob, hashes: Dict[Path, str]) -> str:
+    """Hash of everything a plot is rendered from."""
+    return hashlib.sha256(
+        json.dumps(
+            [
+                PLOT_VERSION,
+                job.comparing,
+                job.title,
+                list(job.labels),
+                [hashes[file] for file in job.files],
+            ]
+        ).encode()
+    ).hexdigest()
+
+
+def _render(task: Tuple[PlotJob, pd.DataFrame]) -> None:
+    job, df = task
+    job.output.parent.mkdir(parents=True, exist_ok=True)
+    make_single_plot(job.output.name, df, job.output.parent, job.comparing, job.title)
+
+
+def _read_manifest(path: Path) -> Dict[str, str]:
+    if not path.is_file():
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _write_manifest(path: Path, manifest: Dict[str, str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
@@ -1,24 +1,44 @@
+from pathlib import Path
+from typing import Optional
+
 import pandas as pd
 from oaklib import get_adapter
 from tqdm import tqdm
 
 from malco.process.cleaning import split_diagnosis_from_header
 from malco.process.grounding import ground_diagnosis_text_to_mondo
+from malco.process.instrumentation import stage
+from malco.process.ontology_index import IndexAnnotator, OntologyIndex
 
 
-def create_single_standardised_results(responses: pd.DataFrame, process) -> pd.DataFrame:
-    results = []
-    for _, row in tqdm(
-        responses.iterrows(),
-        total=responses.shape[0],
-        position=process,
-        desc=f"Grounding Process {process}",
-    ):
+def create_single_standardised_results(
+    responses: pd.DataFrame,
+    process,
+    index_dir: Optional[Path] = None,
+    use_ontogpt_grounding: bool = True,
+) -> pd.DataFrame:
+    if index_dir is None:
         annotator = get_adapter("sqlite:obo:mondo")
-        results.append(
-            ground_diagnosis_text_to_mondo(
-                annotator, split_diagnosis_from_header(row["service_answers"]), verbose=False
+    else:
+        # Memory mapped, so the workers share the index instead of each loading MONDO
+        annotator = IndexAnnotator(OntologyIndex.load(index_dir))
+    results = []
+    with stage("grounding", items=responses.shape[0]):
+        for _, row in tqdm(
+            responses.iterrows(),
+            total=responses.shape[0],
+            position=process,
+            desc=f"Grounding Process {process}",
+        ):
+            with stage("parse", items=1, span=False):
+                differential_diagnosis = split_diagnosis_from_header(row["service_answers"])
+            results.append(
+                ground_diagnosis_text_to_mondo(
+                    annotator,
+                    differential_diagnosis,
+                    verbose=False,
+                    use_ontogpt_grounding=use_ontogpt_grounding,
+                )
             )
-        )
     responses["grounding"] = results
     return responses
@@ -1,6 +1,12 @@
+import itertools
 import logging
+import multiprocessing as mp
+import pickle
+import shelve
 from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
+import numpy as np
 import pandas as pd
 from cachetools import LRUCache
 from cachetools.keys import hashkey
@@ -9,11 +15,18 @@ from oaklib.interfaces import OboGraphInterface
 from shelved_cache import PersistentCache
 from tqdm import tqdm
 
-from malco.process.mondo_score_utils import score_grounded_result
+from malco.constants import CACHE_DIR, SCORING_MODES
+from malco.process.instrumentation import count, stage
+from malco.process.mondo_score_utils import score_grounded_result, strict_score
+from malco.process.ontology_index import ONTOLOGY_INDEX_NAME, OntologyIndex
 
 FULL_SCORE = 1.0
 PARTIAL_SCORE = 0.5
 
+SCORE_CACHE_NAME = "score_grounded_result_cache"
+OMIM_CACHE_NAME = "omim_mappings_cache"
+CACHE_MAXSIZE = 524288
+
 
 def cache_info(self):
     return f"CacheInfo: hits={self.hits}, misses={self.misses}, maxsize={self.wrapped.maxsize}, currsize={self.wrapped.currsize}"
@@ -29,56 +42,331 @@ def mondo_adapter() -> OboGraphInterface:
     return get_adapter("sqlite:obo:mondo")
 
 
-def score(df) -> pd.DataFrame:
+def open_caches(cache_dir: Path = CACHE_DIR) -> Tuple[PersistentCache, PersistentCache]:
     """
-    Score the results of the grounding.
+    Open the persistent caches used while scoring.
+
+    Args:
+        cache_dir (Path): Directory holding the cache files.
+
+    Returns:
+        Tuple[PersistentCache, PersistentCache]: The omim_mappings cache and the
+            score_grounded_result cache.
     """
-    out_caches = Path("caches")
-    out_caches.mkdir(exist_ok=True)
-    pc2_cache_file = str(out_caches / "score_grounded_result_cache")
-    pc2 = PersistentCache(LRUCache, pc2_cache_file, maxsize=524288)
-    pc1_cache_file = str(out_caches / "omim_mappings_cache")
-    pc1 = PersistentCache(LRUCache, pc1_cache_file, maxsize=524288)
+    cache_dir.mkdir(exist_ok=True)
+    pc1 = PersistentCache(LRUCache, str(cache_dir / OMIM_CACHE_NAME), maxsize=CACHE_MAXSIZE)
+    pc2 = PersistentCache(LRUCache, str(cache_dir / SCORE_CACHE_NAME), maxsize=CACHE_MAXSIZE)
     pc1.hits = pc1.misses = 0
     pc2.hits = pc2.misses = 0
     PersistentCache.cache_info = cache_info
     pc1.initialize_if_not_initialized()
     pc2.initialize_if_not_initialized()
-    df["scored"] = None
+    return pc1, pc2
+
+
+def score(df, scoring: str = "lenient") -> pd.DataFrame:
+    """
+    Score the results of the grounding.
+
+    Every grounded diagnosis gets both its lenient `grounded_score` and its `strict_score`,
+    `is_correct` follows the selected scoring mode.
+
+    Args:
+        df (pd.DataFrame): Grounded results, with the `gold` and `grounding` columns.
+        scoring (str): Either "lenient" (any descendant match) or "strict" (exact match or
+            OMIM phenotypic series only).
+
+    Returns:
+        pd.DataFrame: The input with a `scored` column.
+    """
+    if scoring not in SCORING_MODES:
+        raise ValueError(f"Scoring must be one of: {', '.join(SCORING_MODES)}")
+    pc1, pc2 = open_caches()
     mondo = mondo_adapter()
-    for index, row in tqdm(df.iterrows(), total=df.shape[0], desc="Scoring Grounded Results"):
-        grounded_diagnoses = row["grounding"]
-
-        if not row["gold"]:
-            logging.warning(f"No correct ID found for metadata: {row['id']}")
-            continue  # Skip rows with no correct ID
-
-        results = []
-        # Loop through each grounded diagnosis and score them
-        for rank, (_, grounded_list) in enumerate(grounded_diagnoses, start=1):
-            for grounded_id, _ in grounded_list:
-                k = hashkey(grounded_id, row["gold"]["disease_id"])
-                try:
-                    grounded_score = pc2[k]
-                    pc2.hits += 1
-                except KeyError:
-                    grounded_score = score_grounded_result(
-                        grounded_id, row["gold"]["disease_id"], mondo, pc1
-                    )
-                    pc2[k] = grounded_score
-                    pc2.misses += 1
-
-                is_correct = grounded_score > 0  # Score > 0 means either exact or subclass match
-                result_row = {
-                    "rank": rank,
-                    "grounded_id": grounded_id,
-                    "grounded_score": grounded_score,
-                    "is_correct": is_correct,
-                }
-                results.append(result_row)
-        df.at[index, "scored"] = results
-    pc1.close()
-    pc2.close()
+    mappings = OntologyIndex.load_or_build(mondo, CACHE_DIR)
+    try:
+        df = score_batch(df, scoring, mondo, mappings, pc1, pc2)
+    finally:
+        pc1.close()
+        pc2.close()
     print(pc1.cache_info())
     print(pc2.cache_info())
     return df
+
+
+def score_batch(
+    df: pd.DataFrame,
+    scoring: str,
+    mondo: OboGraphInterface,
+    mappings: OntologyIndex,
+    pc1: PersistentCache,
+    pc2: PersistentCache,
+) -> pd.DataFrame:
+    """
+    Score grounded results with resources that are already open, see `score`.
+
+    Lets a caller scoring many batches open the ontology, the mapping index and the caches
+    only once.
+
+    Args:
+        df (pd.DataFrame): Grounded results, with the `gold` and `grounding` columns.
+        scoring (str): Either "lenient" or "strict".
+        mondo (OboGraphInterface): The mondo adapter.
+        mappings (OntologyIndex): The MONDO index, for the OMIMPS mappings.
+        pc1 (PersistentCache): The omim_mappings cache.
+        pc2 (PersistentCache): The score_grounded_result cache.
+
+    Returns:
+        pd.DataFrame: The input with a `scored` column.
+    """
+    df["scored"] = None
+    hits = (pc1.hits, pc1.misses, pc2.hits, pc2.misses)
+    with stage("scoring", items=df.shape[0]):
+        for label, row in tqdm(df.iterrows(), total=df.shape[0], desc="Scoring Grounded Results"):
+            grounded_diagnoses = row["grounding"]
+
+            if not row["gold"]:
+                logging.warning(f"No correct ID found for metadata: {row['metadata']}")
+                continue  # Skip rows with no correct ID
+
+            results = []
+            # Loop through each grounded diagnosis and score them
+            for rank, (_, grounded_list) in enumerate(grounded_diagnoses, start=1):
+                for grounded_id, _ in grounded_list:
+                    k = hashkey(grounded_id, row["gold"]["disease_id"])
+                    try:
+                        grounded_score = pc2[k]
+                        pc2.hits += 1
+                    except KeyError:
+                        grounded_score = score_grounded_result(
+                            grounded_id, row["gold"]["disease_id"], mondo, pc1
+                        )
+                        pc2[k] = grounded_score
+                        pc2.misses += 1
+
+                    grounded_strict_score = strict_score(grounded_id, grounded_score, mappings)
+                    # Score > 0 means either exact or subclass match
+                    if scoring == "strict":
+                        is_correct = grounded_strict_score > 0
+                    else:
+                        is_correct = grounded_score > 0
+                    result_row = {
+                        "rank": rank,
+                        "grounded_id": grounded_id,
+                        "grounded_score": grounded_score,
+                        "strict_score": grounded_strict_score,
+                        "is_correct": is_correct,
+                    }
+                    results.append(result_row)
+            df.at[label, "scored"] = results
+    count(
+        "scoring",
+        omim_cache_hits=pc1.hits - hits[0],
+        omim_cache_misses=pc1.misses - hits[1],
+        score_cache_hits=pc2.hits - hits[2],
+        score_cache_misses=pc2.misses - hits[3],
+    )
+    return df
+
+
+def _reachable_omims(
+    args: Tuple[List[str], Path],
+) -> List[Tuple[str, List[str], Set[str], Dict[str, List[str]]]]:
+    """
+    Collect, for each term, the OMIMs it maps to directly and through its IS_A descendants.
+
+    Runs in a pool worker, on the memory mapped ontology index.
+    """
+    terms, index_dir = args
+    index = OntologyIndex.load(index_dir)
+    reachable = []
+    for term in terms:
+        mappings = {}
+        for descendant in index.descendants(term):
+            mappings[descendant] = list(index.omims(descendant))
+        if term not in mappings:
+            mappings[term] = list(index.omims(term))
+        direct = mappings[term]
+        via_descendants = {omim for omims in mappings.values() for omim in omims}
+        reachable.append((term, direct, via_descendants, mappings))
+    return reachable
+
+
+def _bulk_update(cache: PersistentCache, items: Iterable[Tuple[tuple, object]]) -> int:
+    """
+    Write many entries to a persistent cache, syncing the shelve only once.
+
+    `PersistentCache.__setitem__` syncs to disk on every write, which dominates a warm-up.
+    """
+    count = 0
+    for k, value in items:
+        cache.persistent_dict[cache.hash_key(k)] = (k, value)
+        cache.wrapped[k] = value
+        count += 1
+    cache.persistent_dict.sync()
+    return count
+
+
+def warm_caches(
+    grounded_ids: Set[str],
+    gold_ids: Set[str],
+    cores: int = None,
+    cache_dir: Path = CACHE_DIR,
+    max_scores: Optional[int] = None,
+) -> Tuple[int, int]:
+    """
+    Precompute the OMIM mappings of grounded IDs, and `score_grounded_result` for their pairs
+    with gold IDs.
+
+    The ontology is only queried once per grounded ID, in parallel: the direct and descendant
+    OMIM mappings go to the omim_mappings cache whatever the gold IDs, and are enough to score
+    that ID against any gold ID, with the same outcome as `score_grounded_result`.
+
+    The full product of the IDs is usually far larger than the score cache, so the pairs that
+    match are scored first and the others, which are the bulk, only until `max_scores` new
+    entries. Pairs already present in the cache are not recomputed, and the scores are written
+    to the cache as they are computed.
+
+    Args:
+        grounded_ids (Set[str]): Grounded IDs seen in previous results.
+        gold_ids (Set[str]): Correct disease IDs the grounded IDs will be scored against.
+        cores (int, optional): Number of worker processes. Defaults to all cores.
+        cache_dir (Path): Directory holding the cache files.
+        max_scores (int, optional): Most score entries to add. Defaults to the room left in
+            the score cache.
+
+    Returns:
+        Tuple[int, int]: Number of new omim_mappings and score_grounded_result entries.
+    """
+    if not grounded_ids:
+        return 0, 0
+    pc1, pc2 = open_caches(cache_dir)
+    if max_scores is None:
+        max_scores = max(CACHE_MAXSIZE - pc2.wrapped.currsize, 0)
+    terms = sorted(grounded_ids)
+    cores = min(cores or mp.cpu_count(), len(terms))
+    index_dir = cache_dir / ONTOLOGY_INDEX_NAME
+    OntologyIndex.load_or_build(mondo_adapter(), cache_dir)
+    chunks = [(list(chunk), index_dir) for chunk in np.array_split(terms, cores)]
+    print(f"Warming caches for {len(terms)} grounded IDs with {cores} cores\n")
+    if cores > 1:
+        with mp.Pool(cores) as pool:
+            reachable = [
+                item
+                for result in tqdm(
+                    pool.imap_unordered(_reachable_omims, chunks), total=len(chunks), desc="Warming"
+                )
+                for item in result
+            ]
+    else:
+        reachable = _reachable_omims(chunks[0])
+    reachable.sort(key=lambda item: item[0])
+
+    mappings = {}
+    for _, _, _, term_mappings in reachable:
+        mappings.update(term_mappings)
+    new_mappings = _bulk_update(
+        pc1,
+        ((hashkey(term), omims) for term, omims in mappings.items() if hashkey(term) not in pc1),
+    )
+
+    gold = sorted(gold_ids)
+    matching = (
+        (grounded_id, gold_id)
+        for grounded_id, direct, via, _ in reachable
+        for gold_id in sorted(gold_ids.intersection([grounded_id, *direct, *via]))
+    )
+    others = (
+        (grounded_id, gold_id)
+        for grounded_id, direct, via, _ in reachable
+        for gold_id in gold
+        if gold_id != grounded_id and gold_id not in direct and gold_id not in via
+    )
+    reached = {grounded_id: (direct, via) for grounded_id, direct, via, _ in reachable}
+    missing = (pair for pair in itertools.chain(matching, others) if hashkey(*pair) not in pc2)
+    new_scores = _bulk_update(
+        pc2,
+        (
+            (
+                hashkey(grounded_id, gold_id),
+                _pair_score(grounded_id, gold_id, *reached[grounded_id]),
+            )
+            for grounded_id, gold_id in itertools.islice(missing, max_scores)
+        ),
+    )
+    pc1.close()
+    pc2.close()
+    return new_mappings, new_scores
+
+
+def _pair_score(grounded_id: str, gold_id: str, direct: List[str], via_descendants: Set[str]):
+    """The `score_grounded_result` of a pair, from the OMIMs reachable from the grounded ID."""
+    if grounded_id == gold_id or gold_id in direct:
+        return FULL_SCORE
+    if gold_id in via_descendants:
+        return PARTIAL_SCORE
+    return 0.0
+
+
+def cache_stats(cache_dir: Path = CACHE_DIR) -> pd.DataFrame:
+    """
+    Describe the persistent caches.
+
+    The shelve keys are derived from Python's randomised `hash`, so every session stores its
+    entries under new keys and evicted entries of earlier sessions are never removed from disk.
+    `stale` counts these orphaned rows, which `prune_caches` removes.
+
+    Args:
+        cache_dir (Path): Directory holding the cache files.
+
+    Returns:
+        pd.DataFrame: One row per cache.
+    """
+    rows = []
+    for name in (OMIM_CACHE_NAME, SCORE_CACHE_NAME):
+        files = list(cache_dir.glob(f"{name}*"))
+        if not files:
+            continue
+        pc = PersistentCache(LRUCache, str(cache_dir / name), maxsize=CACHE_MAXSIZE)
+        pc.initialize_if_not_initialized()
+        live = pc.wrapped.currsize
+        rows.append(
+            {
+                "cache": name,
+                "entries": live,
+                "stored": len(pc.persistent_dict),
+                "stale": len(pc.persistent_dict) - live,
+                "maxsize": pc.wrapped.maxsize,
+                "bytes": sum(f.stat().st_size for f in files),
+            }
+        )
+        pc.close()
+    return pd.DataFrame(rows, columns=["cache", "entries", "stored", "stale", "maxsize", "bytes"])
+
+
+def prune_caches(cache_dir: Path = CACHE_DIR, drop_ungrounded: bool = False) -> Dict[str, int]:
+    """
+    Rewrite the persistent caches keeping a single copy of every live entry.
+
+    Args:
+        cache_dir (Path): Directory holding the cache files.
+        drop_ungrounded (bool): Also drop scores of "N/A" grounded IDs.
+
+    Returns:
+        Dict[str, int]: Number of rows removed from each cache.
+    """
+    removed = {}
+    for name in (OMIM_CACHE_NAME, SCORE_CACHE_NAME):
+        if not list(cache_dir.glob(f"{name}*")):
+            continue
+        filename = str(cache_dir / name)
+        pc = PersistentCache(LRUCache, filename, maxsize=CACHE_MAXSIZE)
+        pc.initialize_if_not_initialized()
+        stored = len(pc.persistent_dict)
+        kept = {k: pc.wrapped[k] for k in pc.wrapped.keys() if not (drop_ungrounded and "N/A" in k)}
+        pc.close()
+        with shelve.open(filename, protocol=pickle.HIGHEST_PROTOCOL, flag="n") as db:
+            for k, v in kept.items():
+                db[PersistentCache.hash_key(k)] = (k, v)
+        removed[name] = stored - len(kept)
+    return removed
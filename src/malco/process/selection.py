@@ -0,0 +1,84 @@
+import json
+import re
+from pathlib import Path
+from typing import Optional, Set
+
+import pandas as pd
+
+# Prompt files are named after the phenopacket ID, followed by the language of the prompt
+PROMPT_FILE_RE = re.compile(r"^(?P<ppkt_id>.+)_(?P<lang>[a-z]{2})-prompt\.txt$")
+
+
+def ppkt_file_id(ppkt_id: str) -> str:
+    """
+    Turn a phenopacket ID into the form used in prompt file names, as phenopacket2prompt does.
+
+    >>> ppkt_file_id("PMID_36586412_8")
+    'PMID_36586412_8'
+    >>> ppkt_file_id("PMID_19208399:Patient II-3")
+    'PMID_19208399_Patient_II_3'
+    """
+    return re.sub(r"[^\w]", "_", ppkt_id)
+
+
+def parse_case_keys(metadata: pd.Series) -> pd.DataFrame:
+    """
+    Split prompt file names into their phenopacket ID and language.
+
+    Args:
+        metadata (pd.Series): Prompt file names, e.g. "PMID_36586412_8_en-prompt.txt".
+
+    Returns:
+        pd.DataFrame: The `ppkt_id` and `lang` columns, NaN where a name does not match.
+    """
+    return metadata.str.extract(PROMPT_FILE_RE)
+
+
+def read_case_ids(path: str, ppkt_dir: Optional[str] = None) -> Set[str]:
+    """
+    Read the phenopacket IDs listed in a cases file.
+
+    Each line is either a prompt file name, in any language, or a phenopacket JSON file name.
+    For the latter the ID is read from the phenopacket in `ppkt_dir` if given, otherwise the
+    file name itself is taken as the ID.
+
+    Args:
+        path (str): Path to the cases file.
+        ppkt_dir (str, optional): Directory containing the phenopacket JSON files.
+
+    Returns:
+        Set[str]: Phenopacket IDs, in the form used in the prompt file names.
+    """
+    with open(path, "r") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    ids = set()
+    for line in lines:
+        match = PROMPT_FILE_RE.match(line)
+        if match:
+            ids.add(match["ppkt_id"])
+        elif line.endswith(".json"):
+            if ppkt_dir is None:
+                ids.add(ppkt_file_id(Path(line).stem))
+            else:
+                with open(Path(ppkt_dir) / line, "r") as ppkt:
+                    ids.add(ppkt_file_id(json.load(ppkt)["id"]))
+        else:
+            raise ValueError(
+                "The cases file must contain either a list of json files or a list of prompt file name IDs."
+            )
+    return ids
+
+
+def select_cases(metadata: pd.Series, case_ids: Set[str]) -> pd.Series:
+    """
+    Select the prompt file names, in any language, of the given phenopackets.
+
+    Args:
+        metadata (pd.Series): Prompt file names.
+        case_ids (Set[str]): Phenopacket IDs, see `read_case_ids`.
+
+    Returns:
+        pd.Series: The selected prompt file names.
+    """
+    keys = parse_case_keys(metadata)
+    return metadata[keys["ppkt_id"].isin(case_ids).to_numpy()]
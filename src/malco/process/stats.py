@@ -0,0 +1,244 @@
+import multiprocessing as mp
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from malco.io.full_results import read_scored_table
+from malco.process.selection import parse_case_keys
+from malco.process.summary import first_correct_ranks
+
+DEFAULT_KS = (1, 3, 10)
+DEFAULT_RESAMPLES = 10000
+
+
+def read_case_ranks(full_result_file: str) -> pd.Series:
+    """
+    Rank of the first correct diagnosis of every case of a run, inf if none is correct.
+
+    Args:
+        full_result_file (str): Path to the full results of the run.
+
+    Returns:
+        pd.Series: The ranks, indexed by phenopacket ID so that runs in different languages
+            can be paired, or by prompt file name where it has no phenopacket ID.
+    """
+    cases, long = read_scored_table(full_result_file)
+    ranks = first_correct_ranks(cases, long).fillna(np.inf).to_numpy()
+    keys = parse_case_keys(cases["metadata"])["ppkt_id"].fillna(cases["metadata"])
+    return pd.Series(ranks, index=keys.to_numpy(), name="rank")
+
+
+def metric_names(ks: Sequence[int] = DEFAULT_KS) -> List[str]:
+    return [f"Top-{k}" for k in ks] + ["MRR"]
+
+
+def metric_values(ranks: np.ndarray, ks: Sequence[int] = DEFAULT_KS) -> np.ndarray:
+    """
+    Per case contribution to every metric: 100 for a top-k hit, so that means are percentages
+    like in `topk_accuracy`, and the reciprocal rank.
+
+    Returns:
+        np.ndarray: A (cases, metrics) array, see `metric_names` for the columns.
+    """
+    ranks = np.asarray(ranks, dtype=float)
+    hits = (ranks[:, None] <= np.asarray(ks)[None, :]) * 100.0
+    return np.column_stack([hits, 1 / ranks])
+
+
+def bootstrap_ci(
+    ranks: np.ndarray,
+    ks: Sequence[int] = DEFAULT_KS,
+    resamples: int = DEFAULT_RESAMPLES,
+    confidence: float = 0.95,
+    seed=0,
+) -> pd.DataFrame:
+    """
+    Percentile bootstrap confidence intervals of the top-k accuracies and the MRR of a run.
+
+    Cases with the same rank contribute the same to every metric, so resampling cases comes
+    down to drawing how many cases of every distinct rank a resample has, a multinomial draw.
+    All resamples are drawn at once as a (resamples, distinct ranks) array, with no loop over
+    the resamples and no (resamples, cases) array.
+
+    Args:
+        ranks (np.ndarray): First correct rank of every case, inf if none.
+        ks (Sequence[int]): The values of k.
+        resamples (int): Number of bootstrap resamples.
+        confidence (float): Confidence level of the intervals.
+        seed: Seed of the generator, anything `np.random.default_rng` takes.
+
+    Returns:
+        pd.DataFrame: The `estimate`, `low` and `high` of every metric.
+    """
+    rng = np.random.default_rng(seed)
+    distinct, counts = np.unique(np.asarray(ranks, dtype=float), return_counts=True)
+    n = counts.sum()
+    values = metric_values(distinct, ks)
+    draws = rng.multinomial(n, counts / n, size=resamples)
+    means = draws @ values / n
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(means, [alpha, 1 - alpha], axis=0)
+    return pd.DataFrame(
+        {"estimate": counts @ values / n, "low": low, "high": high}, index=metric_names(ks)
+    )
+
+
+def paired_permutation_test(
+    ranks_a: pd.Series,
+    ranks_b: pd.Series,
+    ks: Sequence[int] = DEFAULT_KS,
+    resamples: int = DEFAULT_RESAMPLES,
+    seed=0,
+) -> pd.DataFrame:
+    """
+    Paired permutation test of the difference in top-k accuracies and MRR between two runs.
+
+    Only the cases of both runs are compared. Under the null hypothesis the two results of a
+    case are exchangeable, so every permutation flips the sign of the per case differences at
+    random. Cases with the same pair of ranks have the same difference, so only the sum of their
+    signs is drawn, for all permutations and pairs of ranks together, see `_sign_sums`.
+
+    Runs without cases in common cannot be compared, their differences and p-values are NaN.
+
+    Args:
+        ranks_a (pd.Series): First correct ranks of the first run, see `read_case_ranks`.
+        ranks_b (pd.Series): First correct ranks of the second run.
+        ks (Sequence[int]): The values of k.
+        resamples (int): Number of permutations.
+        seed: Seed of the generator, anything `np.random.default_rng` takes.
+
+    Returns:
+        pd.DataFrame: The mean `difference` (a - b) of every metric, with its two-sided
+            `p_value`, and the number of paired `cases`.
+    """
+    rng = np.random.default_rng(seed)
+    common = ranks_a.index.intersection(ranks_b.index)
+    if common.empty:
+        return pd.DataFrame(
+            {"difference": np.nan, "p_value": np.nan, "cases": 0}, index=metric_names(ks)
+        )
+    pairs = np.column_stack([ranks_a.loc[common], ranks_b.loc[common]])
+    distinct, counts = np.unique(pairs, axis=0, return_counts=True)
+    n = counts.sum()
+    differences = metric_values(distinct[:, 0], ks) - metric_values(distinct[:, 1], ks)
+    observed = counts @ differences / n
+    # Pairs of equal ranks, often the bulk of the cases, differ in nothing whatever their signs
+    differing = (differences != 0).any(axis=1)
+    permuted = _sign_sums(rng, counts[differing], resamples) @ differences[differing] / n
+    # Differences within floating point error of the observed one count as extreme as well
+    extreme = np.abs(permuted) >= np.abs(observed) - 1e-12
+    return pd.DataFrame(
+        {
+            "difference": observed,
+            "p_value": (1 + extreme.sum(axis=0)) / (resamples + 1),
+            "cases": n,
+        },
+        index=metric_names(ks),
+    )
+
+
+def _sign_sums(rng: np.random.Generator, counts: np.ndarray, size: int) -> np.ndarray:
+    """
+    `size` draws of the sum of `count` random signs, for every count.
+
+    That is 2 * Binomial(count, 1/2) - count, drawn as the number of set bits among `count`
+    random bits, many times faster than sampling binomials.
+
+    Returns:
+        np.ndarray: A (size, len(counts)) array.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    if len(counts) == 0:
+        return np.zeros((size, 0), dtype=np.int64)
+    words = -(-counts // 64)
+    starts = np.concatenate([[0], np.cumsum(words)[:-1]])
+    # Bits used in every word, only the last word of a count is partly used
+    bits = np.full(words.sum(), 64, dtype=np.uint64)
+    bits[starts + words - 1] = counts - 64 * (words - 1)
+    masks = np.where(
+        bits == 64, np.uint64(2**64 - 1), (np.uint64(1) << (bits % np.uint64(64))) - np.uint64(1)
+    )
+    draws = rng.integers(0, 2**64 - 1, size=(size, len(masks)), dtype=np.uint64, endpoint=True)
+    ones = _popcount(draws & masks)
+    return 2 * np.add.reduceat(ones, starts, axis=1) - counts
+
+
+def _popcount(x: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(x).astype(np.int64)
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((x * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.int64)
+
+
+def holm_adjust(p_values: np.ndarray) -> np.ndarray:
+    """
+    Holm-Bonferroni adjusted p-values, for the family of tests `p_values`.
+
+    NaN p-values, of tests that could not be run, stay NaN and are not part of the family.
+    """
+    p_values = np.asarray(p_values, dtype=float)
+    result = np.full(len(p_values), np.nan)
+    tested = np.flatnonzero(~np.isnan(p_values))
+    order = tested[np.argsort(p_values[tested])]
+    m = len(order)
+    adjusted = np.maximum.accumulate((m - np.arange(m)) * p_values[order]).clip(max=1)
+    result[order] = adjusted
+    return result
+
+
+def _compare(args) -> pd.DataFrame:
+    (name_a, ranks_a), (name_b, ranks_b), ks, resamples, seed = args
+    result = paired_permutation_test(ranks_a, ranks_b, ks, resamples, seed)
+    return result.rename_axis("metric").reset_index().assign(run_a=name_a, run_b=name_b)
+
+
+def compare_runs(
+    ranks: Dict[str, pd.Series],
+    ks: Sequence[int] = DEFAULT_KS,
+    resamples: int = DEFAULT_RESAMPLES,
+    baseline: Optional[str] = None,
+    cores: int = 1,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Paired permutation tests between runs, on a process pool if `cores` > 1.
+
+    Every pair gets its own random stream, spawned from `seed`, so the results do not depend
+    on the number of cores.
+
+    Args:
+        ranks (Dict[str, pd.Series]): First correct ranks of every run, by run name.
+        ks (Sequence[int]): The values of k.
+        resamples (int): Number of permutations.
+        baseline (str, optional): Only compare this run with every other one, instead of
+            every pair of runs.
+        cores (int): Number of worker processes.
+        seed (int): Seed of the generators.
+
+    Returns:
+        pd.DataFrame: One row per pair of runs and metric, with the Holm adjusted p-values of
+            every metric over all pairs in `p_holm`. Pairs without cases in common have NaN
+            p-values and are left out of the adjustment.
+    """
+    if baseline is None:
+        pairs: List[Tuple[str, str]] = list(combinations(ranks, 2))
+    else:
+        pairs = [(baseline, name) for name in ranks if name != baseline]
+    seeds = np.random.SeedSequence(seed).spawn(len(pairs))
+    tasks = [((a, ranks[a]), (b, ranks[b]), ks, resamples, s) for (a, b), s in zip(pairs, seeds)]
+    if cores > 1 and len(tasks) > 1:
+        with mp.Pool(min(cores, len(tasks))) as pool:
+            results = pool.map(_compare, tasks)
+    else:
+        results = [_compare(task) for task in tasks]
+    if not results:
+        return pd.DataFrame(
+            columns=["run_a", "run_b", "metric", "difference", "p_value", "p_holm", "cases"]
+        )
+    table = pd.concat(results, ignore_index=True)
+    table["p_holm"] = table.groupby("metric")["p_value"].transform(holm_adjust)
+    return table[["run_a", "run_b", "metric", "difference", "p_value", "p_holm", "cases"]]
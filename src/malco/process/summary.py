@@ -1,77 +1,155 @@
 from collections import Counter
 
+import numpy as np
 import pandas as pd
-from tqdm import tqdm
 
 from malco.config import MalcoConfig
 
+SCORED_COLUMNS = ["rank", "grounded_id", "grounded_score", "strict_score", "is_correct"]
+SUMMARY_HEADER = [
+    "run",
+    "n1",
+    "n2",
+    "n3",
+    "n4",
+    "n5",
+    "n6",
+    "n7",
+    "n8",
+    "n9",
+    "n10",
+    "n10p",
+    "nf",
+    "grounding_failed",
+    "num_cases",
+    "total_grounding_failures",
+    "items_processed",
+]
+
+
+def scored_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Flatten the `scored` column into a long table, one row per scored diagnosis.
+
+    Args:
+        df (pd.DataFrame): Scored results, one row per case.
+
+    Returns:
+        pd.DataFrame: The scored diagnoses, with the positional index of their `case` in `df`
+            and their 1-based `position` within the case.
+    """
+    scored = [s if isinstance(s, list) else [] for s in df["scored"]]
+    lengths = np.fromiter((len(s) for s in scored), dtype=np.int64, count=len(scored))
+    long = pd.DataFrame.from_records(
+        [result for results in scored for result in results], columns=SCORED_COLUMNS
+    )
+    long["is_correct"] = long["is_correct"].astype(bool)
+    long["case"] = np.repeat(np.arange(len(scored)), lengths)
+    long["position"] = long.groupby("case").cumcount() + 1
+    return long
+
+
+def first_correct_ranks(df: pd.DataFrame, long: pd.DataFrame = None) -> pd.Series:
+    """
+    Position of the first correct diagnosis of every case, NaN if none is correct.
+
+    Args:
+        df (pd.DataFrame): Scored results, one row per case.
+        long (pd.DataFrame, optional): `scored_table(df)`, if already computed.
+
+    Returns:
+        pd.Series: One value per row of `df`, in the same order.
+    """
+    if long is None:
+        long = scored_table(df)
+    first = long.loc[long["is_correct"]].groupby("case")["position"].min()
+    return first.reindex(np.arange(len(df))).reset_index(drop=True)
+
+
+def rank_counts(df: pd.DataFrame, long: pd.DataFrame = None) -> Counter:
+    """
+    Count the cases by rank of the first correct diagnosis, plus grounding failures and items.
+
+    Args:
+        df (pd.DataFrame): Scored results, one row per case.
+        long (pd.DataFrame, optional): `scored_table(df)`, if already computed. Then `df` only
+            needs to have one row per case.
+
+    Returns:
+        Counter: Counts keyed by n1...n10, n10p, nf, gf, nc, tgf and items.
+    """
+    if long is None:
+        long = scored_table(df)
+    n_cases = len(df)
+    correct_rank = first_correct_ranks(df, long).to_numpy()
+    grounding_failure = (
+        long["grounded_id"]
+        .eq("N/A")
+        .groupby(long["case"])
+        .any()
+        .reindex(np.arange(n_cases), fill_value=False)
+        .to_numpy(dtype=bool)
+    )
+    found = ~np.isnan(correct_rank)
 
-def summarize(df, run_config: MalcoConfig):
-    # Initialize the counter for each rank
     rank_counter = Counter()
-    for _, row in tqdm(df.iterrows(), total=len(df)):
-        correct_rank = None
-        grounding_failure = None
-        item_number = None
-        if row["scored"] is not None and len(row["scored"]) > 0:
-            # TODO the following line should really count things like "Sorry I am not able to reply"
-            rank_counter["nc"] += 1  # Count the number of cases processed
-            # array of results
-            scored = pd.DataFrame(row["scored"])
-            # Find the first occurrence of the correct diagnosis
-            correct_rank = (
-                scored[scored["is_correct"]].index.min() + 1
-                if not scored[scored["is_correct"]].empty
-                else None
-            )
-            grounding_failure = any(scored["grounded_id"] == "N/A")
-            # Get number of items in scored and save it in item_number
-            item_number = len(scored)
-        # Increment the appropriate counter based on the rank or nf if not found
-        if correct_rank is not None and 1 <= correct_rank <= 10:
-            rank_counter[f"n{correct_rank}"] += 1
-        elif correct_rank is not None and correct_rank > 10:
-            rank_counter["n10p"] += 1  # Increment n10p for ranks greater than 10
-        else:
-            rank_counter["nf"] += 1
-        # If grounding_failure is True, also increase that counter
-        if grounding_failure is True:
-            rank_counter["tgf"] += 1
-            if correct_rank is None:
-                rank_counter["gf"] += 1
-        # Count all items processed
-        if item_number is not None:
-            rank_counter["items"] += item_number
-
-    # Prepare the row to be written to the output file (without the 'lang' column)
-    output_row = [
-        run_config.name[0:2],  # run name
-        rank_counter.get("n1", 0),
-        rank_counter.get("n2", 0),
-        rank_counter.get("n3", 0),
-        rank_counter.get("n4", 0),
-        rank_counter.get("n5", 0),
-        rank_counter.get("n6", 0),
-        rank_counter.get("n7", 0),
-        rank_counter.get("n8", 0),
-        rank_counter.get("n9", 0),
-        rank_counter.get("n10", 0),
-        rank_counter.get("n10p", 0),  # rank > 10
-        rank_counter.get("nf", 0),
-        rank_counter.get(
-            "gf", 0
-        ),  # among the not found, how many involved a grounding failrue somewhere in the dx
-        rank_counter.get(
-            "nc", 0
-        ),  # total number of cases processed (count valid replies by model, if any invalid ones present at all)
-        rank_counter.get("tgf", 0),  # total grounding failures
-        rank_counter.get("items", 0),  # total items processed
-    ]
+    # TODO the following should really count things like "Sorry I am not able to reply"
+    rank_counter["nc"] = int(long["case"].nunique())  # Count the number of cases processed
+    ranks, counts = np.unique(correct_rank[found & (correct_rank <= 10)], return_counts=True)
+    for rank, count in zip(ranks, counts):
+        rank_counter[f"n{int(rank)}"] = int(count)
+    rank_counter["n10p"] = int((found & (correct_rank > 10)).sum())
+    rank_counter["nf"] = int((~found).sum())
+    rank_counter["tgf"] = int(grounding_failure.sum())
+    rank_counter["gf"] = int((grounding_failure & ~found).sum())
+    rank_counter["items"] = len(long)
+    return +rank_counter
+
+
+def summary_row(rank_counter: Counter) -> dict:
+    """
+    The summary of a run as a dict keyed by the columns of `SUMMARY_HEADER`, except `run`.
+
+    Args:
+        rank_counter (Counter): Output of `rank_counts`, or a sum of them.
+    """
+    return {
+        **{f"n{i}": rank_counter.get(f"n{i}", 0) for i in range(1, 11)},
+        "n10p": rank_counter.get("n10p", 0),  # rank > 10
+        "nf": rank_counter.get("nf", 0),
+        # among the not found, how many involved a grounding failrue somewhere in the dx
+        "grounding_failed": rank_counter.get("gf", 0),
+        # total number of cases processed (count valid replies by model, if any invalid ones present at all)
+        "num_cases": rank_counter.get("nc", 0),
+        "total_grounding_failures": rank_counter.get("tgf", 0),
+        "items_processed": rank_counter.get("items", 0),
+    }
+
+
+def write_summary(rank_counter: Counter, run_config: MalcoConfig) -> None:
+    """
+    Write the counts to `run_config.result_file`, as a single row.
+
+    Args:
+        rank_counter (Counter): Output of `rank_counts`, or a sum of them.
+        run_config (MalcoConfig): The run configuration.
+    """
+    row = summary_row(rank_counter)
+    output_row = [run_config.name[0:2], *(row[column] for column in SUMMARY_HEADER[1:])]
 
     # Write the results to the output file (without 'lang' column)
     with open(f"{run_config.result_file}", "w") as f:
-        f.write(
-            "run\tn1\tn2\tn3\tn4\tn5\tn6\tn7\tn8\tn9\tn10\tn10p\tnf\tgrounding_failed\tnum_cases\ttotal_grounding_failures\titems_processed\n"
-        )
+        f.write("\t".join(SUMMARY_HEADER) + "\n")
         f.write("\t".join(map(str, output_row)) + "\n")
-    return True
+
+
+def summarize(df, run_config: MalcoConfig, long: pd.DataFrame = None) -> Counter:
+    """
+    Count the ranks of the first correct diagnoses and write them to `run_config.result_file`.
+
+    Returns:
+        Counter: The counts, see `rank_counts`.
+    """
+    rank_counter = rank_counts(df, long)
+    write_summary(rank_counter, run_config)
+    return rank_counter
@@ -0,0 +1,335 @@
+import hashlib
+import multiprocessing as mp
+import os
+import sqlite3
+import time
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import tiktoken
+
+from malco.constants import CACHE_DIR
+from malco.io.reading import iter_result_json
+from malco.process.selection import PROMPT_FILE_RE
+
+TOKEN_CACHE_NAME = "token_counts.sqlite"
+# Encoding of the models tiktoken does not know, e.g. open models, as an approximation
+DEFAULT_ENCODING = "o200k_base"
+# US dollars per million input and output tokens, the OpenAI list price of gpt-4o as of
+# October 2024 (gpt-4o-2024-08-06). --input_price and --output_price override it
+PRICES = {"gpt-4o": (2.50, 10.00)}
+INPUT, OUTPUT = "input", "output"
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counts (
+    encoding TEXT NOT NULL,
+    key TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    PRIMARY KEY (encoding, key)
+) WITHOUT ROWID;
+"""
+# Texts tokenized per task of the process pool
+_CHUNK_SIZE = 256
+# Texts looked up in the cache per query, below SQLite's limit on query parameters
+_LOOKUP_SIZE = 900
+
+# (model, language, input or output, text)
+TextRecord = Tuple[str, str, str, str]
+
+
+def encoding_name(model: str) -> str:
+    """The tiktoken encoding of a model, `DEFAULT_ENCODING` for models tiktoken does not know."""
+    try:
+        return tiktoken.encoding_name_for_model(model)
+    except KeyError:
+        return DEFAULT_ENCODING
+
+
+@lru_cache(maxsize=None)
+def _encoding(name: str) -> tiktoken.Encoding:
+    return tiktoken.get_encoding(name)
+
+
+def text_key(text: str) -> str:
+    """Key of a text in the token cache, the SHA-256 of its content."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TokenCache:
+    """
+    Persistent token counts, keyed by encoding and the hash of the text.
+
+    Counting the same prompts or responses again, e.g. after adding a language, only
+    tokenizes the texts it has not seen.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR):
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self.path = Path(cache_dir) / TOKEN_CACHE_NAME
+        self.db = sqlite3.connect(self.path, timeout=30)
+        self.db.executescript(_SCHEMA)
+
+    def get_many(self, encoding: str, keys: Iterable[str]) -> Dict[str, int]:
+        """The cached counts of `keys`, missing keys are left out."""
+        keys = list(keys)
+        found = {}
+        for start in range(0, len(keys), _LOOKUP_SIZE):
+            batch = keys[start : start + _LOOKUP_SIZE]
+            found.update(
+                self.db.execute(
+                    f"SELECT key, tokens FROM counts WHERE encoding = ? "
+                    f"AND key IN ({', '.join('?' * len(batch))})",
+                    [encoding, *batch],
+                )
+            )
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, str, int]]) -> None:
+        """Store (encoding, key, tokens) counts."""
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO counts VALUES (?, ?, ?)", items)
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM counts").fetchone()[0]
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "TokenCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _count(task: Tuple[str, List[str]]) -> List[int]:
+    encoding, texts = task
+    enc = _encoding(encoding)
+    # Special tokens in prompts or responses are plain text to the API as well
+    return [len(tokens) for tokens in enc.encode_ordinary_batch(texts, num_threads=1)]
+
+
+def _batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def count_tokens(
+    records: Iterable[TextRecord], cache_dir: Path = CACHE_DIR, cores: int = 1
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Token counts of prompts and responses, tokenizing only the texts missing from the cache.
+
+    Only the hashes of the texts are kept while reading the records, and the texts missing
+    from the cache, which are tokenized on a process pool once all records are read.
+
+    Args:
+        records (Iterable[TextRecord]): (model, language, input or output, text) records,
+            see `iter_prompt_records` and `iter_response_records`.
+        cache_dir (Path): Directory holding the token cache.
+        cores (int): Number of worker processes.
+
+    Returns:
+        Tuple[pd.DataFrame, int]: One row per record with its `model`, `language`, `kind`,
+            `encoding` and `tokens`, and the number of texts that were tokenized.
+    """
+    rows, counts, pending = [], {}, {}
+    with TokenCache(cache_dir) as cache:
+        for batch in _batched(records, _LOOKUP_SIZE):
+            keyed = [
+                (model, language, kind, encoding_name(model), text_key(text), text)
+                for model, language, kind, text in batch
+            ]
+            for encoding in {row[3] for row in keyed}:
+                keys = {key for *_, enc, key, _ in keyed if enc == encoding}
+                found = cache.get_many(encoding, keys - {k for e, k in counts if e == encoding})
+                counts.update({(encoding, key): tokens for key, tokens in found.items()})
+            for model, language, kind, encoding, key, text in keyed:
+                if (encoding, key) not in counts:
+                    pending[(encoding, key)] = text
+                rows.append((model, language, kind, encoding, key))
+        new = _tokenize(pending, cores)
+        cache.put_many((encoding, key, tokens) for (encoding, key), tokens in new.items())
+    counts.update(new)
+    df = pd.DataFrame(rows, columns=["model", "language", "kind", "encoding", "key"])
+    df["tokens"] = [counts[(encoding, key)] for encoding, key in zip(df["encoding"], df["key"])]
+    return df.drop(columns="key"), len(new)
+
+
+def _tokenize(texts: Dict[Tuple[str, str], str], cores: int) -> Dict[Tuple[str, str], int]:
+    """Token counts of texts keyed by (encoding, key), in chunks on a process pool."""
+    keys = list(texts)
+    tasks = []
+    for encoding in dict.fromkeys(encoding for encoding, _ in keys):
+        same = [key for key in keys if key[0] == encoding]
+        tasks += [(encoding, chunk) for chunk in _batched(same, _CHUNK_SIZE)]
+    work = [(encoding, [texts[key] for key in chunk]) for encoding, chunk in tasks]
+    if cores > 1 and len(work) > 1:
+        with mp.Pool(min(cores, len(work))) as pool:
+            results = pool.map(_count, work)
+    else:
+        results = [_count(task) for task in work]
+    return {key: n for (_, chunk), counts in zip(tasks, results) for key, n in zip(chunk, counts)}
+
+
+def _language(prompt_id: str) -> str:
+    match = PROMPT_FILE_RE.match(os.path.basename(prompt_id))
+    return match["lang"] if match else ""
+
+
+def iter_prompt_records(path: str, model: str) -> Iterator[TextRecord]:
+    """
+    The prompts to send to a model, to project costs before inference.
+
+    Args:
+        path (str): A directory of prompt files, searched recursively, or a JSONL file with
+            the `id` and `prompt` of every case.
+        model (str): The model the prompts are meant for.
+
+    Yields:
+        TextRecord: One input record per prompt, with the language of its file name.
+    """
+    if os.path.isdir(path):
+        for prompt_file in sorted(Path(path).rglob("*.txt")):
+            text = prompt_file.read_text(encoding="utf-8")
+            yield model, _language(prompt_file.name), INPUT, text
+    else:
+        for record in iter_result_json(path, ("id", "prompt")):
+            yield model, _language(record["id"] or ""), INPUT, record["prompt"] or ""
+
+
+def iter_response_records(response_file: str, model: str) -> Iterator[TextRecord]:
+    """
+    The prompts and responses of a run.
+
+    Args:
+        response_file (str): Response JSONL file, with the `id`, `prompt` and `response` of
+            every case.
+        model (str): The model of the run.
+
+    Yields:
+        TextRecord: An input and an output record per case.
+    """
+    for record in iter_result_json(response_file, ("id", "prompt", "response")):
+        language = _language(record["id"] or "")
+        yield model, language, INPUT, record["prompt"] or ""
+        yield model, language, OUTPUT, record["response"] or ""
+
+
+def request_token_estimates(prompt_dir: str, model: str, output_tokens: int) -> Dict[str, int]:
+    """
+    Expected tokens of the request of every prompt file in a directory, for rate limiting.
+
+    Args:
+        prompt_dir (str): Directory of prompt files.
+        model (str): The model the prompts are sent to.
+        output_tokens (int): Expected tokens of every response.
+
+    Returns:
+        Dict[str, int]: The tokens of the prompt plus `output_tokens`, by prompt file name.
+    """
+    files = sorted(Path(prompt_dir).glob("*.txt"))
+    records = ((model, "", INPUT, file.read_text(encoding="utf-8")) for file in files)
+    counts, _ = count_tokens(records, cores=mp.cpu_count())
+    return {file.name: tokens + output_tokens for file, tokens in zip(files, counts["tokens"])}
+
+
+def token_report(
+    counts: pd.DataFrame, prices: Optional[Dict[str, Tuple[float, float]]] = None
+) -> pd.DataFrame:
+    """
+    Input and output token totals, and their cost, per model and language.
+
+    Args:
+        counts (pd.DataFrame): Token counts, see `count_tokens`.
+        prices (Dict[str, Tuple[float, float]], optional): US dollars per million input and
+            output tokens, by model, default is `PRICES`. Models without a price get no cost.
+
+    Returns:
+        pd.DataFrame: The `cases`, `input_tokens`, `output_tokens`, `input_cost`,
+            `output_cost` and `cost` of every model and language, and a `total` row.
+    """
+    prices = PRICES if prices is None else prices
+    totals = (
+        counts.groupby(["model", "language", "kind"])["tokens"]
+        .agg(["size", "sum"])
+        .unstack("kind", fill_value=0)
+        .reindex(columns=pd.MultiIndex.from_product([["size", "sum"], [INPUT, OUTPUT]]))
+        .fillna(0)
+        .astype(int)
+    )
+    table = pd.DataFrame(
+        {
+            "cases": totals[("size", INPUT)],
+            "input_tokens": totals[("sum", INPUT)],
+            "output_tokens": totals[("sum", OUTPUT)],
+        }
+    ).reset_index()
+    price = table["model"].map(lambda model: prices.get(model, (float("nan"),) * 2))
+    table["input_cost"] = table["input_tokens"] * price.str[0] / 1e6
+    table["output_cost"] = table["output_tokens"] * price.str[1] / 1e6
+    table["cost"] = table["input_cost"] + table["output_cost"]
+    sums = table[["cases", "input_tokens", "output_tokens"]].sum()
+    # Only priced models add to the total cost, which is NaN without any
+    costs = table[["input_cost", "output_cost", "cost"]].sum(min_count=1)
+    table.loc[len(table)] = {"model": "total", "language": "", **sums, **costs}
+    return table.astype({column: int for column in sums.index})
+
+
+class RateLimiter:
+    """
+    Keeps requests within a number of tokens and of requests per minute, over a sliding minute.
+
+    Every request is admitted with an estimate of its tokens, e.g. the token count of its
+    prompt plus the expected response, and `settle` replaces the estimate by the actual usage
+    once known. A request larger than the whole budget is admitted alone.
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute: Optional[int] = None,
+        requests_per_minute: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.clock = clock
+        self.sleep = sleep
+        self.window = deque()
+
+    def _fits(self, tokens: int) -> bool:
+        if not self.window:
+            return True
+        if self.requests_per_minute and len(self.window) >= self.requests_per_minute:
+            return False
+        used = sum(entry[1] for entry in self.window)
+        return not self.tokens_per_minute or used + tokens <= self.tokens_per_minute
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Wait until a request of `tokens` fits in the budget, and admit it.
+
+        Returns:
+            float: Seconds waited.
+        """
+        waited = 0.0
+        while True:
+            now = self.clock()
+            while self.window and self.window[0][0] <= now - 60:
+                self.window.popleft()
+            if self._fits(tokens):
+                self.window.append([now, tokens])
+                return waited
+            delay = self.window[0][0] + 60 - now
+            self.sleep(delay)
+            waited += delay
+
+    def settle(self, tokens: Optional[int]) -> None:
+        """Replace the estimate of the last admitted request by its actual usage, if known."""
+        if tokens is not None and self.window:
+            self.window[-1][1] = tokens
@@ -0,0 +1,81 @@
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+RANK_COLUMNS = [f"n{j}" for j in range(1, 11)]
+DEFAULT_KS = (1, 3, 5, 10)
+
+
+def _rank_counts(df: pd.DataFrame) -> np.ndarray:
+    """The n1...n10 columns as a (runs, 10) array, missing columns counting as zero."""
+    return df.reindex(columns=RANK_COLUMNS, fill_value=0).to_numpy(dtype=float)
+
+
+def case_totals(df: pd.DataFrame) -> np.ndarray:
+    """
+    Number of cases of every run of a top-n table.
+
+    Taken from `num_cases` where present, otherwise the sum of n1...n10, n10p and nf.
+    """
+    totals = _rank_counts(df).sum(axis=1)
+    for column in ("n10p", "nf"):
+        if column in df.columns:
+            totals += df[column].fillna(0).to_numpy(dtype=float)
+    if "num_cases" in df.columns:
+        num_cases = df["num_cases"].to_numpy(dtype=float)
+        totals = np.where(np.isnan(num_cases), totals, num_cases)
+    return totals
+
+
+def topk_counts(df: pd.DataFrame, ks: Sequence[int] = DEFAULT_KS) -> pd.DataFrame:
+    """
+    Number of cases with a correct diagnosis in the top k, for every run of a top-n table.
+
+    Args:
+        df (pd.DataFrame): Top-n table, one run per row with the n1...n10 columns.
+        ks (Sequence[int]): The values of k, at most 10.
+
+    Returns:
+        pd.DataFrame: One `Top-k` column per k, with the index of `df`.
+    """
+    if any(k < 1 or k > len(RANK_COLUMNS) for k in ks):
+        raise ValueError(f"k must be between 1 and {len(RANK_COLUMNS)}, got {list(ks)}")
+    # Kept in the dtype of the table, so that integer counts stay integers
+    cumulative = df.reindex(columns=RANK_COLUMNS, fill_value=0).to_numpy().cumsum(axis=1)
+    return pd.DataFrame(
+        cumulative[:, [k - 1 for k in ks]], columns=[f"Top-{k}" for k in ks], index=df.index
+    )
+
+
+def topk_accuracy(
+    df: pd.DataFrame, ks: Sequence[int] = DEFAULT_KS, mrr: bool = True
+) -> pd.DataFrame:
+    """
+    Percentage of cases with a correct diagnosis in the top k, for every run of a top-n table.
+
+    Runs without cases get 0. All runs are computed at once, so tables of hundreds of runs
+    take no longer than a single one.
+
+    Args:
+        df (pd.DataFrame): Top-n table, one run per row with the n1...n10 columns and
+            optionally n10p, nf and num_cases, see `case_totals`.
+        ks (Sequence[int]): The values of k, at most 10.
+        mrr (bool): Also compute the mean reciprocal rank. Correct diagnoses beyond rank 10
+            only have a count, they add nothing to it.
+
+    Returns:
+        pd.DataFrame: One `Top-k` column per k, and `MRR` between 0 and 1, with the index of `df`.
+    """
+    totals = case_totals(df)
+    safe_totals = np.where(totals > 0, totals, 1.0)
+    counts = topk_counts(df, ks)
+    accuracy = pd.DataFrame(
+        np.where(totals[:, None] > 0, counts.to_numpy() / safe_totals[:, None] * 100, 0.0),
+        columns=counts.columns,
+        index=df.index,
+    )
+    if mrr:
+        reciprocal = _rank_counts(df) @ (1 / np.arange(1, len(RANK_COLUMNS) + 1))
+        accuracy["MRR"] = np.where(totals > 0, reciprocal / safe_totals, 0.0)
+    return accuracy
@@ -0,0 +1,72 @@
+import json
+import sqlite3
+
+from oaklib.datamodels.vocabulary import LABEL_PREDICATE
+
+from malco.benchmarks.corpus import corpus_terms, generate_corpus, write_corpus
+from malco.io.reading import read_responses
+from malco.process.mapping_index import MappingIndex
+from malco.process.ontology_index import OntologyIndex
+
+TERMS = [
+    ("MONDO:1", "Marfan syndrome", "OMIM:154700"),
+    ("MONDO:2", "Ehlers-Danlos syndrome", "OMIM:130000"),
+    ("MONDO:3", "Loeys-Dietz syndrome", "OMIM:609192"),
+]
+
+
+def test_same_seed_same_corpus():
+    first = list(generate_corpus(TERMS, 20, seed=1))
+    assert first == list(generate_corpus(TERMS, 20, seed=1))
+    assert first != list(generate_corpus(TERMS, 20, seed=2))
+
+
+def test_languages_and_styles():
+    records = list(generate_corpus(TERMS, 8, languages=("en", "de"), failure_rate=0))
+    assert [r["id"] for r in records[:2]] == ["PMID_0_en-prompt.txt", "PMID_1_de-prompt.txt"]
+    assert records[1]["response"].startswith("1. **")
+    assert records[2]["response"].startswith("**Differential diagnosis:**\n1. ")
+    assert records[3]["response"].endswith(" - passend zu den beschriebenen Merkmalen")
+    labels = {label for _, label, _ in TERMS}
+    for record in records:
+        assert record["gold"]["disease_id"].startswith("OMIM:")
+        assert record["gold"]["disease_name"] in labels
+
+
+def test_failure_rate():
+    labels = {label for _, label, _ in TERMS}
+    for record in generate_corpus(TERMS, 10, styles=("numbered",), failure_rate=0):
+        names = [line.split(". ", 1)[1] for line in record["response"].splitlines()]
+        assert len(names) == 5
+        assert set(names) <= labels
+    for record in generate_corpus(TERMS, 10, styles=("numbered",), failure_rate=1):
+        names = [line.split(". ", 1)[1] for line in record["response"].splitlines()]
+        assert not set(names) & labels
+
+
+def test_write_corpus(tmp_path):
+    path = tmp_path / "corpus.jsonl"
+    assert write_corpus(generate_corpus(TERMS, 5), path) == 5
+    with open(path) as f:
+        assert len([json.loads(line) for line in f]) == 5
+    responses = read_responses(path)
+    assert list(responses["metadata"]) == [f"PMID_{i}_en-prompt.txt" for i in range(5)]
+
+
+def test_corpus_terms(tmp_path):
+    path = tmp_path / "mondo.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE statements (subject, predicate, object, value)")
+        conn.execute("CREATE TABLE entailed_edge (subject, predicate, object)")
+        conn.executemany(
+            "INSERT INTO statements VALUES (?, ?, NULL, ?)",
+            [
+                ("MONDO:1", LABEL_PREDICATE, "Marfan syndrome"),
+                ("MONDO:2", LABEL_PREDICATE, "Marfan syndrome type 1"),
+            ],
+        )
+    mappings = MappingIndex(
+        {"MONDO:1": ("OMIM:154700", "OMIM:154701"), "MONDO:3": ("OMIM:130000",)}, {}
+    )
+    index = OntologyIndex.from_db(str(path), mappings)
+    assert corpus_terms(index) == [("MONDO:1", "Marfan syndrome", "OMIM:154700")]
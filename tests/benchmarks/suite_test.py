@@ -0,0 +1,38 @@
+from malco.benchmarks.suite import append_history, find_regressions, load_history
+
+
+def result(benchmark, scale, seconds):
+    return {"benchmark": benchmark, "scale": scale, "seconds": seconds}
+
+
+def test_history(tmp_path):
+    path = tmp_path / "history.json"
+    assert load_history(path) == []
+    append_history(path, [result("ground", 1000, 1.0)])
+    entry = append_history(path, [result("ground", 1000, 2.0)])
+    history = load_history(path)
+    assert len(history) == 2
+    assert history[-1] == entry
+    assert entry["results"] == [result("ground", 1000, 2.0)]
+    assert "timestamp" in entry
+
+
+def test_find_regressions():
+    history = [
+        {"results": [result("ground", 1000, 4.0), result("score", 1000, 1.0)]},
+        {"results": [result("ground", 1000, 1.0)]},
+    ]
+    results = [
+        result("ground", 1000, 1.1),
+        result("score", 1000, 1.5),
+        result("score", 10000, 9.0),
+    ]
+    # Compared with the latest run of each benchmark and scale only
+    assert find_regressions(history, results, threshold=0.2) == [
+        {**result("score", 1000, 1.5), "previous_seconds": 1.0, "slowdown": 0.5}
+    ]
+    assert find_regressions(history, results, threshold=0.05) == [
+        {**result("ground", 1000, 1.1), "previous_seconds": 1.0, "slowdown": 1.1 / 1.0 - 1},
+        {**result("score", 1000, 1.5), "previous_seconds": 1.0, "slowdown": 0.5},
+    ]
+    assert find_regressions([], results) == []
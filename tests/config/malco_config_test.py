@@ -0,0 +1,25 @@
+import click
+import pytest
+from click.testing import CliRunner
+
+from malco.config import expand_config_paths
+from malco.main import core
+
+
+def test_expand_config_paths(tmp_path):
+    for name in ["b.yaml", "a.yaml", "c.txt"]:
+        (tmp_path / name).write_text("name: x\n")
+    explicit = str(tmp_path / "b.yaml")
+    paths = expand_config_paths([explicit, str(tmp_path / "*.yaml")])
+    assert paths == [explicit, str(tmp_path / "a.yaml")]
+    with pytest.raises(click.BadParameter, match="No configuration matches"):
+        expand_config_paths([str(tmp_path / "*.json")])
+    with pytest.raises(click.BadParameter, match="does not exist"):
+        expand_config_paths([explicit, str(tmp_path / "d.yaml")])
+
+
+def test_evaluate_reports_missing_config(tmp_path):
+    result = CliRunner().invoke(core, ["evaluate", "--config", str(tmp_path / "missing.yaml")])
+    assert result.exit_code == 2
+    assert "Invalid value for --config" in result.output
+    assert "missing.yaml does not exist" in result.output
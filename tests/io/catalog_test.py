@@ -0,0 +1,142 @@
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+import yaml
+from click.testing import CliRunner
+
+from malco.config import MalcoConfig
+from malco.io.catalog import parse_run_name, query_runs, read_result_summary, register_run
+from malco.main import core
+from malco.process.generate_plots import combined_plot_inputs
+from malco.process.summary import summary_row, write_summary
+
+
+def _run_config(tmp_path, name, result_name):
+    results = tmp_path / "results"
+    path = tmp_path / f"{name}.yaml"
+    path.write_text(
+        yaml.safe_dump(
+            {
+                "name": name,
+                "output_dir": str(results),
+                "result_file": str(results / result_name),
+                "full_result_file": str(results / "full_results" / f"full_df_{name}.tsv"),
+            }
+        )
+    )
+    return MalcoConfig(path)
+
+
+def test_parse_run_name():
+    assert parse_run_name("data/results/topn_result_cs-Meditron3_70B.tsv") == (
+        "Meditron3_70B",
+        "cs",
+    )
+    assert parse_run_name("topn_result_gpt-4o.tsv") == ("gpt-4o", "en")
+    assert parse_run_name("topn_result_de-gpt-4o.tsv") == ("gpt-4o", "de")
+    assert parse_run_name("topn_result_GPT_4o.tsv") == ("GPT_4o", "en")
+
+
+def test_register_and_query(tmp_path):
+    en = _run_config(tmp_path, "en-gpt-4o", "topn_result_gpt-4o.tsv")
+    de = _run_config(tmp_path, "de-gpt-4o", "topn_result_de-gpt-4o.tsv")
+    o1 = _run_config(tmp_path, "en-o1", "topn_result_o1.tsv")
+    register_run(en, summary_row(Counter(n1=3, nc=10)), "lenient")
+    register_run(de, summary_row(Counter(n1=2, nc=10)), "lenient")
+    register_run(o1, summary_row(Counter(n1=5, nc=10)), "strict")
+    # Registering again replaces the entry
+    register_run(en, summary_row(Counter(n1=4, nc=10)), "lenient")
+
+    results = tmp_path / "results"
+    runs = query_runs(results)
+    assert list(runs["name"]) == [
+        "de-gpt-4o",
+        "en-gpt-4o",
+        "en-o1",
+    ]
+    assert runs.set_index("name").loc["en-gpt-4o", "n1"] == 4
+    assert runs.set_index("name").loc["en-o1", "scoring"] == "strict"
+    assert runs.set_index("name").loc["de-gpt-4o", "config"] == de.config_path
+    assert Path(runs["result_file"][0]) == results / "topn_result_de-gpt-4o.tsv"
+    assert list(query_runs(results, "gpt-4o", ["en"])["name"]) == ["en-gpt-4o"]
+    assert list(query_runs(results, "gpt*", ["ALL"])["language"]) == ["de", "en"]
+    assert list(query_runs(results, "*", ["en", "de"])["model"]) == ["gpt-4o", "gpt-4o", "o1"]
+
+
+def test_read_result_summary(tmp_path):
+    run_config = _run_config(tmp_path, "de-gpt-4o", "topn_result_de-gpt-4o.tsv")
+    (tmp_path / "results").mkdir()
+    counts = Counter(n1=2, n3=1, nf=4, gf=1, nc=7, tgf=2, items=30)
+    write_summary(counts, run_config)
+    assert read_result_summary(run_config.result_file) == summary_row(counts)
+
+
+def test_combined_plot_inputs_from_catalog(tmp_path):
+    results = tmp_path / "results"
+    # Not registered and in another language
+    results.mkdir()
+    (results / "topn_result_it-gpt-4o.tsv").write_text("n1\n1\n")
+    for lang in ("en", "de"):
+        name = "topn_result_gpt-4o.tsv" if lang == "en" else f"topn_result_{lang}-gpt-4o.tsv"
+        run_config = _run_config(tmp_path, f"{lang}-gpt-4o", name)
+        write_summary(Counter(n1=1, nc=1), run_config)
+        register_run(run_config, summary_row(Counter(n1=1, nc=1)))
+    files, labels, output, comparing = combined_plot_inputs(
+        results, tmp_path / "plots", "gpt-4o", ["en", "de"]
+    )
+    assert [file.name for file in files] == ["topn_result_de-gpt-4o.tsv", "topn_result_gpt-4o.tsv"]
+    assert labels == ["German", "English"]
+    assert comparing == "Language"
+    assert output == tmp_path / "plots" / "plots" / "topn_gpt-4o_.png"
+
+
+def test_combined_plot_inputs_adds_unregistered_files(tmp_path, caplog):
+    results = tmp_path / "results"
+    results.mkdir()
+    run_config = _run_config(tmp_path, "en-gpt-4o", "topn_result_gpt-4o.tsv")
+    write_summary(Counter(n1=1, nc=1), run_config)
+    register_run(run_config, summary_row(Counter(n1=1, nc=1)))
+    # Evaluated before the catalog existed
+    (results / "topn_result_o1.tsv").write_text("n1\n1\n")
+    files, labels, _, _ = combined_plot_inputs(results, tmp_path / "plots", "*", ["en"])
+    assert [file.name for file in files] == ["topn_result_gpt-4o.tsv", "topn_result_o1.tsv"]
+    assert labels == ["gpt-4o", "o1"]
+    assert "topn_result_o1.tsv" in caplog.text
+    assert "topn_result_gpt-4o.tsv" not in caplog.text
+
+
+def test_select_registers_the_subset_as_its_own_run(tmp_path):
+    run_config = _run_config(tmp_path, "de-gpt-4o", "topn_result_de-gpt-4o.tsv")
+    full_results = Path(run_config.full_result_file)
+    full_results.parent.mkdir(parents=True)
+    scored = [{"rank": 1, "grounded_id": "MONDO:1", "grounded_score": 1.0}]
+    scored[0].update({"strict_score": 1.0, "is_correct": True})
+    pd.DataFrame(
+        {
+            "metadata": ["PMID_1_P1_de-prompt.txt", "PMID_2_P2_de-prompt.txt"],
+            "gold": [{"disease_id": "OMIM:1"}, {"disease_id": "OMIM:2"}],
+            "grounding": [[], []],
+            "scored": [scored, []],
+        }
+    ).to_csv(full_results, sep="\t", index=False)
+    write_summary(Counter(n1=1, nf=1, nc=2), run_config)
+    register_run(run_config, summary_row(Counter(n1=1, nf=1, nc=2)), "strict")
+    cases = tmp_path / "ppkts_subset.txt"
+    cases.write_text("PMID_2_P2_en-prompt.txt\n")
+
+    result = CliRunner().invoke(
+        core, ["select", "--config", run_config.config_path, "--cases", str(cases)]
+    )
+    assert result.exit_code == 0, result.output
+    assert "1 of 2 cases selected" in result.output
+    # The evaluated run keeps its summary and catalog entry
+    evaluated = query_runs(tmp_path / "results").set_index("name").loc["de-gpt-4o"]
+    assert (evaluated["n1"], evaluated["nf"], evaluated["scoring"]) == (1, 1, "strict")
+    assert read_result_summary(run_config.result_file)["n1"] == 1
+
+    subset = query_runs(tmp_path / "results" / "ppkts_subset").set_index("name")
+    subset = subset.loc["de-gpt-4o-ppkts_subset"]
+    assert (subset["model"], subset["language"]) == ("gpt-4o", "de")
+    assert (subset["n1"], subset["nf"], subset["scoring"]) == (0, 1, "strict")
+    assert Path(subset["result_file"]).read_text().startswith("run\t")
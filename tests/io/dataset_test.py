@@ -0,0 +1,73 @@
+import pyarrow.parquet as pq
+from click.testing import CliRunner
+
+from malco.io.dataset import (
+    PROMPT_SCHEMA,
+    build_datasets,
+    dataset_file,
+    prompt_languages,
+    read_gold_labels,
+)
+from malco.main import core
+
+GOLD = [
+    ("Marfan syndrome", "OMIM:154700", "PMID_1_P1_en-prompt.txt"),
+    ("Marfan syndrome", "OMIM:154700", "PMID_2_P2_en-prompt.txt"),
+    ("Alport syndrome", "OMIM:301050", "PMID_3_P3_en-prompt.txt"),
+]
+
+
+def _write_prompts(tmp_path, langs=("en", "de")):
+    prompt_dir = tmp_path / "prompts"
+    prompt_dir.mkdir()
+    (prompt_dir / "correct_results.tsv").write_text("".join("\t".join(row) + "\n" for row in GOLD))
+    for lang in langs:
+        (prompt_dir / lang).mkdir()
+        for i in (1, 2, 3, 4):
+            (prompt_dir / lang / f"PMID_{i}_P{i}_{lang}-prompt.txt").write_text(f"{lang} case {i}")
+    return prompt_dir
+
+
+def test_read_gold_labels(tmp_path):
+    prompt_dir = _write_prompts(tmp_path)
+    gold = read_gold_labels(prompt_dir / "correct_results.tsv")
+    assert gold["PMID_3_P3"] == {"disease_id": "OMIM:301050", "disease_name": "Alport syndrome"}
+    assert prompt_languages(prompt_dir) == ["de", "en"]
+
+
+def test_build_datasets(tmp_path):
+    prompt_dir = _write_prompts(tmp_path)
+    out_dir = tmp_path / "hf"
+    done = sorted(build_datasets(prompt_dir, out_dir, cores=2, row_group_size=3))
+    # Case 4 is not in the gold file
+    assert done == [("de", 4, 1), ("en", 4, 1)]
+
+    parquet = pq.ParquetFile(dataset_file(out_dir, "de"))
+    assert parquet.schema_arrow.equals(PROMPT_SCHEMA)
+    assert parquet.metadata.num_row_groups == 2
+    gold_id = parquet.metadata.row_group(0).column(2)
+    assert gold_id.path_in_schema == "gold.disease_id"
+    assert any("DICTIONARY" in encoding for encoding in gold_id.encodings)
+    rows = parquet.read().to_pylist()
+    # Prompts in other languages are labelled through their phenopacket ID
+    assert rows[0] == {
+        "id": "PMID_1_P1_de-prompt.txt",
+        "prompt": "de case 1",
+        "gold": {"disease_id": "OMIM:154700", "disease_name": "Marfan syndrome"},
+    }
+    assert rows[3]["gold"] is None
+    assert not list(out_dir.rglob("*.tmp"))
+
+
+def test_dataset_build_command(tmp_path):
+    prompt_dir = _write_prompts(tmp_path)
+    out_dir = tmp_path / "hf"
+    result = CliRunner().invoke(
+        core,
+        ["dataset", "build", "--prompts", str(prompt_dir), "--output", str(out_dir)]
+        + ["--lang", "en", "--cores", "1"],
+    )
+    assert result.exit_code == 0, result.output
+    assert "en: saved 4 prompts" in result.output
+    assert pq.read_metadata(dataset_file(out_dir, "en")).num_rows == 4
+    assert not dataset_file(out_dir, "de").exists()
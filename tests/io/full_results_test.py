@@ -0,0 +1,117 @@
+import pandas as pd
+import pytest
+
+from malco.io.full_results import (
+    FullResultsWriter,
+    read_full_results,
+    read_scored_table,
+    write_full_results,
+)
+
+
+def _df():
+    return pd.DataFrame(
+        {
+            "metadata": ["PMID_1_en-prompt.txt", "PMID_2_en-prompt.txt", "PMID_3_en-prompt.txt"],
+            "gold": [
+                {"disease_id": "OMIM:1", "disease_name": "one"},
+                {"disease_id": "OMIM:2", "disease_name": "two"},
+                "",
+            ],
+            "grounding": [
+                [("Disease one", [("MONDO:1", "disease one")])],
+                [
+                    ("Disease X", [("N/A", "No grounding found")]),
+                    ("Disease two", [("MONDO:2", "disease two"), ("MONDO:3", "two")]),
+                ],
+                [],
+            ],
+            "scored": [
+                [
+                    {
+                        "rank": 1,
+                        "grounded_id": "MONDO:1",
+                        "grounded_score": 1.0,
+                        "strict_score": 1.0,
+                        "is_correct": True,
+                    }
+                ],
+                [
+                    {
+                        "rank": 1,
+                        "grounded_id": "N/A",
+                        "grounded_score": 0.0,
+                        "strict_score": 0.0,
+                        "is_correct": False,
+                    },
+                    {
+                        "rank": 2,
+                        "grounded_id": "MONDO:2",
+                        "grounded_score": 0.5,
+                        "strict_score": 0.0,
+                        "is_correct": True,
+                    },
+                ],
+                None,
+            ],
+        }
+    )
+
+
+@pytest.mark.parametrize("suffix", [".tsv", ".parquet"])
+def test_round_trip(tmp_path, suffix):
+    path = tmp_path / f"full_results{suffix}"
+    write_full_results(_df(), str(path))
+    df = read_full_results(str(path))
+    assert df["metadata"].tolist() == _df()["metadata"].tolist()
+    assert df["grounding"][1] == _df()["grounding"][1]
+    assert df["scored"][1] == _df()["scored"][1]
+    assert df["gold"][0] == _df()["gold"][0]
+    assert not df["gold"][2]
+    assert not df["scored"][2]
+
+
+@pytest.mark.parametrize("suffix", [".tsv", ".parquet"])
+def test_read_with_filters(tmp_path, suffix):
+    path = tmp_path / f"full_results{suffix}"
+    write_full_results(_df(), str(path))
+    df = read_full_results(
+        str(path),
+        columns=["metadata", "scored"],
+        filters=[("metadata", "in", ["PMID_2_en-prompt.txt"])],
+    )
+    assert list(df.columns) == ["metadata", "scored"]
+    assert df["metadata"].tolist() == ["PMID_2_en-prompt.txt"]
+
+
+@pytest.mark.parametrize("suffix", [".tsv", ".parquet"])
+def test_read_scored_table(tmp_path, suffix):
+    path = tmp_path / f"full_results{suffix}"
+    write_full_results(_df(), str(path))
+    cases, long = read_scored_table(str(path))
+    assert len(cases) == 3
+    assert long["case"].tolist() == [0, 1, 1]
+    assert long["position"].tolist() == [1, 1, 2]
+    assert long["is_correct"].tolist() == [True, False, True]
+    assert long["grounded_id"].tolist() == ["MONDO:1", "N/A", "MONDO:2"]
+
+
+@pytest.mark.parametrize("suffix", [".tsv", ".parquet"])
+def test_read_with_empty_filter(tmp_path, suffix):
+    path = tmp_path / f"full_results{suffix}"
+    write_full_results(_df(), str(path))
+    cases, long = read_scored_table(str(path), filters=[("metadata", "in", [])])
+    assert cases.empty
+    assert long.empty
+
+
+@pytest.mark.parametrize("suffix", [".tsv", ".parquet"])
+def test_writer_appends_batches(tmp_path, suffix):
+    whole = tmp_path / f"whole{suffix}"
+    batched = tmp_path / f"batched{suffix}"
+    write_full_results(_df(), str(whole))
+    with FullResultsWriter(str(batched)) as writer:
+        writer.write(_df().iloc[:2])
+        writer.write(_df().iloc[2:])
+    assert writer.rows == 3
+    pd.testing.assert_frame_equal(read_full_results(str(batched)), read_full_results(str(whole)))
@@ -0,0 +1,85 @@
+import math
+
+from click.testing import CliRunner
+
+from malco.io.hpoa import disease_summary, load_disease_summary, read_hpoa, read_information_content
+from malco.main import core
+
+HEADER = (
+    "#description: HPO annotations for rare diseases\n"
+    "#version: 2024-04-26\n"
+    "database_id\tdisease_name\tqualifier\thpo_id\treference\tevidence\tonset\tfrequency"
+    "\tsex\tmodifier\taspect\tbiocuration\n"
+)
+ROWS = [
+    ("OMIM:154700", "Marfan syndrome", "HP:0001166", "PMID:1", "P", "HPO:a[2009-02-17]"),
+    ("OMIM:154700", "Marfan syndrome", "HP:0001166", "PMID:2", "P", "HPO:b[2012-04-01]"),
+    ("OMIM:154700", "Marfan syndrome", "HP:0000545", "PMID:1", "P", "HPO:a[2015-01-01]"),
+    ("OMIM:154700", "Marfan syndrome", "HP:0000006", "OMIM:154700", "I", "HPO:c[2007-11-02]"),
+    ("OMIM:301050", "Alport syndrome", "HP:0000407", "OMIM:301050", "P", "HPO:a[2020-06-30]"),
+    ("ORPHA:1", "Unknown disease", "HP:0000006", "ORPHA:1", "I", ""),
+]
+IC = "HP:0001166\t5.5\nHP:0000545\t2.5\n"
+
+
+def _write_hpoa(tmp_path):
+    path = tmp_path / "phenotype.hpoa"
+    lines = [
+        "\t".join([db_id, name, "", hpo_id, reference, "PCS", "", "", "", "", aspect, curation])
+        for db_id, name, hpo_id, reference, aspect, curation in ROWS
+    ]
+    path.write_text(HEADER + "\n".join(lines) + "\n")
+    (tmp_path / "ic.txt").write_text(IC)
+    return path
+
+
+def test_disease_summary(tmp_path):
+    hpoa_path = _write_hpoa(tmp_path)
+    summary = disease_summary(read_hpoa(hpoa_path), read_information_content(tmp_path / "ic.txt"))
+    assert list(summary.index) == ["OMIM:154700", "OMIM:301050", "ORPHA:1"]
+
+    marfan = summary.loc["OMIM:154700"]
+    assert marfan["disease_name"] == "Marfan syndrome"
+    assert str(marfan["earliest_curation"].date()) == "2007-11-02"
+    assert str(marfan["latest_curation"].date()) == "2015-01-01"
+    assert (marfan["annotations"], marfan["phenotypes"], marfan["references"]) == (4, 2, 3)
+    # Repeated terms count once
+    assert (marfan["mean_ic"], marfan["max_ic"], marfan["sum_ic"]) == (4.0, 5.5, 8.0)
+    assert marfan["missing_ic"] == 0
+
+    alport = summary.loc["OMIM:301050"]
+    assert alport["missing_ic"] == 1 and math.isnan(alport["sum_ic"])
+    unknown = summary.loc["ORPHA:1"]
+    assert unknown["phenotypes"] == 0
+    assert str(unknown["earliest_curation"]) == "NaT"
+
+
+def test_load_disease_summary_caches(tmp_path):
+    hpoa_path = _write_hpoa(tmp_path)
+    cache_dir = tmp_path / "caches"
+    summary = load_disease_summary(hpoa_path, cache_dir=cache_dir)
+    cached = list(cache_dir.glob("hpoa_summary_*.parquet"))
+    assert len(cached) == 1 and "mean_ic" not in summary
+    assert load_disease_summary(hpoa_path, cache_dir=cache_dir).equals(summary)
+
+    # Another IC file or HPOA release is another summary
+    with_ic = load_disease_summary(hpoa_path, tmp_path / "ic.txt", cache_dir=cache_dir)
+    assert with_ic.loc["OMIM:154700", "max_ic"] == 5.5
+    hpoa_path.write_text(hpoa_path.read_text().replace("2007-11-02", "2006-01-01"))
+    changed = load_disease_summary(hpoa_path, cache_dir=cache_dir)
+    assert str(changed.loc["OMIM:154700", "earliest_curation"].date()) == "2006-01-01"
+    assert len(list(cache_dir.glob("hpoa_summary_*.parquet"))) == 3
+    assert not list(cache_dir.glob("*.tmp"))
+
+
+def test_hpoa_summary_command(tmp_path, monkeypatch):
+    hpoa_path = _write_hpoa(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    result = CliRunner().invoke(
+        core,
+        ["hpoa", "summary", "--hpoa", str(hpoa_path), "--ic", "ic.txt", "--output", "out.tsv"],
+    )
+    assert result.exit_code == 0, result.output
+    assert "Summarised 3 diseases" in result.output
+    assert (tmp_path / "out.tsv").read_text().startswith("disease_id\tdisease_name")
+    assert list((tmp_path / "caches").glob("hpoa_summary_*.parquet"))
@@ -0,0 +1,84 @@
+import json
+import os
+
+from click.testing import CliRunner
+
+from malco.io.ppkt_index import (
+    default_index_path,
+    load_ppkt_index,
+    read_ppkt_index,
+    update_ppkt_index,
+)
+from malco.main import core
+
+
+def _ppkt(ppkt_id, pmid, disease="OMIM:154700", features=("HP:0001166",)):
+    return {
+        "id": ppkt_id,
+        "phenotypicFeatures": [{"type": {"id": hpo}} for hpo in features]
+        + [{"type": {"id": "HP:0000098"}, "excluded": True}],
+        "diseases": [{"term": {"id": disease, "label": "Marfan syndrome"}}],
+        "metaData": {"externalReferences": [{"id": f"PMID:{pmid}"}, {"id": "DOI:10.1/x"}]},
+    }
+
+
+def _write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(content))
+
+
+def test_update_ppkt_index(tmp_path):
+    store = tmp_path / "store"
+    _write(store / "FBN1" / "PMID_1_P1.json", _ppkt("PMID_1:P1", 1))
+    _write(store / "FBN1" / "PMID_2_P2.json", _ppkt("PMID_2:P2", 2))
+    _write(store / "COL4A5" / "PMID_3_P3.json", _ppkt("PMID_3:P3", 3, "OMIM:301050"))
+    (store / "broken.json").write_text("{not json")
+
+    update = update_ppkt_index(store, cores=2)
+    assert (update.parsed, update.unchanged, update.removed) == (3, 0, 0)
+    assert update.failed == ["broken.json"]
+    index = read_ppkt_index(default_index_path(store)).set_index("case_id")
+    assert index.loc["PMID_1_P1", "filename"] == os.path.join("FBN1", "PMID_1_P1.json")
+    assert index.loc["PMID_1_P1", "pmids"].tolist() == [1]
+    assert index.loc["PMID_3_P3", "disease_ids"].tolist() == ["OMIM:301050"]
+    assert index.loc["PMID_2_P2", "hpo_terms"].tolist() == ["HP:0001166"]
+    assert index.loc["PMID_2_P2", "excluded_hpo_terms"].tolist() == ["HP:0000098"]
+
+    # Only the changed and new phenopackets are parsed again
+    changed = store / "FBN1" / "PMID_2_P2.json"
+    _write(changed, _ppkt("PMID_2:P2", 2, features=("HP:0001166", "HP:0001519")))
+    os.utime(changed, ns=(1, 1))
+    _write(store / "PMID_4_P4.json", _ppkt("PMID_4:P4", 4))
+    (store / "COL4A5" / "PMID_3_P3.json").unlink()
+    (store / "broken.json").unlink()
+    update = update_ppkt_index(store)
+    assert (update.parsed, update.unchanged, update.removed) == (2, 1, 1)
+    index = read_ppkt_index(default_index_path(store), columns=["case_id", "hpo_terms"])
+    assert index["case_id"].tolist() == ["PMID_1_P1", "PMID_2_P2", "PMID_4_P4"]
+    assert index["hpo_terms"][1].tolist() == ["HP:0001166", "HP:0001519"]
+
+
+def test_load_ppkt_index(tmp_path):
+    store = tmp_path / "store"
+    _write(store / "PMID_1_P1.json", _ppkt("PMID_1:P1", 1))
+    index = load_ppkt_index(store, columns=["filename", "pmids"])
+    assert index["filename"].tolist() == ["PMID_1_P1.json"]
+    # New phenopackets are indexed on the next load
+    _write(store / "PMID_2_P2.json", _ppkt("PMID_2:P2", 2))
+    assert load_ppkt_index(store, columns=["case_id"])["case_id"].tolist() == [
+        "PMID_1_P1",
+        "PMID_2_P2",
+    ]
+
+
+def test_ppkt_index_command(tmp_path):
+    store = tmp_path / "store"
+    _write(store / "PMID_1_P1.json", _ppkt("PMID_1:P1", 1))
+    index_path = tmp_path / "index.parquet"
+    args = ["ppkt", "index", "--dir", str(store), "--index", str(index_path), "--cores", "1"]
+    result = CliRunner().invoke(core, args)
+    assert result.exit_code == 0, result.output
+    assert "Parsed 1 phenopackets, 0 unchanged" in result.output
+    result = CliRunner().invoke(core, args)
+    assert "Parsed 0 phenopackets, 1 unchanged" in result.output
+    assert len(read_ppkt_index(index_path)) == 1
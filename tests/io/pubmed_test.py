@@ -0,0 +1,147 @@
+import gzip
+import json
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from malco.io.pubmed import (
+    PubMedCache,
+    iter_dates,
+    iter_medline,
+    iter_pubmed_xml,
+    parse_pmid,
+    published_after,
+)
+from malco.main import core
+
+PUBMED_XML = """<?xml version="1.0" encoding="utf-8"?>
+<PubmedArticleSet>
+  <PubmedArticle>
+    <MedlineCitation Status="MEDLINE" Owner="NLM">
+      <PMID Version="1">36586412</PMID>
+      <DateCompleted><Year>2023</Year><Month>02</Month><Day>01</Day></DateCompleted>
+    </MedlineCitation>
+    <PubmedData>
+      <History>
+        <PubMedPubDate PubStatus="received"><Year>2022</Year><Month>5</Month><Day>3</Day></PubMedPubDate>
+        <PubMedPubDate PubStatus="pubmed"><Year>2023</Year><Month>1</Month><Day>2</Day></PubMedPubDate>
+        <PubMedPubDate PubStatus="entrez"><Year>2022</Year><Month>12</Month><Day>31</Day></PubMedPubDate>
+      </History>
+    </PubmedData>
+  </PubmedArticle>
+  <PubmedArticle>
+    <MedlineCitation><PMID Version="1">19864672</PMID></MedlineCitation>
+    <PubmedData>
+      <History>
+        <PubMedPubDate PubStatus="pubmed"><Year>2009</Year><Month>Oct</Month><Day>30</Day></PubMedPubDate>
+      </History>
+    </PubmedData>
+  </PubmedArticle>
+</PubmedArticleSet>
+"""
+
+MEDLINE = """PMID- 34722527
+OWN - NLM
+TI  - A title
+      spanning two lines
+EDAT- 2021/11/02 06:00
+MHDA- 2022/01/01 06:00
+
+PMID- 4045952
+EDAT- 1985/01/01 00:00
+"""
+
+
+def test_parse_pmid():
+    assert parse_pmid("PMID:123") == 123
+    assert parse_pmid("PMID_36586412_8.json") == 36586412
+    assert parse_pmid(" 42 ") == 42
+    assert parse_pmid("no_reference.json") is None
+
+
+def test_iter_pubmed_xml(tmp_path):
+    dump = tmp_path / "pubmed25n0001.xml.gz"
+    with gzip.open(dump, "wt") as f:
+        f.write(PUBMED_XML)
+    # The entrez date, else the pubmed date
+    assert list(iter_pubmed_xml(str(dump))) == [(36586412, "2022-12-31"), (19864672, "2009-10-30")]
+
+
+def test_iter_medline(tmp_path):
+    medline = tmp_path / "pubmed.txt"
+    medline.write_text(MEDLINE)
+    assert list(iter_medline(str(medline))) == [(34722527, "2021-11-02"), (4045952, "1985-01-01")]
+
+
+def test_cache_fills_only_missing(tmp_path):
+    date_json = tmp_path / "pmid2date_dict.json"
+    date_json.write_text(
+        json.dumps(
+            {"PMID:36586412": {"date": "2023-01-01 00:00:00"}, "PMID:1": {"date": "2000-01-01"}}
+        )
+    )
+    dump = tmp_path / "pubmed.xml"
+    dump.write_text(PUBMED_XML)
+    with PubMedCache(tmp_path) as cache:
+        assert cache.add(iter_dates(str(date_json)), "json") == 2
+        # Known PMIDs keep their date
+        assert cache.add(iter_dates(str(dump)), "xml") == 1
+        assert cache.dates(["PMID:36586412", "PMID_19864672_P1", 5]) == {
+            36586412: "2023-01-01",
+            19864672: "2009-10-30",
+        }
+        assert cache.missing(["PMID:5", "PMID:1"]) == [5]
+        assert cache.add(iter_dates(str(dump)), "xml", replace=True) == 2
+        assert cache.dates([36586412]) == {36586412: "2022-12-31"}
+        assert len(cache) == 3
+
+
+def test_published_after(tmp_path):
+    with PubMedCache(tmp_path) as cache:
+        cache.add(((pmid, f"{2000 + pmid % 25}-06-01") for pmid in range(1, 20001)), "test")
+        pmids = {f"PMID_{pmid}_case.json": [pmid] for pmid in range(1, 5001)}
+        pmids["PMID_99999999_x.json"] = [99999999]
+        # Counts from the earliest known publication
+        pmids["two.json"] = [21, 99999999, 24]
+        pmids["none.json"] = []
+        start = time.perf_counter()
+        after, unknown = published_after(cache, pmids, "2020-06-01")
+        elapsed = time.perf_counter() - start
+    assert after == [f"PMID_{pmid}_case.json" for pmid in range(1, 5001) if pmid % 25 > 20] + [
+        "two.json"
+    ]
+    assert unknown == ["PMID_99999999_x.json", "none.json"]
+    assert elapsed < 1
+
+
+def _phenopacket(pmid):
+    references = [{"id": f"PMID:{pmid}"}] if pmid else []
+    return json.dumps({"id": "x", "metaData": {"externalReferences": references}})
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_pubmed_commands(tmp_path, monkeypatch, indexed):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "pubmed.xml").write_text(PUBMED_XML)
+    ppkt_dir = tmp_path / "jsons"
+    (ppkt_dir / "FBN1").mkdir(parents=True)
+    (ppkt_dir / "OTHER").mkdir()
+    # The PMID of the phenopacket wins over the one in its file name
+    (ppkt_dir / "FBN1" / "PMID_19864672_8.json").write_text(_phenopacket(36586412))
+    (ppkt_dir / "OTHER" / "case_1.json").write_text(_phenopacket(19864672))
+    (ppkt_dir / "PMID_7_a.json").write_text(_phenopacket(None))
+    if indexed:
+        result = CliRunner().invoke(core, ["ppkt", "index", "--dir", "jsons"])
+        assert result.exit_code == 0, result.output
+    result = CliRunner().invoke(core, ["pubmed", "import", "pubmed.xml"])
+    assert result.exit_code == 0, result.output
+    assert "added 2 PMIDs" in result.output
+    result = CliRunner().invoke(
+        core,
+        ["pubmed", "after", "--date", "2020-01-01", "--ppkt_dir", "jsons", "--output", "a.txt"],
+    )
+    assert result.exit_code == 0, result.output
+    assert "1 of 3 phenopackets published after 2020-01-01" in result.output
+    assert "1 phenopackets have no known date" in result.output
+    assert (tmp_path / "a.txt").read_text() == "FBN1/PMID_19864672_8.json\n"
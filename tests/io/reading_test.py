@@ -0,0 +1,112 @@
+import gzip
+import json
+
+import pytest
+import yaml
+
+from malco.io.reading import (
+    OFFSET_INDEX_SUFFIX,
+    RESPONSE_FIELDS,
+    convert_raw_result_yaml,
+    iter_raw_result_yaml,
+    iter_response_batches,
+    iter_result_json,
+    load_offset_index,
+    read_raw_result_yaml,
+    read_responses,
+    read_result_by_id,
+    read_result_json,
+)
+
+RECORDS = [
+    {
+        "id": f"PMID_{i}_en-prompt.txt",
+        "prompt": "A long prompt " * 10,
+        "gold": {"disease_id": f"OMIM:{i}", "disease_name": f"disease {i}"},
+        "response": f"1. Disease {i}",
+    }
+    for i in range(5)
+]
+
+
+def _write(tmp_path):
+    path = tmp_path / "responses.jsonl"
+    with open(path, "w") as f:
+        for record in RECORDS:
+            f.write(json.dumps(record) + "\n")
+        f.write("\n")
+    return path
+
+
+def test_iter_result_json_projects_fields(tmp_path):
+    path = _write(tmp_path)
+    records = list(iter_result_json(path, RESPONSE_FIELDS))
+    assert [set(r) for r in records] == [set(RESPONSE_FIELDS)] * len(RECORDS)
+    assert read_result_json(path) == RECORDS
+
+
+def test_read_responses(tmp_path):
+    df = read_responses(_write(tmp_path))
+    assert list(df.columns) == ["service_answers", "metadata", "gold"]
+    assert df["metadata"].tolist() == [r["id"] for r in RECORDS]
+    assert df["service_answers"].iloc[2] == "1. Disease 2"
+
+
+def test_read_result_by_id(tmp_path):
+    path = _write(tmp_path)
+    offsets = load_offset_index(path)
+    assert (tmp_path / f"responses.jsonl{OFFSET_INDEX_SUFFIX}").is_file()
+    assert load_offset_index(path) == offsets
+    assert read_result_by_id(path, "PMID_3_en-prompt.txt", offsets) == RECORDS[3]
+    assert read_result_by_id(path, "PMID_9_en-prompt.txt") is None
+
+
+def test_offset_lookups_reject_compressed_files(tmp_path):
+    path = tmp_path / "responses.jsonl.gz"
+    with gzip.open(path, "wt") as f:
+        f.write("".join(json.dumps(record) + "\n" for record in RECORDS))
+    with pytest.raises(ValueError, match="gzip-compressed"):
+        load_offset_index(str(path))
+    with pytest.raises(ValueError, match="gzip-compressed"):
+        read_result_by_id(str(path), "PMID_3_en-prompt.txt")
+    assert not (tmp_path / f"responses.jsonl.gz{OFFSET_INDEX_SUFFIX}").exists()
+
+
+def test_offset_index_is_rebuilt_when_file_changes(tmp_path):
+    path = _write(tmp_path)
+    load_offset_index(path)
+    with open(path, "a") as f:
+        f.write(json.dumps({**RECORDS[0], "id": "PMID_5_en-prompt.txt"}) + "\n")
+    assert read_result_by_id(path, "PMID_5_en-prompt.txt")["id"] == "PMID_5_en-prompt.txt"
+
+
+def test_iter_raw_result_yaml_matches_full_load():
+    path = "tests/input/en_test_fix.yaml"
+    with open(path, "r") as f:
+        expected = list(yaml.safe_load_all(f.read().replace("\x04", "")))
+    assert read_raw_result_yaml(path) == expected
+
+
+def test_iter_raw_result_yaml_drops_control_chars(tmp_path):
+    path = tmp_path / "results.yaml"
+    path.write_text("---\ninput_text: one\x04\n---\ninput_text: two\n")
+    documents = iter_raw_result_yaml(path)
+    assert next(documents) == {"input_text": "one"}
+    assert next(documents) == {"input_text": "two"}
+
+
+def test_convert_raw_result_yaml(tmp_path):
+    path = "tests/input/en_test_fix.yaml"
+    output = tmp_path / "results.jsonl"
+    count = convert_raw_result_yaml(path, output)
+    assert count == len(read_raw_result_yaml(path))
+    assert read_result_json(output) == json.loads(
+        json.dumps(read_raw_result_yaml(path), default=str)
+    )
+
+
+def test_iter_response_batches(tmp_path):
+    batches = list(iter_response_batches(_write(tmp_path), 2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert list(batches[0].columns) == ["service_answers", "metadata", "gold"]
+    assert batches[2]["metadata"].tolist() == ["PMID_4_en-prompt.txt"]
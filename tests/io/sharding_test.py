@@ -0,0 +1,96 @@
+import json
+
+import pytest
+import yaml
+from click.testing import CliRunner
+
+from malco.config import MalcoConfig
+from malco.io.reading import read_responses
+from malco.io.sharding import bucket_of, shard_jsonl, shard_stem
+from malco.main import core
+
+
+def _write_responses(path, langs=("en", "de", "ja"), cases=6):
+    records = [
+        {
+            "id": f"PMID_{i}_P{i}_{lang}-prompt.txt",
+            "model": "o1" if i % 2 else "gpt-4o",
+            "response": f"1. disease {i}",
+            "gold": {"disease_id": f"OMIM:{i}", "disease_name": f"disease {i}"},
+        }
+        for lang in langs
+        for i in range(cases)
+    ]
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    return records
+
+
+def test_bucket_of():
+    # Stable across sessions, unlike hash()
+    assert bucket_of("PMID_1_P1", 8) == bucket_of("PMID_1_P1", 8)
+    assert {bucket_of(f"PMID_{i}", 4) for i in range(100)} == {0, 1, 2, 3}
+    assert shard_stem("meditron3-70b", "cs", None, 3) == "cs-meditron3-70b-part003"
+    assert shard_stem("combined", None, "o1", None) == "o1"
+
+
+def test_shard_by_lang(tmp_path):
+    response_file = tmp_path / "multilingual-meditron3-70b.jsonl"
+    records = _write_responses(response_file)
+    counts = shard_jsonl(str(response_file), tmp_path / "shards", languages=["en", "de"])
+    assert {path.name: count for path, count in counts.items()} == {
+        "de-multilingual-meditron3-70b.jsonl": 6,
+        "en-multilingual-meditron3-70b.jsonl": 6,
+    }
+    shard = read_responses(str(tmp_path / "shards" / "de-multilingual-meditron3-70b.jsonl"))
+    assert shard["metadata"].tolist() == [r["id"] for r in records if "_de-" in r["id"]]
+
+
+def test_shard_by_bucket_and_model_compressed(tmp_path):
+    response_file = tmp_path / "responses.jsonl"
+    records = _write_responses(response_file)
+    counts = shard_jsonl(
+        str(response_file), tmp_path, by=("model", "bucket"), buckets=3, compress=True
+    )
+    assert sum(counts.values()) == len(records)
+    assert all(path.name.endswith(".jsonl.gz") for path in counts)
+    seen = {}
+    for path in counts:
+        for case in read_responses(str(path))["metadata"]:
+            ppkt_id = case.rsplit("_", 1)[0]
+            # All languages of a case share a shard
+            assert seen.setdefault(ppkt_id, path) == path
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_shard_unknown_key(tmp_path):
+    response_file = tmp_path / "responses.jsonl"
+    _write_responses(response_file)
+    with pytest.raises(ValueError):
+        shard_jsonl(str(response_file), tmp_path, by=("disease",))
+
+
+def test_shard_command_configs(tmp_path):
+    response_file = tmp_path / "gpt-4o.jsonl"
+    _write_responses(response_file, langs=("en", "cs"))
+    template = tmp_path / "run.yaml"
+    template.write_text(
+        yaml.safe_dump(
+            {
+                "output_dir": "data/results/",
+                "gold_file": "data/gold.jsonl",
+                "result_file": "data/results/topn_result_gpt-4o.tsv",
+                "full_result_file": "data/results/full_results/full_df_gpt-4o.parquet",
+            }
+        )
+    )
+    result = CliRunner().invoke(
+        core,
+        ["shard", "--input", str(response_file), "--output", str(tmp_path / "shards")]
+        + ["--config", str(template)],
+    )
+    assert result.exit_code == 0, result.output
+    run_config = MalcoConfig(tmp_path / "shards" / "cs-gpt-4o.yaml")
+    assert run_config.response_file == str(tmp_path / "shards" / "cs-gpt-4o.jsonl")
+    assert run_config.result_file == "data/results/topn_result_cs-gpt-4o.tsv"
+    assert run_config.full_result_file == "data/results/full_results/full_df_cs-gpt-4o.parquet"
+    assert run_config.gold_file == "data/gold.jsonl"
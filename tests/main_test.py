@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from malco.main import core
+
+# Upper bound on the cold import of the command line, relative to that of click alone, which
+# the command line needs anyway. Both are timed in the same process, so a loaded machine slows
+# them alike, while importing pandas or litellm would break it.
+IMPORT_BUDGET_CLICKS = 8
+# Modules whose import takes long, which only the commands that use them import
+HEAVY_MODULES = (
+    "curategpt",
+    "litellm",
+    "matplotlib",
+    "numpy",
+    "oaklib",
+    "pandas",
+    "pyarrow",
+    "scipy",
+    "seaborn",
+    "tiktoken",
+    "tqdm",
+)
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    src = str(Path(__file__).parents[1] / "src")
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([src, os.environ.get("PYTHONPATH", "")])}
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, check=True, env=env
+    )
+
+
+def test_no_heavy_imports():
+    result = run_python(
+        "-c", "import json, sys, malco.main; print(json.dumps(sorted(sys.modules)))"
+    )
+    modules = json.loads(result.stdout)
+    assert [m for m in modules if m.split(".")[0] in HEAVY_MODULES] == []
+
+
+def _cumulative_import_times() -> dict:
+    result = run_python("-X", "importtime", "-c", "import malco.main")
+    # Lines read "import time: <self> | <cumulative> | <module>", indented by nesting
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, module = line.split("|")
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_import_time_budget():
+    # The best of a few runs, since a single one can be slowed down by anything
+    ratios = []
+    for _ in range(3):
+        times = _cumulative_import_times()
+        ratios.append(times["malco"] / times["click"])
+    assert min(ratios) < IMPORT_BUDGET_CLICKS
+
+
+def test_help():
+    result = CliRunner().invoke(core, ["--help"])
+    assert result.exit_code == 0
+    assert "evaluate" in result.output
+    result = CliRunner().invoke(core, ["evaluate", "--help"])
+    assert result.exit_code == 0
+    assert "lenient|strict" in result.output
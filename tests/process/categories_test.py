@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+from malco.process.categories import CategoryIndex, case_outcomes, category_accuracy
+from malco.process.mapping_index import MappingIndex
+
+
+def _indexes():
+    index = CategoryIndex(
+        ["MONDO:A", "MONDO:B"],
+        ["category a", "category b"],
+        {"MONDO:1": 0b01, "MONDO:2": 0b11, "MONDO:3": 0b10},
+    )
+    mappings = MappingIndex(
+        {"MONDO:1": ("OMIM:1",), "MONDO:2": ("OMIM:2",), "MONDO:3": ("OMIM:3",)}, {}
+    )
+    return index, mappings
+
+
+def test_case_outcomes_legacy_format():
+    df = pd.DataFrame(
+        {
+            "label": ["case1", "case1", "case2"],
+            "term": ["MONDO:1", "MONDO:2", "MONDO:3"],
+            "correct_term": ["OMIM:1", "OMIM:1", "OMIM:3"],
+            "is_correct": [False, True, False],
+        }
+    )
+    outcomes = case_outcomes(df)
+    assert outcomes["case"].tolist() == ["case1", "case2"]
+    assert outcomes["gold_id"].tolist() == ["OMIM:1", "OMIM:3"]
+    assert outcomes["correct"].tolist() == [True, False]
+
+
+def test_category_accuracy():
+    index, mappings = _indexes()
+    outcomes = pd.DataFrame(
+        {
+            "case": ["c1", "c2", "c3", "c4"],
+            "gold_id": ["OMIM:1", "OMIM:2", "OMIM:3", "OMIM:4"],
+            "correct": [True, False, True, False],
+        }
+    )
+    table = category_accuracy(outcomes, index, mappings).set_index("category")
+    assert table.loc["MONDO:A", ["correct", "incorrect"]].tolist() == [1, 1]
+    assert table.loc["MONDO:B", ["correct", "incorrect"]].tolist() == [1, 1]
+    assert table.loc["uncategorized", ["correct", "incorrect"]].tolist() == [0, 1]
+
+
+def test_load_or_build_rebuilds_when_mondo_changes(tmp_path, monkeypatch):
+    db = tmp_path / "mondo.db"
+    db.write_bytes(b"release 1")
+    mondo = SimpleNamespace(engine=SimpleNamespace(url=SimpleNamespace(database=str(db))))
+    builds = []
+
+    def build(mondo, categories, root):
+        builds.append(root)
+        return _indexes()[0]
+
+    monkeypatch.setattr(CategoryIndex, "build", build)
+    index = CategoryIndex.load_or_build(mondo, tmp_path, ["MONDO:A", "MONDO:B"])
+    assert CategoryIndex.load_or_build(mondo, tmp_path, ["MONDO:B", "MONDO:A"]).masks == index.masks
+    assert len(builds) == 1
+    db.write_bytes(b"release 2, a new MONDO release")
+    CategoryIndex.load_or_build(mondo, tmp_path, ["MONDO:A", "MONDO:B"])
+    assert len(builds) == 2
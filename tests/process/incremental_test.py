@@ -0,0 +1,50 @@
+import pandas as pd
+
+from malco.process.incremental import (
+    FINGERPRINT_COLUMN,
+    fingerprints,
+    response_fingerprint,
+    split_evaluated,
+)
+
+GOLD = {"disease_id": "OMIM:1", "disease_name": "one"}
+
+
+def _responses(*answers):
+    df = pd.DataFrame(
+        {
+            "service_answers": list(answers),
+            "metadata": [f"PMID_{i}_en-prompt.txt" for i in range(len(answers))],
+            "gold": [GOLD] * len(answers),
+        }
+    )
+    df[FINGERPRINT_COLUMN] = fingerprints(df, "lenient")
+    return df
+
+
+def test_response_fingerprint():
+    fingerprint = response_fingerprint("1. Disease one", GOLD, "lenient")
+    assert fingerprint == response_fingerprint(
+        "1. Disease one", dict(reversed(GOLD.items())), "lenient"
+    )
+    assert fingerprint != response_fingerprint("1. Disease two", GOLD, "lenient")
+    assert fingerprint != response_fingerprint("1. Disease one", GOLD, "strict")
+    assert fingerprint != response_fingerprint(
+        "1. Disease one", {**GOLD, "disease_id": "OMIM:2"}, "lenient"
+    )
+
+
+def test_split_evaluated():
+    stored = _responses("a", "b", "c").drop("service_answers", axis=1)
+    stored["scored"] = [[], [], []]
+    responses = _responses("a", "B", "c", "d")
+    todo, kept = split_evaluated(responses, stored)
+    assert todo["service_answers"].tolist() == ["B", "d"]
+    assert kept["metadata"].tolist() == ["PMID_0_en-prompt.txt", "PMID_2_en-prompt.txt"]
+
+
+def test_split_evaluated_without_stored_fingerprints():
+    responses = _responses("a", "b")
+    todo, kept = split_evaluated(responses, pd.DataFrame({"metadata": ["PMID_0_en-prompt.txt"]}))
+    assert len(todo) == 2
+    assert kept.empty
@@ -0,0 +1,43 @@
+import json
+
+from malco.process import instrumentation
+
+
+def test_stages_and_counters():
+    recorder = instrumentation.Instrumentation()
+    with recorder.stage("grounding", items=3):
+        pass
+    for _ in range(2):
+        with recorder.stage("parse", items=1, span=False):
+            pass
+    with recorder.stage("read") as read:
+        read["items"] = 5
+    recorder.count("scoring", score_cache_hits=3, score_cache_misses=1)
+    report = recorder.report()
+    assert report["grounding"]["calls"] == 1
+    assert report["grounding"]["items"] == 3
+    assert report["parse"]["calls"] == 2
+    assert report["read"]["items"] == 5
+    assert report["scoring"]["score_cache_hit_rate"] == 0.75
+    assert [span["name"] for span in recorder.spans] == ["grounding", "read"]
+
+
+def test_collect_and_merge_worker_records(tmp_path):
+    instrumentation.reset()
+    with instrumentation.stage("grounding", items=2):
+        pass
+    worker = instrumentation.collect()
+    with instrumentation.stage("scoring", items=2):
+        pass
+    instrumentation.merge(worker)
+    instrumentation.merge(worker)
+    report, trace = instrumentation.report_paths(str(tmp_path / "result.tsv"))
+    instrumentation.write_report(report, trace, runs=["en"])
+    with open(report) as f:
+        content = json.load(f)
+    assert content["runs"] == ["en"]
+    assert content["stages"]["grounding"]["items"] == 4
+    assert content["stages"]["scoring"]["calls"] == 1
+    with open(trace) as f:
+        assert len(json.load(f)["traceEvents"]) == 3
+    instrumentation.reset()
@@ -0,0 +1,43 @@
+from malco.process.mapping_index import MappingIndex
+from malco.process.mondo_score_utils import FULL_SCORE, PARTIAL_SCORE, strict_score
+
+MAPPINGS = [
+    ("MONDO:0007566", "skos:exactMatch", "OMIM:132800"),
+    ("MONDO:0008029", "skos:exactMatch", "OMIMPS:158810"),
+    ("MONDO:0008029", "skos:closeMatch", "OMIM:158810"),
+    ("MONDO:0008029", "skos:exactMatch", "UMLS:C0000000"),
+]
+
+
+def test_from_mappings():
+    index = MappingIndex.from_mappings(MAPPINGS)
+    assert index.omims("MONDO:0007566") == ("OMIM:132800",)
+    assert index.omims("MONDO:0008029") == ()
+    assert index.phenotypic_series("MONDO:0008029") == ("OMIMPS:158810",)
+    assert index.phenotypic_series("MONDO:0007566") == ()
+
+
+def test_from_sssom(tmp_path):
+    sssom = tmp_path / "mondo.sssom.tsv"
+    sssom.write_text(
+        "# curie_map:\n"
+        "subject_id\tsubject_label\tpredicate_id\tobject_id\n"
+        + "".join(f"{s}\tlabel\t{p}\t{o}\n" for s, p, o in MAPPINGS)
+    )
+    index = MappingIndex.from_sssom(str(sssom))
+    assert index.omims("MONDO:0007566") == ("OMIM:132800",)
+    assert index.phenotypic_series("MONDO:0008029") == ("OMIMPS:158810",)
+
+
+def test_strict_score():
+    index = MappingIndex.from_mappings(MAPPINGS)
+    assert strict_score("OMIM:132800", FULL_SCORE, index) == FULL_SCORE
+    assert strict_score("MONDO:0008029", PARTIAL_SCORE, index) == PARTIAL_SCORE
+    assert strict_score("MONDO:0007566", PARTIAL_SCORE, index) == 0.0
+    assert strict_score("MONDO:0008029", 0.0, index) == 0.0
+
+
+def test_mondos():
+    index = MappingIndex.from_mappings(MAPPINGS)
+    assert index.mondos("OMIM:132800") == ("MONDO:0007566",)
+    assert index.mondos("OMIM:158810") == ()
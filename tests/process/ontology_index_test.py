@@ -0,0 +1,84 @@
+import sqlite3
+
+import pytest
+from oaklib.datamodels.vocabulary import HAS_EXACT_SYNONYM, IS_A, LABEL_PREDICATE
+
+from malco.process.grounding import perform_oak_grounding
+from malco.process.mapping_index import MappingIndex
+from malco.process.ontology_index import IndexAnnotator, OntologyIndex
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / "mondo.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE statements (subject, predicate, object, value)")
+        conn.execute("CREATE TABLE entailed_edge (subject, predicate, object)")
+        conn.executemany(
+            "INSERT INTO statements VALUES (?, ?, NULL, ?)",
+            [
+                ("MONDO:1", LABEL_PREDICATE, "Marfan syndrome"),
+                ("MONDO:1", HAS_EXACT_SYNONYM, "MFS"),
+                ("MONDO:2", LABEL_PREDICATE, "Marfan syndrome type 1"),
+                ("MONDO:3", LABEL_PREDICATE, "Ölmez disease"),
+                ("MONDO:4", HAS_EXACT_SYNONYM, "marfan syndrome"),
+                ("_:b1", LABEL_PREDICATE, "Marfan syndrome"),
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO entailed_edge VALUES (?, ?, ?)",
+            [
+                ("MONDO:1", IS_A, "MONDO:1"),
+                ("MONDO:2", IS_A, "MONDO:2"),
+                ("MONDO:2", IS_A, "MONDO:1"),
+            ],
+        )
+    return str(path)
+
+
+@pytest.fixture
+def index(db):
+    mappings = MappingIndex(
+        {"MONDO:1": ("OMIM:154700",), "MONDO:2": ("OMIM:154705", "OMIM:154706")},
+        {"MONDO:1": ("OMIMPS:154700",)},
+    )
+    return OntologyIndex.from_db(db, mappings)
+
+
+def test_search(index):
+    assert sorted(index.search("MARFAN SYNDROME")) == ["MONDO:1", "MONDO:4"]
+    assert index.search("mfs") == ["MONDO:1"]
+    # Like SQLite's LIKE, only ASCII letters are case folded
+    assert index.search("Ölmez Disease") == ["MONDO:3"]
+    assert index.search("ölmez disease") == []
+    assert index.search("Marfan") == []
+
+
+def test_lookups(index):
+    assert index.label("MONDO:2") == "Marfan syndrome type 1"
+    assert index.label("MONDO:4") is None
+    assert index.label("MONDO:9") is None
+    assert sorted(index.descendants("MONDO:1")) == ["MONDO:1", "MONDO:2"]
+    assert index.descendants("MONDO:9") == []
+    assert index.omims("MONDO:2") == ("OMIM:154705", "OMIM:154706")
+    assert index.phenotypic_series("MONDO:1") == ("OMIMPS:154700",)
+    assert index.phenotypic_series("MONDO:2") == ()
+
+
+def test_save_and_load(index, tmp_path):
+    index.save(tmp_path / "index")
+    loaded = OntologyIndex.load(tmp_path / "index")
+    assert loaded.search("mfs") == ["MONDO:1"]
+    assert loaded.omims("MONDO:1") == ("OMIM:154700",)
+    assert sorted(loaded.descendants("MONDO:1")) == ["MONDO:1", "MONDO:2"]
+
+
+def test_index_annotator(index):
+    grounded = perform_oak_grounding(
+        IndexAnnotator(index),
+        "Marfan Syndrome Type 1",
+        exact_match=True,
+        verbose=False,
+        include_list=["MONDO:"],
+    )
+    assert grounded == [("MONDO:2", "Marfan syndrome type 1")]
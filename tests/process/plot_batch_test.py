@@ -0,0 +1,65 @@
+import pytest
+import yaml
+
+from malco.process.plot_batch import PLOT_MANIFEST_NAME, read_plot_spec, render_plots
+
+HEADER = "\t".join([f"n{j}" for j in range(1, 11)] + ["n10p", "nf"])
+
+
+@pytest.fixture
+def spec(tmp_path):
+    results = tmp_path / "results"
+    results.mkdir()
+    for model, n1 in (("GPT_4o", 10), ("o1", 20), ("de-GPT_4o", 5)):
+        row = "\t".join(str(n) for n in [n1, 5, 3, 1, 0, 0, 0, 0, 0, 0, 0, 60])
+        (results / f"topn_result_{model}.tsv").write_text(f"{HEADER}\n{row}\n")
+    path = tmp_path / "plots.yaml"
+    path.write_text(
+        yaml.safe_dump(
+            {
+                "results_dir": str(results),
+                "out_dir": str(tmp_path / "plots"),
+                "plots": [
+                    {"model": "*", "langs": ["en"]},
+                    {"model": "GPT_4o", "langs": ["en"], "title": "GPT-4o"},
+                    {
+                        "files": ["topn_result_GPT_4o.tsv", "topn_result_de-GPT_4o.tsv"],
+                        "labels": ["English", "German"],
+                        "comparing": "Language",
+                        "output": "gpt_languages.png",
+                    },
+                ],
+            }
+        )
+    )
+    return path
+
+
+def test_read_plot_spec(spec, tmp_path):
+    jobs, out_dir = read_plot_spec(spec)
+    assert out_dir == tmp_path / "plots"
+    assert [job.output.name for job in jobs] == [
+        "topn_grouped_.png",
+        "topn_GPT_4o_.png",
+        "gpt_languages.png",
+    ]
+    assert sorted(jobs[0].labels) == ["GPT_4o", "o1"]
+    assert jobs[1].title == "GPT-4o"
+    assert jobs[2].labels == ("English", "German")
+    assert jobs[2].comparing == "Language"
+
+
+def test_render_plots(spec, tmp_path):
+    jobs, out_dir = read_plot_spec(spec)
+    manifest = out_dir / PLOT_MANIFEST_NAME
+    assert render_plots(jobs, manifest, cores=2) == (3, 0)
+    assert all(job.output.is_file() for job in jobs)
+    assert render_plots(jobs, manifest, cores=2) == (0, 3)
+    # Changing a top-n file renders again the plots using it
+    topn = tmp_path / "results" / "topn_result_o1.tsv"
+    topn.write_text(topn.read_text().replace("\n20\t", "\n25\t"))
+    assert render_plots(jobs, manifest, cores=2) == (1, 2)
+    # As does a missing plot
+    jobs[2].output.unlink()
+    assert render_plots(jobs, manifest, cores=1) == (1, 2)
+    assert render_plots(jobs, manifest, force=True) == (3, 0)
@@ -0,0 +1,154 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from cachetools import LRUCache
+from cachetools.keys import hashkey
+from oaklib.datamodels.vocabulary import IS_A
+from shelved_cache import PersistentCache
+
+from malco.io.reading import read_gold_ids, read_grounded_ids
+from malco.process import scoring
+from malco.process.mapping_index import MappingIndex
+from malco.process.ontology_index import ONTOLOGY_INDEX_NAME, OntologyIndex
+from malco.process.scoring import (
+    FULL_SCORE,
+    PARTIAL_SCORE,
+    SCORE_CACHE_NAME,
+    cache_stats,
+    open_caches,
+    prune_caches,
+    score,
+    warm_caches,
+)
+
+
+def _fill(cache_dir, entries):
+    pc = PersistentCache(LRUCache, str(cache_dir / SCORE_CACHE_NAME), maxsize=10)
+    for k, v in entries.items():
+        pc[k] = v
+    pc.close()
+
+
+def test_prune_caches_removes_stale_entries(tmp_path):
+    _fill(tmp_path, {hashkey("MONDO:1", "OMIM:1"): 1.0, hashkey("N/A", "OMIM:1"): 0.0})
+    # Simulate an entry stored by an earlier session under a different shelve key
+    pc = PersistentCache(LRUCache, str(tmp_path / SCORE_CACHE_NAME), maxsize=10)
+    pc.initialize_if_not_initialized()
+    pc.persistent_dict["stale"] = (hashkey("MONDO:1", "OMIM:1"), 1.0)
+    pc.close()
+
+    stats = cache_stats(tmp_path).set_index("cache").loc[SCORE_CACHE_NAME]
+    assert stats["entries"] == 2
+    assert stats["stale"] == 1
+
+    assert prune_caches(tmp_path) == {SCORE_CACHE_NAME: 1}
+    stats = cache_stats(tmp_path).set_index("cache").loc[SCORE_CACHE_NAME]
+    assert stats["stored"] == 2
+    assert stats["stale"] == 0
+
+
+def test_prune_caches_drop_ungrounded(tmp_path):
+    _fill(tmp_path, {hashkey("MONDO:1", "OMIM:1"): 1.0, hashkey("N/A", "OMIM:1"): 0.0})
+    assert prune_caches(tmp_path, drop_ungrounded=True) == {SCORE_CACHE_NAME: 1}
+    pc = PersistentCache(LRUCache, str(tmp_path / SCORE_CACHE_NAME), maxsize=10)
+    assert hashkey("MONDO:1", "OMIM:1") in pc
+    assert hashkey("N/A", "OMIM:1") not in pc
+    pc.close()
+
+
+MAPPINGS = [("MONDO:0008029", "skos:exactMatch", "OMIMPS:158810")]
+
+
+def _grounded_results():
+    return pd.DataFrame(
+        {
+            "metadata": ["PMID_1_P1_en-prompt.txt"],
+            "gold": [{"disease_id": "OMIM:132800", "disease_name": "Disease"}],
+            "grounding": [
+                [
+                    ("first diagnosis", [("MONDO:0007566", "first")]),
+                    ("second diagnosis", [("MONDO:0008029", "second")]),
+                ]
+            ],
+        }
+    )
+
+
+@pytest.mark.parametrize("mode, correct", [("lenient", [True, True]), ("strict", [False, True])])
+def test_score_descendant_match(tmp_path, monkeypatch, mode, correct):
+    # Both diagnoses are descendants of the correct one, only the second is a phenotypic series
+    monkeypatch.setattr(scoring, "open_caches", lambda: open_caches(tmp_path))
+    monkeypatch.setattr(scoring, "mondo_adapter", lambda: None)
+    monkeypatch.setattr(scoring, "score_grounded_result", lambda *args: PARTIAL_SCORE)
+    monkeypatch.setattr(
+        scoring.OntologyIndex,
+        "load_or_build",
+        lambda mondo, cache_dir: MappingIndex.from_mappings(MAPPINGS),
+    )
+    [scored] = score(_grounded_results(), mode)["scored"]
+    assert [result["grounded_score"] for result in scored] == [PARTIAL_SCORE, PARTIAL_SCORE]
+    assert [result["strict_score"] for result in scored] == [0.0, PARTIAL_SCORE]
+    assert [result["is_correct"] for result in scored] == correct
+
+
+@pytest.fixture
+def mondo(tmp_path, monkeypatch):
+    """A MONDO adapter whose ontology index is already saved in the cache directory."""
+    db = tmp_path / "mondo.db"
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE statements (subject, predicate, object, value)")
+        conn.execute("CREATE TABLE entailed_edge (subject, predicate, object)")
+        conn.executemany(
+            "INSERT INTO entailed_edge VALUES (?, ?, ?)",
+            [
+                ("MONDO:1", IS_A, "MONDO:1"),
+                ("MONDO:2", IS_A, "MONDO:2"),
+                ("MONDO:2", IS_A, "MONDO:1"),
+            ],
+        )
+    mappings = MappingIndex({"MONDO:1": ("OMIM:1",), "MONDO:2": ("OMIM:2",)}, {})
+    OntologyIndex.from_db(str(db), mappings).save(tmp_path / ONTOLOGY_INDEX_NAME)
+    adapter = SimpleNamespace(engine=SimpleNamespace(url=SimpleNamespace(database=str(db))))
+    monkeypatch.setattr(scoring, "mondo_adapter", lambda: adapter)
+    return adapter
+
+
+def test_warm_caches_scores_matching_pairs_first(tmp_path, mondo):
+    grounded_ids, gold_ids = {"MONDO:1", "MONDO:2"}, {"OMIM:1", "OMIM:2", "OMIM:3"}
+    assert warm_caches(grounded_ids, gold_ids, cores=2, cache_dir=tmp_path, max_scores=4) == (2, 4)
+    pc1, pc2 = open_caches(tmp_path)
+    assert pc1[hashkey("MONDO:2")] == ["OMIM:2"]
+    assert pc2[hashkey("MONDO:1", "OMIM:1")] == FULL_SCORE
+    # OMIM:2 is only reachable through a descendant
+    assert pc2[hashkey("MONDO:1", "OMIM:2")] == PARTIAL_SCORE
+    assert pc2[hashkey("MONDO:2", "OMIM:2")] == FULL_SCORE
+    assert pc2[hashkey("MONDO:1", "OMIM:3")] == 0.0
+    assert hashkey("MONDO:2", "OMIM:1") not in pc2
+    pc1.close()
+    pc2.close()
+
+    # Cached entries are not computed again
+    assert warm_caches(grounded_ids, gold_ids, cores=1, cache_dir=tmp_path) == (0, 2)
+    assert warm_caches(grounded_ids, gold_ids, cores=1, cache_dir=tmp_path) == (0, 0)
+
+
+def test_read_gold_and_grounded_ids(tmp_path):
+    gold = tmp_path / "correct_results.tsv"
+    gold.write_text(
+        "Disease\tOMIM:1\tPMID_1_P1_en-prompt.txt\nOther\tOMIM:2\tPMID_2_P2_en-prompt.txt\n"
+    )
+    assert read_gold_ids(gold) == {"OMIM:1", "OMIM:2"}
+
+    results = _grounded_results()
+    results["scored"] = [[{"grounded_id": "MONDO:1", "rank": 1}, {"grounded_id": "N/A", "rank": 2}]]
+    path = tmp_path / "full_df.tsv"
+    results.to_csv(path, sep="\t", index=False)
+    assert read_grounded_ids(path) == {"MONDO:1", "N/A"}
+
+    legacy = tmp_path / "full_df_results.tsv"
+    legacy.write_text(
+        "label\tterm\tcorrect_term\nPMID_1\tMONDO:1\tOMIM:1\nPMID_1\tMONDO:2\tOMIM:1\n"
+    )
+    assert read_grounded_ids(legacy) == {"MONDO:1", "MONDO:2"}
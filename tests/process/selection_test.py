@@ -0,0 +1,54 @@
+import json
+
+import pandas as pd
+import pytest
+
+from malco.process.selection import parse_case_keys, read_case_ids, select_cases
+
+METADATA = pd.Series(
+    [
+        "PMID_1_Patient_1_en-prompt.txt",
+        "PMID_1_Patient_1_de-prompt.txt",
+        "PMID_1_Patient_11_en-prompt.txt",
+        "PMID_2_Patient_2_ja-prompt.txt",
+    ]
+)
+
+
+def test_parse_case_keys():
+    keys = parse_case_keys(METADATA)
+    assert keys["ppkt_id"].tolist() == [
+        "PMID_1_Patient_1",
+        "PMID_1_Patient_1",
+        "PMID_1_Patient_11",
+        "PMID_2_Patient_2",
+    ]
+    assert keys["lang"].tolist() == ["en", "de", "en", "ja"]
+
+
+def test_select_cases_all_languages_exact_id():
+    selected = select_cases(METADATA, {"PMID_1_Patient_1"})
+    assert selected.tolist() == METADATA[:2].tolist()
+
+
+def test_read_case_ids_prompt_files(tmp_path):
+    cases = tmp_path / "cases.txt"
+    cases.write_text("PMID_1_Patient_1_en-prompt.txt\nPMID_2_Patient_2_en-prompt.txt\n")
+    assert read_case_ids(str(cases)) == {"PMID_1_Patient_1", "PMID_2_Patient_2"}
+
+
+def test_read_case_ids_json_files(tmp_path):
+    ppkt_dir = tmp_path / "ppkts"
+    ppkt_dir.mkdir()
+    (ppkt_dir / "PMID_2_P2.json").write_text(json.dumps({"id": "PMID_2_Patient 2"}))
+    cases = tmp_path / "cases.txt"
+    cases.write_text("PMID_2_P2.json\n")
+    assert read_case_ids(str(cases), str(ppkt_dir)) == {"PMID_2_Patient_2"}
+    assert read_case_ids(str(cases)) == {"PMID_2_P2"}
+
+
+def test_read_case_ids_invalid(tmp_path):
+    cases = tmp_path / "cases.txt"
+    cases.write_text("something else\n")
+    with pytest.raises(ValueError):
+        read_case_ids(str(cases))
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from malco.process.stats import (
+    bootstrap_ci,
+    compare_runs,
+    holm_adjust,
+    metric_values,
+    paired_permutation_test,
+)
+
+
+def _ranks(seed, n=500, p_found=0.5):
+    rng = np.random.default_rng(seed)
+    ranks = rng.integers(1, 15, size=n).astype(float)
+    ranks[rng.random(n) > p_found] = np.inf
+    return ranks
+
+
+def test_metric_values():
+    values = metric_values(np.array([1, 3, np.inf]), ks=(1, 3))
+    assert values.tolist() == [[100, 100, 1], [0, 100, 1 / 3], [0, 0, 0]]
+
+
+def test_bootstrap_ci():
+    ranks = _ranks(0)
+    ci = bootstrap_ci(ranks, ks=(1, 10), resamples=2000, seed=1)
+    assert list(ci.index) == ["Top-1", "Top-10", "MRR"]
+    assert ci.loc["Top-10", "estimate"] == pytest.approx((ranks <= 10).mean() * 100)
+    assert ci.loc["MRR", "estimate"] == pytest.approx((1 / ranks).mean())
+    assert (ci["low"] <= ci["estimate"]).all() and (ci["estimate"] <= ci["high"]).all()
+    # The same as resampling the cases one by one
+    rng = np.random.default_rng(2)
+    naive = [
+        (ranks[rng.integers(0, len(ranks), len(ranks))] <= 10).mean() * 100 for _ in range(2000)
+    ]
+    assert ci.loc["Top-10", "high"] - ci.loc["Top-10", "low"] == pytest.approx(
+        np.subtract(*np.quantile(naive, [0.975, 0.025])), rel=0.15
+    )
+    assert ci.equals(bootstrap_ci(ranks, ks=(1, 10), resamples=2000, seed=1))
+
+
+def test_bootstrap_ci_constant():
+    ci = bootstrap_ci(np.ones(50), ks=(1,), resamples=100)
+    assert ci.loc["Top-1"].tolist() == [100, 100, 100]
+
+
+def test_paired_permutation_test():
+    index = [f"PMID_{i}" for i in range(500)]
+    a = pd.Series(_ranks(0), index=index)
+    same = paired_permutation_test(a, a, resamples=500)
+    assert (same["difference"] == 0).all()
+    assert (same["p_value"] == 1).all()
+    better = pd.Series(np.where(np.isinf(a), 1.0, a), index=index)
+    result = paired_permutation_test(better, a, ks=(1,), resamples=500)
+    assert result.loc["Top-1", "difference"] > 0
+    assert result.loc["Top-1", "p_value"] < 0.01
+    assert result.loc["Top-1", "cases"] == 500
+    # Only the cases of both runs are paired
+    assert paired_permutation_test(a, a.iloc[:100], resamples=10)["cases"].iloc[0] == 100
+
+
+def test_paired_permutation_test_disjoint_runs():
+    a = pd.Series([1.0, np.inf], index=["PMID_1", "PMID_2"])
+    b = pd.Series([1.0, 2.0], index=["PMID_3", "PMID_4"])
+    result = paired_permutation_test(a, b, ks=(1,), resamples=100)
+    assert result["difference"].isna().all()
+    assert result["p_value"].isna().all()
+    assert (result["cases"] == 0).all()
+
+
+def test_holm_adjust():
+    assert holm_adjust([0.01, 0.04, 0.03]) == pytest.approx([0.03, 0.06, 0.06])
+    assert holm_adjust([0.5, 0.9]) == pytest.approx([1.0, 1.0])
+    # Tests that could not be run are not part of the family
+    assert holm_adjust([0.01, np.nan, 0.03]) == pytest.approx([0.02, np.nan, 0.03], nan_ok=True)
+
+
+def test_compare_runs():
+    index = [f"PMID_{i}" for i in range(200)]
+    ranks = {lang: pd.Series(_ranks(i, 200), index=index) for i, lang in enumerate("abc")}
+    table = compare_runs(ranks, ks=(1,), resamples=200)
+    assert table[["run_a", "run_b"]].drop_duplicates().values.tolist() == [
+        ["a", "b"],
+        ["a", "c"],
+        ["b", "c"],
+    ]
+    assert (table["p_holm"] >= table["p_value"]).all()
+    # The same with several worker processes
+    pd.testing.assert_frame_equal(table, compare_runs(ranks, ks=(1,), resamples=200, cores=2))
+    disjoint = {**ranks, "d": pd.Series(_ranks(3, 10), index=[f"x{i}" for i in range(10)])}
+    with_disjoint = compare_runs(disjoint, ks=(1,), resamples=200)
+    assert with_disjoint.loc[with_disjoint["run_b"] == "d", "p_holm"].isna().all()
+    compared = with_disjoint[with_disjoint["run_b"] != "d"]
+    for _, rows in compared.groupby("metric"):
+        assert rows["p_holm"].tolist() == pytest.approx(holm_adjust(rows["p_value"]))
+    baseline = compare_runs(ranks, ks=(1,), resamples=200, baseline="b")
+    assert baseline[["run_a", "run_b"]].drop_duplicates().values.tolist() == [
+        ["b", "a"],
+        ["b", "c"],
+    ]
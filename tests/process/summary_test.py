@@ -0,0 +1,66 @@
+import pandas as pd
+
+from malco.config import MalcoConfig
+from malco.process.summary import first_correct_ranks, rank_counts, summarize
+
+
+def _scored(*correct, grounded_id="MONDO:1"):
+    return [
+        {"rank": i, "grounded_id": grounded_id, "grounded_score": float(c), "is_correct": c}
+        for i, c in enumerate(correct, start=1)
+    ]
+
+
+def _df():
+    return pd.DataFrame(
+        {
+            "metadata": ["a", "b", "c", "d", "e", "f"],
+            "scored": [
+                _scored(True, False),
+                _scored(False, False, True, grounded_id="N/A"),
+                _scored(False, grounded_id="N/A"),
+                None,
+                _scored(*[False] * 10, True),
+                [],
+            ],
+        }
+    )
+
+
+def test_first_correct_ranks():
+    ranks = first_correct_ranks(_df())
+    assert ranks[0] == 1
+    assert ranks[1] == 3
+    assert ranks[4] == 11
+    assert ranks[[2, 3, 5]].isna().all()
+
+
+def test_rank_counts():
+    counts = rank_counts(_df())
+    assert counts["n1"] == 1
+    assert counts["n3"] == 1
+    assert counts["n10p"] == 1
+    assert counts["nf"] == 3
+    assert counts["nc"] == 4
+    assert counts["tgf"] == 2
+    assert counts["gf"] == 1
+    assert counts["items"] == 2 + 3 + 1 + 11
+
+
+def test_rank_counts_add_up_over_batches():
+    df = _df()
+    batched = rank_counts(df.iloc[:2]) + rank_counts(df.iloc[2:5]) + rank_counts(df.iloc[5:])
+    assert batched == rank_counts(df)
+
+
+def test_summarize(tmp_path):
+    config = tmp_path / "config.yaml"
+    result_file = tmp_path / "topn_result.tsv"
+    config.write_text(f'name: "en-test"\nresult_file: "{result_file}"\n')
+    summarize(_df(), MalcoConfig(config))
+    summary = pd.read_csv(result_file, sep="\t")
+    assert summary.loc[0, "run"] == "en"
+    assert summary.loc[0, ["n1", "n2", "n3", "n10p", "nf"]].tolist() == [1, 0, 1, 1, 3]
+    assert summary.loc[0, "grounding_failed"] == 1
+    assert summary.loc[0, "num_cases"] == 4
+    assert summary.loc[0, "items_processed"] == 17
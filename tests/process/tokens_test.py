@@ -0,0 +1,139 @@
+import json
+
+import pytest
+import tiktoken
+import yaml
+from click.testing import CliRunner
+
+from malco.main import core
+from malco.process import tokens
+from malco.process.tokens import (
+    RateLimiter,
+    count_tokens,
+    encoding_name,
+    iter_prompt_records,
+    iter_response_records,
+    token_report,
+)
+
+# One token per byte, so that the tests need no download of the BPE ranks
+BYTES = tiktoken.Encoding(
+    name="bytes",
+    pat_str=r"\S+|\s+",
+    mergeable_ranks={bytes([i]): i for i in range(256)},
+    special_tokens={},
+)
+
+
+@pytest.fixture(autouse=True)
+def byte_encoding(monkeypatch):
+    monkeypatch.setattr(tokens, "_encoding", lambda name: BYTES)
+
+
+def _write_prompts(prompt_dir, lang, texts):
+    (prompt_dir / lang).mkdir(parents=True, exist_ok=True)
+    for i, text in enumerate(texts):
+        (prompt_dir / lang / f"PMID_{i}_{lang}-prompt.txt").write_text(text, encoding="utf-8")
+
+
+def test_encoding_name():
+    assert encoding_name("gpt-4o") == "o200k_base"
+    assert encoding_name("Meditron3_70B") == tokens.DEFAULT_ENCODING
+
+
+def test_count_tokens_cached(tmp_path):
+    prompts = tmp_path / "prompts"
+    _write_prompts(prompts, "en", ["fever", "rash and fever", "fever"])
+    counts, tokenized = count_tokens(iter_prompt_records(str(prompts), "gpt-4o"), tmp_path)
+    assert counts["tokens"].tolist() == [5, 14, 5]
+    assert set(counts["language"]) == {"en"}
+    # Identical prompts are tokenized once
+    assert tokenized == 2
+
+    _write_prompts(prompts, "ja", ["発熱"])
+    counts, tokenized = count_tokens(iter_prompt_records(str(prompts), "gpt-4o"), tmp_path)
+    assert tokenized == 1
+    assert counts.set_index("language").loc["ja", "tokens"] == len("発熱".encode("utf-8"))
+
+
+def test_response_records(tmp_path):
+    response_file = tmp_path / "responses.jsonl"
+    response_file.write_text(
+        "\n".join(
+            json.dumps({"id": f"PMID_{i}_de-prompt.txt", "prompt": "abc", "response": "de"})
+            for i in range(3)
+        )
+    )
+    records = list(iter_response_records(str(response_file), "gpt-4o"))
+    assert records[:2] == [("gpt-4o", "de", "input", "abc"), ("gpt-4o", "de", "output", "de")]
+    report = token_report(count_tokens(records, tmp_path)[0])
+    row = report.iloc[0]
+    assert (row["cases"], row["input_tokens"], row["output_tokens"]) == (3, 9, 6)
+    assert row["cost"] == pytest.approx((9 * 2.50 + 6 * 10.00) / 1e6)
+    assert report.iloc[-1]["model"] == "total"
+
+
+def test_report_unpriced_model(tmp_path):
+    counts = count_tokens([("Meditron3_70B", "en", "input", "abc")], tmp_path)[0]
+    report = token_report(counts, prices={})
+    assert report["input_tokens"].tolist() == [3, 3]
+    assert report["cost"].isna().all()
+
+
+def test_rate_limiter():
+    now = [0.0]
+    limiter = RateLimiter(
+        tokens_per_minute=100,
+        requests_per_minute=3,
+        clock=lambda: now[0],
+        sleep=lambda seconds: now.__setitem__(0, now[0] + seconds),
+    )
+    assert limiter.acquire(60) == 0
+    # Over the token budget until the first request leaves the window
+    assert limiter.acquire(60) == 60
+    limiter.settle(10)
+    assert limiter.acquire(20) == 0
+    assert limiter.acquire(20) == 0
+    # Over the request budget
+    assert limiter.acquire(1) == 60
+    # Larger than the whole budget, admitted alone
+    assert limiter.acquire(500) > 0
+
+
+def test_tokens_command(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _write_prompts(tmp_path / "prompts", "en", ["fever"])
+    response_file = tmp_path / "responses.jsonl"
+    response_file.write_text(
+        json.dumps({"id": "PMID_1_cs-prompt.txt", "prompt": "abc", "response": "de"}) + "\n"
+    )
+    config = tmp_path / "run.yaml"
+    config.write_text(
+        yaml.safe_dump(
+            {"response_file": str(response_file), "result_file": "topn_result_cs-o1.tsv"}
+        )
+    )
+    result = CliRunner().invoke(
+        core,
+        [
+            "tokens",
+            "--prompts",
+            "prompts",
+            "--config",
+            str(config),
+            "--input_price",
+            "1",
+            "--cores",
+            "1",
+            "--output",
+            "report.tsv",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "Tokenized 3 of 3 texts" in result.output
+    report = (tmp_path / "report.tsv").read_text().splitlines()
+    assert [line.split("\t")[:2] for line in report[1:]] == [
+        ["gpt-4o", "en"],
+        ["o1", "cs"],
+        ["total", ""],
+    ]
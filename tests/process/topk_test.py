@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from malco.process.topk import case_totals, topk_accuracy, topk_counts
+
+
+def _table():
+    rows = [
+        # n1..n10, n10p, nf, num_cases
+        [10, 5, 5, 0, 0, 0, 0, 0, 0, 5, 5, 70, 100],
+        [1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 2, np.nan],
+        [0] * 12 + [0],
+    ]
+    columns = [f"n{j}" for j in range(1, 11)] + ["n10p", "nf", "num_cases"]
+    return pd.DataFrame(rows, columns=columns, index=["a", "b", "c"])
+
+
+def test_case_totals():
+    # num_cases when present, the sum of the counts otherwise
+    assert case_totals(_table()).tolist() == [100, 4, 0]
+    assert case_totals(_table().drop(columns="num_cases")).tolist() == [100, 4, 0]
+
+
+def test_topk_counts():
+    counts = topk_counts(_table(), ks=(1, 3, 10))
+    assert counts.loc["a"].tolist() == [10, 20, 25]
+    assert counts.loc["b"].tolist() == [1, 2, 2]
+    assert list(counts.index) == ["a", "b", "c"]
+    with pytest.raises(ValueError):
+        topk_counts(_table(), ks=(11,))
+
+
+def test_topk_accuracy():
+    accuracy = topk_accuracy(_table())
+    assert list(accuracy.columns) == ["Top-1", "Top-3", "Top-5", "Top-10", "MRR"]
+    assert accuracy.loc["a", "Top-1"] == pytest.approx(10)
+    assert accuracy.loc["a", "Top-10"] == pytest.approx(25)
+    assert accuracy.loc["b", "Top-3"] == pytest.approx(50)
+    assert accuracy.loc["a", "MRR"] == pytest.approx((10 + 5 / 2 + 5 / 3 + 5 / 10) / 100)
+    assert accuracy.loc["b", "MRR"] == pytest.approx((1 + 1 / 2) / 4)
+    assert accuracy.loc["c"].tolist() == [0, 0, 0, 0, 0]
+    assert list(topk_accuracy(_table(), ks=(1,), mrr=False).columns) == ["Top-1"]